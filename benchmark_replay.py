@@ -0,0 +1,260 @@
+"""
+Offline Replay Benchmark
+========================
+
+Feeds recorded video files or image sequences (or any frame source spec,
+e.g. "synthetic:1280x720@30" or a network stream) through the full
+recognition pipeline (FaceProcessor + RecognitionHandler) without a camera
+or browser, so performance work is reproducible and runs on headless machines.
+
+Reports per-stage latency distributions, sustained FPS, time-to-decision
+and the recognition decisions per input, and saves everything as JSON:
+    python benchmark_replay.py recordings/queue.mp4 recordings/frames/ \\
+        --gallery data/face_recognition.db --output benchmarks/run.json
+    python benchmark_replay.py recordings/queue.mp4 --compare benchmarks/run.json
+
+The gallery database is copied to a temporary file first, so customers
+registered during the replay never touch the real database.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from src.config import Config
+from src.database import FaceDatabase
+from src.face_processor import FaceProcessor
+from src.recognition_handler import RecognitionHandler
+from src.state_manager import StateManager
+from src.preview import PreviewEncoder
+from src.frame_sources import ImageDirectorySource, SyntheticSource, create_frame_source
+from src.logger import Logger
+from src.metrics import metrics
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay recorded video through the recognition pipeline")
+    parser.add_argument('inputs', nargs='+',
+                        help='Video files, image directories (sorted by name) or frame source specs')
+    parser.add_argument('--gallery', default=Config.DATABASE_PATH,
+                        help='Database with known customers (used read-only via a temp copy)')
+    parser.add_argument('--output', default=None,
+                        help='Result JSON path (default: benchmarks/replay_<timestamp>.json)')
+    parser.add_argument('--compare', default=None, help='Previous result JSON to compare against')
+    parser.add_argument('--max-frames', type=int, default=None,
+                        help='Limit frames per input (synthetic sources default to 300)')
+    parser.add_argument('--realtime', action='store_true',
+                        help='Deliver frames at the source frame rate instead of as fast as possible')
+    parser.add_argument('--fps', type=float, default=Config.FPS,
+                        help='Frame rate of image sequences (for video time)')
+    parser.add_argument('--no-encode', action='store_true', help='Skip JPEG encoding of output frames')
+    return parser.parse_args()
+
+
+def open_source(spec, args):
+    """Open a frame source for one input."""
+    source = create_frame_source(spec, realtime=args.realtime)
+    if isinstance(source, ImageDirectorySource):
+        source.fps = args.fps
+    if isinstance(source, SyntheticSource):
+        source.max_frames = args.max_frames or 300
+    if not source.open():
+        raise SystemExit(f"❌ Cannot open {spec}")
+    return source
+
+
+def iter_frames(source, max_frames=None):
+    """Yield frames from a frame source until it ends (or max_frames)."""
+    try:
+        count = 0
+        while max_frames is None or count < max_frames:
+            ret, frame = source.read()
+            if not ret or frame is None:
+                return
+            count += 1
+            yield frame
+    finally:
+        source.release()
+
+
+def replay(path, args, face_processor, recognition_handler, state):
+    """Run one input through the pipeline; return its per-input report."""
+    face_processor.reset_tracking()
+    state.reset_state()
+    session = {'customer_id': None, 'session_id': None, 'status': 'waiting'}
+    source = open_source(path, args)
+    video_fps = source.fps
+    # Tanpa batas FPS: setiap frame yang berubah di-encode seperti preview /video_feed
+    preview = PreviewEncoder(max_fps=None)
+
+    decisions = []
+    face_since = None  # (frame index, perf_counter) saat wajah mulai terlihat
+    frames = 0
+    started = time.perf_counter()
+
+    for index, frame in enumerate(iter_frames(source, args.max_frames)):
+        frame_started = time.perf_counter()
+        previous = dict(session)
+        session, bbox, face_found = recognition_handler.process_face_detection(frame, dict(session))
+
+        if face_found and face_since is None:
+            face_since = (index, frame_started)
+        elif not face_found and not state.face_in_frame:
+            face_since = None
+
+        if session.get('customer_id') != previous.get('customer_id') and session.get('customer_id'):
+            since_index, since_time = face_since or (index, frame_started)
+            decisions.append({
+                'frame': index,
+                'video_time': round(index / video_fps, 3),
+                'customer_id': session['customer_id'],
+                'status': session['status'],
+                'frames_to_decision': index - since_index + 1,
+                'ms_to_decision': round((time.perf_counter() - since_time) * 1000, 2)
+            })
+            # Customer sudah diputuskan; episode berikutnya mulai dari wajah berikutnya
+            face_since = None
+            session = {'customer_id': None, 'session_id': None, 'status': 'waiting'}
+
+        if not args.no_encode:
+            frame_bytes = preview.encode(frame, bbox if face_found and bbox else None, state.buffer_stable)
+            if frame_bytes:
+                preview.report_sent(len(frame_bytes), 0.0)
+
+        metrics.observe('frame', time.perf_counter() - frame_started)
+        metrics.tick_frame()
+        frames += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        'input': path,
+        'source': source.describe(),
+        'frames': frames,
+        'seconds': round(elapsed, 3),
+        'fps': round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        'video_fps': video_fps,
+        'preview': preview.get_stats(),
+        'decisions': decisions
+    }
+
+
+def current_commit():
+    """Git commit of the working tree (None outside a git checkout)."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(result):
+    print(f"\n📊 Replay results ({result['commit'] or 'no commit'})")
+    for item in result['inputs']:
+        print(f"   🎞️ {item['input']}: {item['frames']} frames, {item['fps']} FPS, "
+              f"{len(item['decisions'])} decision(s), preview {item['preview']['bytes_sent'] / 1024:.0f} KiB "
+              f"in {item['preview']['encoded']} JPEGs")
+        for decision in item['decisions']:
+            print(f"      → frame {decision['frame']}: {decision['status']} {decision['customer_id']} "
+                  f"({decision['frames_to_decision']} frames, {decision['ms_to_decision']} ms)")
+
+    print(f"\n   {'stage':<16}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result['stages'].items():
+        print(f"   {stage:<16}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+    print(f"\n   ⏱️ Sustained FPS: {result['totals']['fps']}")
+
+
+def print_comparison(result, baseline_path):
+    """Print p50/p95 and FPS deltas against a previous result."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    print(f"\n🔁 Compared with {baseline_path} ({baseline.get('commit') or 'no commit'})")
+    for stage, stats in result['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old or not old.get('p50_ms') or not stats['p50_ms']:
+            continue
+        delta = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+        print(f"   {stage:<16} p50 {old['p50_ms']:>8} → {stats['p50_ms']:<8} ({delta:+.1f}%)  "
+              f"p95 {old['p95_ms']} → {stats['p95_ms']}")
+    print(f"   FPS {baseline['totals']['fps']} → {result['totals']['fps']}")
+
+
+def main():
+    args = parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='replay_')
+    gallery_copy = os.path.join(workdir, 'gallery.db')
+    if os.path.exists(args.gallery):
+        shutil.copy2(args.gallery, gallery_copy)
+    # Gallery, wajah dan embedding customer baru hanya ditulis ke workdir sementara
+    try:
+        db = FaceDatabase(gallery_copy, faces_dir=os.path.join(workdir, 'faces'),
+                          embeddings_dir=os.path.join(workdir, 'embeddings'))
+
+        print(f"🔄 Loading models and gallery ({args.gallery})...")
+        logger = Logger(log_file=os.path.join(workdir, 'events.jsonl'))
+        face_processor = FaceProcessor(db)
+        state = StateManager()
+        recognition_handler = RecognitionHandler(face_processor, state, db, logger)
+        print(f"   👥 {len(face_processor.saved_records)} known embeddings")
+        # Inference pertama tiap model tidak ikut terukur di latency per frame
+        face_processor.warmup()
+        print("   ⏱️ Startup: " + ', '.join(f"{phase} {ms:.0f}ms" for phase, ms in face_processor.startup_timings.items()))
+
+        metrics.reset()
+        reports = []
+        started = time.perf_counter()
+        try:
+            for path in args.inputs:
+                print(f"\n▶️ Replaying {path}...")
+                reports.append(replay(path, args, face_processor, recognition_handler, state))
+        finally:
+            face_processor.writer.shutdown()
+            logger.close()
+
+        elapsed = time.perf_counter() - started
+        total_frames = sum(item['frames'] for item in reports)
+        decision_ms = [d['ms_to_decision'] for item in reports for d in item['decisions']]
+        result = {
+            'commit': current_commit(),
+            'created_at': datetime.now().isoformat(),
+            'gallery': args.gallery,
+            'startup_ms': face_processor.startup_timings,
+            'config': {
+                'SIM_THRESHOLD': Config.SIM_THRESHOLD,
+                'BUFFER_SIZE': Config.BUFFER_SIZE,
+                'MIN_FACE_AREA': Config.MIN_FACE_AREA,
+                'encode': not args.no_encode,
+                'PREVIEW_WIDTH': Config.PREVIEW_WIDTH,
+                'PREVIEW_QUALITY': Config.PREVIEW_QUALITY
+            },
+            'inputs': reports,
+            'stages': metrics.summary()['stages'],
+            'totals': {
+                'frames': total_frames,
+                'seconds': round(elapsed, 3),
+                'fps': round(total_frames / elapsed, 2) if elapsed > 0 else 0.0,
+                'decisions': len(decision_ms),
+                'mean_ms_to_decision': round(sum(decision_ms) / len(decision_ms), 2) if decision_ms else None
+            }
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or f"benchmarks/replay_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print_report(result)
+    if args.compare:
+        print_comparison(result, args.compare)
+    print(f"\n✅ Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
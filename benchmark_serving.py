@@ -0,0 +1,147 @@
+"""
+Concurrent Serving Benchmark
+============================
+
+Measures API throughput and latency of a running server while long-lived
+streams (/api/events SSE or /video_feed MJPEG) are held open, to compare
+the pooled production server with the development server:
+
+    python main.py --api-only                # pooled server
+    python benchmark_serving.py --streams 8 --concurrency 16 --duration 10
+    python main.py --api-only --dev          # Werkzeug development server
+    python benchmark_serving.py --streams 8 --concurrency 16 --duration 10
+
+Uses only the standard library; each load thread keeps one HTTP connection
+open (keep-alive when the server allows it).
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent API requests with streams open")
+    parser.add_argument('--url', default='http://localhost:5001', help='Server base URL')
+    parser.add_argument('--path', default='/api/menu', help='API path to load')
+    parser.add_argument('--streams', type=int, default=8, help='Streams held open during the run')
+    parser.add_argument('--stream-path', default='/api/events', help='Stream path (/api/events or /video_feed)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Concurrent API clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='Load duration in seconds')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Per-request timeout in seconds')
+    parser.add_argument('--output', default=None, help='Save the result as JSON')
+    return parser.parse_args()
+
+
+def hold_stream(host, port, path, stop, stats, timeout):
+    """Open a stream and keep reading it until stop is set."""
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=timeout)
+        conn.request('GET', path)
+        response = conn.getresponse()
+        stats['stream_status'][response.status] += 1
+        if response.status != 200:
+            return
+        stats['streams_open'] += 1
+        while not stop.is_set():
+            data = response.read1(65536)
+            if not data:
+                break
+            stats['stream_bytes'] += len(data)
+    except (OSError, http.client.HTTPException) as e:
+        stats['stream_errors'][type(e).__name__] += 1
+
+
+def load(host, port, path, deadline, latencies, errors, statuses, timeout):
+    """Send requests back to back on one connection until the deadline."""
+    conn = http.client.HTTPConnection(host, port, timeout=timeout)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            statuses[response.status] += 1
+            if response.status == 200:
+                latencies.append(time.perf_counter() - started)
+            if response.will_close:
+                conn.close()
+        except (OSError, http.client.HTTPException) as e:
+            errors[type(e).__name__] += 1
+            conn.close()
+            time.sleep(0.01)
+    conn.close()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+def main():
+    args = parse_args()
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port or 80
+
+    stop = threading.Event()
+    stats = {'stream_status': Counter(), 'stream_errors': Counter(), 'streams_open': 0,
+             'stream_bytes': 0}
+    streams = [threading.Thread(target=hold_stream, daemon=True,
+                                args=(host, port, args.stream_path, stop, stats, args.timeout))
+               for _ in range(args.streams)]
+    for thread in streams:
+        thread.start()
+    time.sleep(1.0)  # Beri waktu semua stream tersambung
+    print(f"📡 {stats['streams_open']}/{args.streams} streams open on {args.stream_path}")
+
+    latencies, errors, statuses = [], Counter(), Counter()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    clients = [threading.Thread(target=load, daemon=True,
+                                args=(host, port, args.path, deadline, latencies, errors, statuses, args.timeout))
+               for _ in range(args.concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join(args.duration + args.timeout + 1)
+    elapsed = time.perf_counter() - started
+
+    streams_alive = sum(thread.is_alive() for thread in streams)
+    stop.set()
+
+    result = {
+        'url': args.url,
+        'path': args.path,
+        'concurrency': args.concurrency,
+        'streams': args.streams,
+        'stream_path': args.stream_path,
+        'streams_open': stats['streams_open'],
+        'streams_alive_at_end': streams_alive,
+        'stream_status': dict(stats['stream_status']),
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'statuses': dict(statuses),
+        'errors': dict(errors)
+    }
+
+    print(f"🚀 {result['requests']} requests in {elapsed:.1f}s → {result['rps']} req/s "
+          f"(p50 {result['p50_ms']} ms, p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms)")
+    print(f"   statuses {result['statuses']}, errors {result['errors']}, "
+          f"streams still open {streams_alive}/{args.streams}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"✅ Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
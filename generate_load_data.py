@@ -0,0 +1,262 @@
+"""
+Synthetic Load Data Generator
+=============================
+
+Creates a scale-test database with N customers (random unit-norm embeddings,
+placeholder faces) and M purchases with realistic time distributions:
+- Business-hour peaks (morning rush, after-lunch, late afternoon)
+- Busier weekends and slow growth over the simulated period
+- Long-tail customer loyalty (few regulars, many one-time visitors)
+
+All writes use executemany in large transactions and packed (BLOB)
+embedding storage, so 1M customers / 50M purchases is feasible locally:
+    python generate_load_data.py --customers 1000000 --purchases 50000000
+
+By default it writes to data/loadtest.db, NOT the production database;
+placeholder faces go to data/loadtest_faces/ next to it.
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+import numpy as np
+import cv2
+from src.database import FaceDatabase
+
+EMBEDDING_DIM = 512
+
+# Bobot jam operasional cafe (07:00 - 21:00), puncak pagi dan sore
+HOUR_WEIGHTS = {
+    7: 6, 8: 10, 9: 8, 10: 5, 11: 4, 12: 6, 13: 7,
+    14: 6, 15: 8, 16: 9, 17: 7, 18: 5, 19: 4, 20: 3, 21: 2
+}
+
+# Popularitas relatif menu berdasarkan nama; menu lain mendapat DEFAULT_MENU_WEIGHT
+MENU_WEIGHTS = {
+    'Americano': 0.28, 'Cappuccino': 0.24, 'Latte': 0.22, 'Cold Brew': 0.14, 'Matcha Latte': 0.12
+}
+DEFAULT_MENU_WEIGHT = 0.1
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic customers and purchases")
+    parser.add_argument('--customers', type=int, default=10000, help='Number of customers')
+    parser.add_argument('--purchases', type=int, default=200000, help='Number of purchases')
+    parser.add_argument('--days', type=int, default=365, help='History length in days')
+    parser.add_argument('--db', default='data/loadtest.db', help='Target database path')
+    parser.add_argument('--batch-size', type=int, default=100000,
+                        help='Rows per executemany transaction')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed')
+    parser.add_argument('--write-faces', action='store_true',
+                        help='Write one placeholder JPEG per customer (default: shared placeholder)')
+    parser.add_argument('--force', action='store_true', help='Overwrite existing target database')
+    return parser.parse_args()
+
+
+def create_placeholder_face(label, color=(180, 180, 180)):
+    """Create a simple placeholder face image."""
+    face_image = np.full((112, 112, 3), color, dtype=np.uint8)
+    cv2.putText(face_image, label[:12], (5, 60),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.35, (255, 255, 255), 1)
+    return face_image
+
+
+def random_unit_embeddings(rng, count):
+    """Random unit-norm float32 embeddings."""
+    emb = rng.standard_normal((count, EMBEDDING_DIM), dtype=np.float32)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True)
+    return emb
+
+
+def customer_weights(rng, count):
+    """Long-tail purchase frequency per customer (Zipf-like)."""
+    ranks = rng.permutation(count) + 1
+    weights = 1.0 / np.power(ranks, 0.8)
+    return weights / weights.sum()
+
+
+def random_purchase_times(rng, count, start_ts, days):
+    """Sample purchase timestamps (epoch seconds) with daily/weekly patterns."""
+    # Hari: tren naik pelan sepanjang periode + weekend lebih ramai
+    day_idx = np.arange(days)
+    day_weights = 1.0 + 0.5 * day_idx / max(days - 1, 1)
+    weekday = (np.floor(start_ts / 86400).astype(np.int64) + day_idx + 3) % 7  # 0 = Senin
+    day_weights = day_weights * np.where(weekday >= 5, 1.3, 1.0)
+    day_weights /= day_weights.sum()
+    days_sampled = rng.choice(days, size=count, p=day_weights)
+
+    hours = np.array(list(HOUR_WEIGHTS.keys()))
+    hour_weights = np.array(list(HOUR_WEIGHTS.values()), dtype=np.float64)
+    hours_sampled = rng.choice(hours, size=count, p=hour_weights / hour_weights.sum())
+
+    seconds = rng.integers(0, 3600, size=count)
+    return start_ts + days_sampled * 86400 + hours_sampled * 3600 + seconds
+
+
+def to_iso(timestamps):
+    """Vectorized epoch seconds -> ISO strings (same format as datetime.isoformat)."""
+    return np.datetime_as_string(timestamps.astype('datetime64[s]'), unit='s')
+
+
+def prepare_database(db_path, force):
+    """Create an empty schema-ready database at db_path."""
+    if os.path.exists(db_path):
+        if not force:
+            raise SystemExit(f"❌ {db_path} already exists (use --force to overwrite)")
+        os.remove(db_path)
+
+    db = FaceDatabase(db_path)
+
+    conn = sqlite3.connect(db_path)
+    # Index dibuat ulang setelah bulk insert (lebih cepat daripada update per baris)
+    conn.execute('DROP INDEX IF EXISTS idx_purchases_customer_time')
+    conn.commit()
+    conn.close()
+    return db
+
+
+def open_bulk_connection(db_path):
+    """Connection tuned for bulk loading."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.execute('PRAGMA cache_size = -262144')  # 256 MB
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+def generate_purchases(conn, rng, args, menu, start_ts):
+    """Insert purchases in batches; return per-customer aggregates."""
+    menu_ids = np.array([item['id'] for item in menu])
+    prices = np.array([item['price'] for item in menu], dtype=np.float64)
+    menu_weights = np.array([MENU_WEIGHTS.get(item['name'], DEFAULT_MENU_WEIGHT) for item in menu])
+    menu_weights /= menu_weights.sum()
+    cust_weights = customer_weights(rng, args.customers)
+
+    total_visits = np.zeros(args.customers, dtype=np.int64)
+    total_purchases = np.zeros(args.customers, dtype=np.int64)
+    total_spent = np.zeros(args.customers, dtype=np.float64)
+    last_seen = np.full(args.customers, start_ts, dtype=np.int64)
+
+    done = 0
+    while done < args.purchases:
+        n = min(args.batch_size, args.purchases - done)
+
+        cust_idx = rng.choice(args.customers, size=n, p=cust_weights)
+        menu_idx = rng.choice(len(menu_ids), size=n, p=menu_weights)
+        quantity = rng.choice([1, 2, 3], size=n, p=[0.8, 0.15, 0.05])
+        total_price = prices[menu_idx] * quantity
+        ts = random_purchase_times(rng, n, start_ts, args.days)
+
+        total_visits += np.bincount(cust_idx, minlength=args.customers)
+        total_purchases += np.bincount(cust_idx, weights=quantity, minlength=args.customers).astype(np.int64)
+        total_spent += np.bincount(cust_idx, weights=total_price, minlength=args.customers)
+        np.maximum.at(last_seen, cust_idx, ts)
+
+        customer_ids = np.char.add('load_', np.char.zfill(cust_idx.astype(str), 7))
+        rows = zip(customer_ids.tolist(), menu_ids[menu_idx].tolist(), quantity.tolist(),
+                   total_price.tolist(), to_iso(ts).tolist())
+
+        with conn:
+            conn.executemany('''
+                INSERT INTO purchases
+                (customer_id, menu_id, quantity, total_price, purchase_time)
+                VALUES (?, ?, ?, ?, ?)
+            ''', rows)
+
+        done += n
+        print(f"   🛒 {done:,}/{args.purchases:,} purchases")
+
+    return total_visits, total_purchases, total_spent, last_seen
+
+
+def generate_customers(conn, rng, args, start_ts, aggregates):
+    """Insert customers and packed embeddings in batches."""
+    total_visits, total_purchases, total_spent, last_seen = aggregates
+
+    # Wajah placeholder disimpan di samping database hasil generate, bukan di data/faces produksi
+    faces_dir = os.path.splitext(args.db)[0] + '_faces'
+    os.makedirs(faces_dir, exist_ok=True)
+    shared_face = os.path.join(faces_dir, 'placeholder.jpg')
+    if not args.write_faces:
+        cv2.imwrite(shared_face, create_placeholder_face("LOADTEST"))
+
+    for begin in range(0, args.customers, args.batch_size):
+        end = min(begin + args.batch_size, args.customers)
+        n = end - begin
+        idx = np.arange(begin, end)
+
+        customer_ids = np.char.add('load_', np.char.zfill(idx.astype(str), 7)).tolist()
+        embeddings = random_unit_embeddings(rng, n)
+        # Customer pertama kali terlihat sebelum (atau saat) pembelian terakhirnya
+        first_seen_ts = start_ts + (rng.random(n) * (last_seen[begin:end] - start_ts)).astype(np.int64)
+        first_seen = to_iso(first_seen_ts).tolist()
+        last_seen_iso = to_iso(last_seen[begin:end]).tolist()
+
+        if args.write_faces:
+            face_paths = [os.path.join(faces_dir, f"{cid}.jpg") for cid in customer_ids]
+            for cid, path in zip(customer_ids, face_paths):
+                cv2.imwrite(path, create_placeholder_face(cid))
+        else:
+            face_paths = [shared_face] * n
+
+        customer_rows = zip(customer_ids, first_seen, last_seen_iso,
+                            np.maximum(total_visits[begin:end], 1).tolist(),
+                            total_purchases[begin:end].tolist(), total_spent[begin:end].tolist(),
+                            face_paths)
+        embedding_rows = (
+            (cid, '', path, 0.9, 1, FaceDatabase.pack_embedding(emb))
+            for cid, path, emb in zip(customer_ids, face_paths, embeddings)
+        )
+
+        with conn:
+            conn.executemany('''
+                INSERT INTO customers
+                (customer_id, first_seen, last_seen, total_visits, total_purchases,
+                 total_spent, face_image_path, embedding_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, '')
+            ''', customer_rows)
+            conn.executemany('''
+                INSERT INTO face_embeddings
+                (customer_id, embedding_path, face_image_path, confidence_score, is_primary, embedding)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', embedding_rows)
+
+        print(f"   👥 {end:,}/{args.customers:,} customers")
+
+
+def main():
+    args = parse_args()
+    rng = np.random.default_rng(args.seed)
+    started = time.monotonic()
+
+    print(f"🔄 Generating {args.customers:,} customers and {args.purchases:,} purchases "
+          f"into {args.db}...")
+    db = prepare_database(args.db, args.force)
+    menu = db.get_menu()
+    start_ts = int(time.time()) // 86400 * 86400 - args.days * 86400
+
+    conn = open_bulk_connection(args.db)
+    try:
+        print("\n🛒 Generating purchases...")
+        aggregates = generate_purchases(conn, rng, args, menu, start_ts)
+
+        print("\n👤 Generating customers...")
+        generate_customers(conn, rng, args, start_ts, aggregates)
+    finally:
+        conn.close()
+
+    print("\n📇 Rebuilding indexes and sales rollups...")
+    db.init_database()
+    db.rebuild_sales_rollups()
+
+    stats = db.get_customer_stats()
+    print(f"\n✅ Done in {time.monotonic() - started:.1f}s")
+    print(f"   👥 Total customers: {stats['total_customers']:,}")
+    print(f"   🛒 Total purchases: {stats['total_purchases']:,}")
+    print(f"   💰 Total revenue: Rp {stats['total_revenue']:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,7 @@ import numpy as np
 import cv2
 from datetime import datetime, timedelta
 from src.database import FaceDatabase
+from src.backup import BackupManager
 
 def reset_with_dummy_data():
     """Reset database dengan 2 customers dummy + enhanced menu untuk LLM (tanpa names)."""
@@ -29,6 +30,8 @@ def reset_with_dummy_data():
     # 1. Hapus database lama
     db_path = "data/face_recognition.db" 
     if os.path.exists(db_path):
+        backup = BackupManager(db_path).backup_now()
+        print(f"💾 Backup created: {backup['name']}")
         os.remove(db_path)
         print("✅ Removed old database")
     
@@ -318,6 +321,8 @@ def add_purchase_directly(db, customer_id, menu_id, quantity, purchase_time):
             (customer_id, menu_id, quantity, total_price, purchase_time)
             VALUES (?, ?, ?, ?, ?)
         ''', (customer_id, menu_id, quantity, total_price, purchase_time.isoformat()))
+        FaceDatabase._apply_sales_rollup(cursor, menu_id, quantity, total_price,
+                                         purchase_time.isoformat())
         
         # Update customer stats
         cursor.execute('''
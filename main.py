@@ -1,5 +1,4 @@
 import argparse
-from src.app import app
 from src.config import Config
 
 if __name__ == '__main__':
@@ -8,6 +7,33 @@ if __name__ == '__main__':
                        help='Host for Flask server')
     parser.add_argument('--port', type=int, default=Config.PORT,
                        help='Port for Flask server')
+    parser.add_argument('--source', default=Config.FRAME_SOURCE,
+                       help='Frame source: device:N, file:PATH, images:DIR, synthetic[:WxH@FPS] or a stream URL')
+    parser.add_argument('--multiprocess', action='store_true',
+                       help='Run frame capture and JPEG encoding in separate processes (shared-memory ring)')
+    parser.add_argument('--api-only', action='store_true',
+                       help='Serve only the menu/mood/purchase APIs (no camera, face models not loaded)')
+    parser.add_argument('--workers', type=int, default=Config.SERVER_WORKERS,
+                       help='Worker threads for regular requests')
+    parser.add_argument('--stream-workers', type=int, default=Config.SERVER_STREAM_WORKERS,
+                       help='Threads reserved for /video_feed and SSE streams')
+    parser.add_argument('--dev', action='store_true',
+                       help='Use the Werkzeug development server (one unbounded thread per request)')
     args = parser.parse_args()
     
-    app.run(host=args.host, port=args.port, threaded=True) 
\ No newline at end of file
+    # Dibaca saat /video_feed membuka kamera
+    Config.FRAME_SOURCE = args.source
+    if args.multiprocess:
+        Config.MULTIPROCESS_PIPELINE = True
+    if args.api_only:
+        Config.VISION_ENABLED = False
+    
+    # Import setelah Config diset: app membuat VisionStack saat di-import
+    from src.app import app, stop_streams, shutdown
+    
+    if args.dev:
+        app.run(host=args.host, port=args.port, threaded=True)
+    else:
+        from src.server import serve
+        serve(app, args.host, args.port, on_drain=stop_streams, on_exit=shutdown,
+              workers=args.workers, stream_workers=args.stream_workers)
@@ -1,18 +1,27 @@
-import cv2
-from flask import Flask, Response, request, jsonify, render_template, redirect, url_for
+from flask import Flask, Response, request, jsonify, render_template, redirect, url_for, stream_with_context
+from flask import session as browser_session
 from datetime import datetime
 import time
 import os
+import hmac
+import threading
 
 from .config import Config
-from .face_processor import FaceProcessor
 from .logger import Logger
 from .state_manager import StateManager
 from .database import FaceDatabase
 from .camera_handler import CameraHandler  # Import baru
-from .recognition_handler import RecognitionHandler  # Import baru
 from .purchase_handler import PurchaseHandler  # Import baru
 from .mood_api import create_mood_api # Import baru
+from .backup import BackupManager
+from .recommender import PersonalRecommender
+from .session_store import SessionStore
+from .event_bus import EventBroker, format_sse
+from .metrics import metrics
+from .profiler import SamplingProfiler, ProfilerBusy, format_collapsed, top_functions
+from .vision import VisionStack, VisionUnavailable
+from .frame_pipeline import ProcessPipeline
+from .preview import PreviewEncoder
 
 # Tentukan path untuk templates dan static folder
 template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
@@ -21,26 +30,94 @@ app = Flask(__name__, template_folder=template_dir, static_folder=static_dir)
 app.secret_key = 'face_recognition_cafe_secret_key'
 
 # Inisialisasi komponen-komponen utama
-face_processor = FaceProcessor()  # Menangani deteksi dan pengenalan wajah
-logger = Logger()                # Menangani logging pesan
+events = EventBroker()           # Push status & log ke browser (SSE)
+logger = Logger(events)          # Menangani logging pesan
 state = StateManager()           # Mengelola state program
 db = FaceDatabase()              # Database
 
 # Initialize handlers
 camera_handler = CameraHandler(logger)
-recognition_handler = RecognitionHandler(face_processor, state, db, logger)
+# Model wajah dimuat lazy (warm-up di background); mode API-only tidak memuatnya sama sekali
+vision = VisionStack(state, db, logger)
+vision.start_warmup()
+backup_manager = BackupManager(db.db_path)
+backup_manager.start_scheduler()
+recommender = PersonalRecommender(db)
+recommender.start()
+sessions = SessionStore(db, events=events)
+profiler = SamplingProfiler()
+stopping = threading.Event()     # Diset saat server shutdown: loop video berhenti
+# Kamera, StateManager dan tracker wajah hanya ada satu per proses: satu /video_feed aktif,
+# dan state recognition milik kiosk yang terakhir membuka stream itu
+video_owner = {'kiosk_id': None, 'streaming': False}
+video_owner_lock = threading.Lock()
 
 # Register mood API blueprint
-mood_bp = create_mood_api(db)
+mood_bp = create_mood_api(db, recommender)
 app.register_blueprint(mood_bp)
 
 
-# Global variable untuk session management
-current_session = {
-    'customer_id': None,
-    'session_id': None,
-    'status': 'waiting'
-}
+def stop_streams():
+    """Ask long-lived streams (/video_feed, /api/events) to finish."""
+    stopping.set()
+    events.close()
+
+def shutdown(timeout=Config.SERVER_SHUTDOWN_TIMEOUT):
+    """Graceful shutdown: release the camera and flush pending DB writes."""
+    stop_streams()
+    camera_handler.release()
+    vision.shutdown(timeout)
+    recommender.stop()
+    backup_manager.stop_scheduler()
+    logger.log("👋 Server berhenti, antrian tulis database sudah di-flush")
+    logger.close()
+
+
+def get_kiosk_id():
+    """Resolve kiosk/till id: ?kiosk=, X-Kiosk-Id header, or remembered in the browser cookie."""
+    kiosk_id = request.args.get('kiosk') or request.headers.get('X-Kiosk-Id')
+    if kiosk_id:
+        browser_session['kiosk_id'] = kiosk_id
+        return kiosk_id
+    return browser_session.get('kiosk_id', Config.DEFAULT_KIOSK_ID)
+
+def claim_video_stream(kiosk_id):
+    """Claim the process camera for kiosk_id; None if granted, else the kiosk holding it."""
+    with video_owner_lock:
+        if video_owner['streaming']:
+            return video_owner['kiosk_id']
+        if video_owner['kiosk_id'] != kiosk_id:
+            # Sisa tracking kiosk sebelumnya tidak ikut pindah (aman: tidak ada stream yang jalan)
+            state.reset_state()
+            if vision.ready:
+                vision.face_processor.reset_tracking()
+        video_owner.update(kiosk_id=kiosk_id, streaming=True)
+        return None
+
+def release_video_stream():
+    """Mark the process camera free (stream ended or client disconnected)."""
+    with video_owner_lock:
+        video_owner['streaming'] = False
+
+def reset_recognition_state(kiosk_id):
+    """Reset tracking state, but only if it belongs to this kiosk."""
+    with video_owner_lock:
+        if video_owner['kiosk_id'] in (None, kiosk_id):
+            state.reset_state()
+
+@app.before_request
+def start_request_timer():
+    request.started_at = time.perf_counter()
+
+@app.after_request
+def record_request_timing(response):
+    # Route template (mis. /api/backups/<name>/restore) supaya label tidak meledak
+    started = getattr(request, 'started_at', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe_request(request.method, route, response.status_code,
+                                time.perf_counter() - started)
+    return response
 
 @app.route('/')
 def index():
@@ -50,63 +127,161 @@ def index():
 @app.route('/menu')
 def menu():
     """Menu selection page."""
-    if not current_session.get('customer_id'):
+    if not sessions.get(get_kiosk_id()).get('customer_id'):
         return redirect(url_for('index'))
     return render_template('menu_selection.html')
 
 @app.route('/video_feed')
 def video_feed():
     """Video streaming route."""
-    return Response(gen_frames(),
-                   mimetype='multipart/x-mixed-replace; boundary=frame')
+    if not vision.enabled:
+        return jsonify({'error': 'Video is disabled in API-only mode'}), 503
+    kiosk_id = get_kiosk_id()
+    owner = claim_video_stream(kiosk_id)
+    if owner is not None:
+        return jsonify({'error': f'Camera is already streaming for kiosk {owner}'}), 409
+    frames = gen_frames_multiprocess if Config.MULTIPROCESS_PIPELINE else gen_frames
+    response = Response(frames(kiosk_id),
+                        mimetype='multipart/x-mixed-replace; boundary=frame')
+    # call_on_close juga jalan jika generator belum sempat dimulai
+    response.call_on_close(release_video_stream)
+    return response
 
 
-def gen_frames():
+def gen_frames(kiosk_id):
     """Generate video frames - now much cleaner!"""
-    global current_session
-    
+    # Nama thread terlihat di hasil profiler; worker pool dipakai ulang, jadi dikembalikan di akhir
+    thread = threading.current_thread()
+    original_name, thread.name = thread.name, f"video-feed-{kiosk_id}"
     try:
+        # Tunggu model wajah (sudah di-warm-up di background sejak startup)
+        _, recognition_handler = vision.get()
+        
         # Initialize camera
         if not camera_handler.initialize_camera():
             return
         
-        while True:
+        preview = PreviewEncoder()
+        while not stopping.is_set():
+            frame_started = time.perf_counter()
+            
             # Read frame
             ret, frame = camera_handler.read_frame()
             if not ret or frame is None:
                 break
             
             # Process face detection and recognition
-            current_session, bbox, face_found = recognition_handler.process_face_detection(
-                frame, current_session
+            current_session = sessions.get(kiosk_id)
+            updated_session, bbox, face_found = recognition_handler.process_face_detection(
+                frame, dict(current_session)
             )
+            if updated_session != current_session:
+                sessions.update(kiosk_id, updated_session)
             
-            # Draw face rectangle if detected
-            if face_found and bbox:
-                camera_handler.draw_face_rectangle(frame, bbox, state.buffer_stable)
-            
-            # Encode and yield frame
-            frame_bytes = camera_handler.encode_frame(frame)
+            # Preview: kotak wajah digambar di salinan kecil, frame inference tidak diubah
+            frame_bytes = preview.encode(frame, bbox if face_found and bbox else None, state.buffer_stable)
+            metrics.observe('frame', time.perf_counter() - frame_started)
+            metrics.tick_frame()
             if frame_bytes:
+                sent_at = time.perf_counter()
                 yield (b'--frame\r\n'
                        b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                # yield kembali setelah server selesai menulis ke socket = kecepatan client
+                preview.report_sent(len(frame_bytes), time.perf_counter() - sent_at)
         
         camera_handler.release()
         
+    except VisionUnavailable as e:
+        logger.log(f"❌ Error: {e}", level='error')
     except Exception as e:
-        logger.log(f"❌ Error: {e}")
+        logger.log(f"❌ Error: {e}", level='error')
         camera_handler.release()
+    finally:
+        thread.name = original_name
+
+def gen_frames_multiprocess(kiosk_id):
+    """Same loop as gen_frames, with capture and JPEG encoding in separate processes."""
+    pipeline = ProcessPipeline(logger, camera_handler.source_spec)
+    thread = threading.current_thread()
+    original_name, thread.name = thread.name, f"video-feed-{kiosk_id}"
+    try:
+        _, recognition_handler = vision.get()
+        if not pipeline.start():
+            return
+        
+        # frame = view ke shared memory; slot baru dipakai ulang setelah encoder selesai
+        for index, frame in pipeline.frames():
+            if stopping.is_set():
+                break
+            current_session = sessions.get(kiosk_id)
+            updated_session, bbox, face_found = recognition_handler.process_face_detection(
+                frame, dict(current_session)
+            )
+            if updated_session != current_session:
+                sessions.update(kiosk_id, updated_session)
+            
+            pipeline.submit(index, bbox if face_found and bbox else None, state.buffer_stable)
+            metrics.tick_frame()
+            for frame_bytes in pipeline.encoded():
+                sent_at = time.perf_counter()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                pipeline.report_sent(len(frame_bytes), time.perf_counter() - sent_at)
+        
+    except VisionUnavailable as e:
+        logger.log(f"❌ Error: {e}", level='error')
+    except Exception as e:
+        logger.log(f"❌ Error: {e}", level='error')
+    finally:
+        pipeline.stop()
+        thread.name = original_name
+
+@app.route('/api/ready')
+def get_readiness():
+    """Readiness probe: 200 when this process can serve its role (vision loaded, or API-only)."""
+    status = vision.get_status()
+    ready = status['ready'] or not status['enabled']
+    return jsonify({'ready': ready, 'api': True, 'vision': status}), 200 if ready else 503
 
 @app.route('/api/recognition_status')
 def get_recognition_status():
     """Get current recognition status."""
-    return jsonify(current_session)
+    return jsonify(sessions.get(get_kiosk_id()))
+
+@app.route('/api/events')
+def stream_events():
+    """Push recognition status and logs as Server-Sent Events (replaces polling)."""
+    kiosk_id = get_kiosk_id()
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    
+    def generate():
+        q = events.subscribe()
+        try:
+            # Snapshot awal supaya UI langsung sinkron, lalu hanya perubahan
+            yield "retry: 2000\n\n"
+            yield format_sse('status', dict(sessions.get(kiosk_id), kiosk_id=kiosk_id))
+            if last_event_id is None:
+                last_seq = logger.last_seq
+                yield format_sse('logs', {'logs': logger.get_logs(), 'last_seq': last_seq}, last_seq)
+            else:
+                # Reconnect: kirim ulang log yang terlewat sejak event terakhir
+                for event in logger.get_events(since=last_event_id):
+                    yield format_sse('log', event, event['seq'])
+            yield from events.stream(q, kiosk_id=kiosk_id)
+        finally:
+            # Client putus saat snapshot: events.stream belum jalan, jadi lepas queue di sini
+            events.unsubscribe(q)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/api/menu')
 def get_menu():
     """Get menu items with recommendations."""
     try:
-        customer_id = current_session.get('customer_id')
+        kiosk_id = get_kiosk_id()
+        sessions.touch(kiosk_id)
+        customer_id = sessions.get(kiosk_id).get('customer_id')
         
         # Always get all menu items
         all_menu = db.get_menu()
@@ -122,6 +297,7 @@ def get_menu():
             return jsonify({
                 'last_purchase': last_purchase,
                 'most_popular': most_popular,
+                'personalized': recommender.recommend(customer_id),
                 'has_mood_features': has_mood_features, # ✅ Indicate if mood features are available
                 'all_menu': all_menu, # ✅ Always include all_menu
                 'customer_id': customer_id
@@ -131,6 +307,7 @@ def get_menu():
             return jsonify({
                 'last_purchase': None,
                 'most_popular': most_popular,
+                'personalized': recommender.recommend(),
                 'all_menu': all_menu,  # ✅ Always include all_menu
                 'has_mood_features': has_mood_features,
                 'customer_id': None
@@ -150,29 +327,173 @@ def get_menu():
         except:
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/stats')
+def get_stats():
+    """Get sales statistics from the rollup tables."""
+    try:
+        stats = db.get_sales_stats(
+            period=request.args.get('period', 'day'),
+            start=request.args.get('start'),
+            end=request.args.get('end'),
+            top_n=request.args.get('top', 5, type=int)
+        )
+        stats['total_customers'] = db.get_customer_stats()['total_customers']
+        return jsonify(stats)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/recommendations')
+def get_recommendations():
+    """Get precomputed personalized suggestions for a customer (default: current session)."""
+    customer_id = request.args.get('customer_id') or sessions.get(get_kiosk_id()).get('customer_id')
+    top_n = request.args.get('top', 3, type=int)
+    if top_n < 1:
+        return jsonify({'error': 'top must be at least 1'}), 400
+    return jsonify({
+        'customer_id': customer_id,
+        'recommendations': recommender.recommend(customer_id, top_n=top_n),
+        'model': recommender.get_stats()
+    })
+
 @app.route('/api/purchase', methods=['POST'])
 def make_purchase():
     """Handle purchase order."""
-    return PurchaseHandler.process_purchase(current_session, db, logger, state, request)
+    kiosk_id = get_kiosk_id()
+    current_session = sessions.get(kiosk_id)
+    # process_purchase me-reset dict session, jadi customer_id diambil lebih dulu
+    customer_id = current_session['customer_id']
+    if customer_id is not None and vision.ready:
+        # Purchase ditulis langsung: registrasi customer di write-behind harus sudah tersimpan
+        writer = vision.face_processor.writer
+        if writer.is_pending(customer_id) and not writer.wait_for_customer(customer_id, Config.WRITE_PENDING_TIMEOUT):
+            return jsonify({'error': 'Registrasi customer belum tersimpan, coba lagi'}), 503
+    response = PurchaseHandler.process_purchase(current_session, db, logger,
+                                               lambda: reset_recognition_state(kiosk_id), request)
+    if not isinstance(response, tuple):
+        # Tutup session milik purchase ini, bukan session yang kebetulan aktif sekarang
+        sessions.close(kiosk_id, 'completed', session_id=current_session['session_id'])
+        if customer_id is not None:
+            recommender.refresh_customer(customer_id)
+    return response
 
 @app.route('/api/reset_session', methods=['POST'])
 def reset_session():
     """Reset current session."""
-    global current_session
-    current_session = {'customer_id': None, 'session_id': None, 'status': 'waiting'}
-    state.reset_state()
+    kiosk_id = get_kiosk_id()
+    sessions.close(kiosk_id, 'cancelled')
+    reset_recognition_state(kiosk_id)
     return jsonify({'status': 'reset'})
 
+@app.route('/api/sessions')
+def list_sessions():
+    """List active sessions of all kiosks."""
+    return jsonify(sessions.list_sessions())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Latency histograms and FPS in Prometheus text format."""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/metrics')
+def get_metrics_summary():
+    """Latency p50/p95/p99 per stage and route, plus FPS."""
+    return jsonify(metrics.summary())
+
+def _admin_forbidden():
+    """403 response unless X-Admin-Token matches ADMIN_TOKEN (None = allowed)."""
+    # Tanpa ADMIN_TOKEN endpoint admin dimatikan sama sekali
+    token = request.headers.get('X-Admin-Token', '')
+    if not Config.ADMIN_TOKEN or not hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode()):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+@app.route('/api/admin/profile', methods=['POST'])
+def run_profile():
+    """Sample all threads for a bounded time; returns collapsed stacks (flamegraph-ready)."""
+    # Profiler membaca stack semua thread
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    
+    try:
+        result = profiler.profile(
+            seconds=request.args.get('seconds', 10.0, type=float),
+            interval=request.args.get('interval_ms', 5.0, type=float) / 1000,
+            include_idle=request.args.get('idle') == '1'
+        )
+    except ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+    
+    if request.args.get('format') == 'json':
+        stacks = result.pop('stacks')
+        result['top_functions'] = top_functions(stacks)
+        result['stacks'] = dict(stacks.most_common(200))
+        return jsonify(result)
+    
+    return Response(format_collapsed(result['stacks']), mimetype='text/plain',
+                    headers={'Content-Disposition': 'attachment; filename=profile.collapsed'})
+
+@app.route('/api/write_queue_stats')
+def get_write_queue_stats():
+    """Get write-behind queue depth and backpressure metrics."""
+    if not vision.ready:
+        return jsonify({'running': False, 'vision': vision.status})
+    return jsonify(vision.face_processor.writer.get_stats())
+
+@app.route('/api/backups', methods=['GET'])
+def list_backups():
+    """List available backups."""
+    return jsonify(backup_manager.list_backups())
+
+@app.route('/api/backups', methods=['POST'])
+def create_backup():
+    """Create a backup now (online, does not block live queries)."""
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    
+    try:
+        vision.flush_writes()
+        return jsonify(backup_manager.backup_now())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/backups/<name>/restore', methods=['POST'])
+def restore_backup(name):
+    """Restore database and face data from a backup."""
+    forbidden = _admin_forbidden()
+    if forbidden:
+        return forbidden
+    
+    try:
+        vision.flush_writes()
+        backup_manager.restore(name)
+        vision.reload_gallery()
+        recommender.rebuild()
+        return jsonify({'status': 'restored', 'name': name})
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/logs')
 def get_logs():
-    """Get current logs."""
-    return jsonify(logger.get_logs())
+    """Get current logs; with ?since=N returns structured events newer than N."""
+    since = request.args.get('since', type=int)
+    if since is None:
+        return jsonify(logger.get_logs())
+    return jsonify({
+        'events': logger.get_events(since, limit=request.args.get('limit', type=int)),
+        'last_seq': logger.last_seq
+    })
 
 # Reset database route (for development)
 @app.route('/reset_db')
 def reset_database():
     """Reset database and populate with menu items."""
-    db.reset_database()
+    vision.flush_writes()
+    db.reset_database(backup_manager)
+    recommender.rebuild()
     return jsonify({'status': 'Database reset successfully!'})
 
 @app.route('/mood-menu')
@@ -0,0 +1,219 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .config import Config
+
+
+class BackupManager:
+    """Online backup untuk database SQLite beserta folder faces/embeddings.
+
+    Database disalin dengan SQLite online backup API dalam langkah kecil
+    (beberapa page per langkah + jeda), sehingga query live tidak terblokir.
+    File wajah/embedding bersifat immutable per customer, jadi file yang sama
+    dengan backup sebelumnya cukup di-hardlink (incremental).
+    """
+
+    PREFIX = "backup_"
+    DB_FILENAME = "face_recognition.db"
+    FILE_STORES = {
+        'faces': Config.FACES_DIR,
+        'embeddings': Config.EMBEDDINGS_DIR,
+    }
+
+    def __init__(self, db_path: str = Config.DATABASE_PATH, backup_dir: str = Config.BACKUP_DIR):
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self._lock = threading.RLock()  # Satu backup/restore/reset dalam satu waktu
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.last_result = None
+        os.makedirs(backup_dir, exist_ok=True)
+
+    def backup_now(self) -> Dict:
+        """Create a new backup and apply retention."""
+        with self._lock:
+            started = time.monotonic()
+            name = f"{self.PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+            target = os.path.join(self.backup_dir, name)
+            partial = target + ".partial"
+            os.makedirs(partial, exist_ok=True)
+
+            try:
+                db_pages = self._backup_database(os.path.join(partial, self.DB_FILENAME))
+
+                previous = self._latest_backup_path()
+                files_copied, files_linked = 0, 0
+                for store, source_dir in self.FILE_STORES.items():
+                    copied, linked = self._backup_files(
+                        source_dir,
+                        os.path.join(partial, store),
+                        os.path.join(previous, store) if previous else None
+                    )
+                    files_copied += copied
+                    files_linked += linked
+
+                result = {
+                    'name': name,
+                    'created_at': datetime.now().isoformat(),
+                    'db_pages': db_pages,
+                    'files_copied': files_copied,
+                    'files_linked': files_linked,
+                    'duration_seconds': round(time.monotonic() - started, 3)
+                }
+                with open(os.path.join(partial, "manifest.json"), "w") as f:
+                    json.dump(result, f, indent=2)
+
+                # Rename terakhir agar backup yang belum selesai tidak pernah terlihat valid
+                os.rename(partial, target)
+            except Exception:
+                shutil.rmtree(partial, ignore_errors=True)
+                raise
+
+            result['removed'] = self.apply_retention()
+            self.last_result = result
+            return result
+
+    def backup_then(self, action):
+        """Create a backup, then run `action` (mis. menghapus DB) tanpa melepas lock."""
+        with self._lock:
+            result = self.backup_now()
+            action()
+            return result
+
+    def restore(self, name: str):
+        """Restore database and file stores from a backup (live DB is overwritten in place)."""
+        source = os.path.join(self.backup_dir, os.path.basename(name))
+        source_db = os.path.join(source, self.DB_FILENAME)
+        if not os.path.exists(source_db):
+            raise FileNotFoundError(f"Backup tidak ditemukan: {name}")
+
+        with self._lock:
+            src = sqlite3.connect(source_db)
+            dst = sqlite3.connect(self.db_path)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+
+            for store, target_dir in self.FILE_STORES.items():
+                store_dir = os.path.join(source, store)
+                if not os.path.isdir(store_dir):
+                    continue
+                os.makedirs(target_dir, exist_ok=True)
+                for filename in os.listdir(store_dir):
+                    shutil.copy2(os.path.join(store_dir, filename),
+                                 os.path.join(target_dir, filename))
+
+    def list_backups(self) -> List[Dict]:
+        """List completed backups, newest first."""
+        backups = []
+        for name in self._backup_names():
+            manifest_path = os.path.join(self.backup_dir, name, "manifest.json")
+            try:
+                with open(manifest_path) as f:
+                    backups.append(json.load(f))
+            except (OSError, ValueError):
+                backups.append({'name': name})
+        return backups
+
+    def apply_retention(self, keep: int = Config.BACKUP_RETENTION) -> List[str]:
+        """Delete old backups beyond the retention count."""
+        removed = []
+        for name in self._backup_names()[keep:]:
+            shutil.rmtree(os.path.join(self.backup_dir, name), ignore_errors=True)
+            removed.append(name)
+        return removed
+
+    def start_scheduler(self, interval_hours: float = Config.BACKUP_INTERVAL_HOURS):
+        """Run backup_now periodically in a background thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._schedule_loop, args=(interval_hours * 3600,),
+            name='backup-scheduler', daemon=True
+        )
+        self._thread.start()
+
+    def stop_scheduler(self):
+        """Stop the background backup thread."""
+        self._stop_event.set()
+
+    def _schedule_loop(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                result = self.backup_now()
+                print(f"💾 Backup selesai: {result['name']} ({result['duration_seconds']}s)")
+            except Exception as e:
+                print(f"❌ Backup error: {e}")
+
+    def _backup_database(self, target_path: str) -> int:
+        """Copy the live database using the online backup API in small steps."""
+        pages_done = [0]
+
+        def progress(status, remaining, total):
+            pages_done[0] = total - remaining
+
+        src = sqlite3.connect(self.db_path)
+        dst = sqlite3.connect(target_path)
+        try:
+            src.backup(dst, pages=Config.BACKUP_PAGES_PER_STEP, progress=progress,
+                       sleep=Config.BACKUP_STEP_SLEEP)
+        finally:
+            dst.close()
+            src.close()
+        return pages_done[0]
+
+    def _backup_files(self, source_dir: str, target_dir: str, previous_dir: Optional[str]):
+        """Copy new files, hardlink files unchanged since the previous backup."""
+        copied, linked = 0, 0
+        if not os.path.isdir(source_dir):
+            return copied, linked
+        os.makedirs(target_dir, exist_ok=True)
+
+        for entry in os.scandir(source_dir):
+            if not entry.is_file():
+                continue
+            target = os.path.join(target_dir, entry.name)
+            previous = os.path.join(previous_dir, entry.name) if previous_dir else None
+
+            if previous and os.path.exists(previous):
+                prev_stat = os.stat(previous)
+                stat = entry.stat()
+                if prev_stat.st_size == stat.st_size and int(prev_stat.st_mtime) == int(stat.st_mtime):
+                    try:
+                        os.link(previous, target)
+                        linked += 1
+                        continue
+                    except OSError:
+                        pass  # Filesystem tidak mendukung hardlink, salin biasa
+
+            shutil.copy2(entry.path, target)
+            copied += 1
+
+            # Beri jeda berkala supaya IO backup tidak mengganggu jalur recognition
+            if copied % 100 == 0:
+                time.sleep(Config.BACKUP_STEP_SLEEP)
+
+        return copied, linked
+
+    def _backup_names(self) -> List[str]:
+        if not os.path.isdir(self.backup_dir):
+            return []
+        names = [
+            name for name in os.listdir(self.backup_dir)
+            if name.startswith(self.PREFIX) and not name.endswith(".partial")
+            and os.path.isdir(os.path.join(self.backup_dir, name))
+        ]
+        return sorted(names, reverse=True)
+
+    def _latest_backup_path(self) -> Optional[str]:
+        names = self._backup_names()
+        return os.path.join(self.backup_dir, names[0]) if names else None
@@ -1,62 +1,76 @@
-import cv2
 import time
-from datetime import datetime
-from .config import Config
+from .metrics import metrics
 
 class CameraHandler:
-    def __init__(self, logger):
+    def __init__(self, logger, source_spec=None):
         self.logger = logger
-        self.cap = None
+        self.source_spec = source_spec  # None = Config.FRAME_SOURCE
+        self.source = None
         
     def initialize_camera(self):
-        """Initialize camera with fallback."""
-        self.cap = cv2.VideoCapture(Config.CAMERA_INDEX, Config.CAMERA_API)
-        
-        if not self.cap.isOpened():
-            self.logger.log("⚠️ External webcam tidak terdeteksi, mencoba menggunakan built-in camera...")
-            self.cap = cv2.VideoCapture(0, Config.CAMERA_API)
-            
-            if not self.cap.isOpened():
-                self.logger.log("❌ Error: Tidak ada kamera yang terdeteksi!")
-                return False
+        """Open the configured frame source and wait until it delivers frames."""
+        # OpenCV baru di-import saat kamera dibuka, bukan saat app di-import (mode API-only)
+        from .frame_sources import DeviceSource, create_frame_source
+        
+        started = time.monotonic()
+        try:
+            self.source = create_frame_source(self.source_spec)
+        except ValueError as e:
+            self.logger.log(f"❌ Error: {e}", level='error')
+            return False
+        
+        if not self.source.open():
+            self.logger.log(f"❌ Error: Sumber video {self.source.describe()} tidak bisa dibuka!", level='error')
+            return False
+        
+        if isinstance(self.source, DeviceSource):
+            if self.source.used_fallback:
+                self.logger.log("⚠️ External webcam tidak terdeteksi, menggunakan built-in camera", level='warning')
             else:
-                self.logger.log("✅ Menggunakan built-in camera")
-        else:
-            self.logger.log("✅ Menggunakan external webcam")
+                self.logger.log("✅ Menggunakan external webcam")
         
-        # Set camera properties
-        self.cap.set(cv2.CAP_PROP_FPS, Config.FPS)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+        # Tunggu frame valid pertama (kamera butuh waktu warm-up) alih-alih sleep tetap
+        if not self.source.wait_ready():
+            self.logger.log(f"❌ Error: {self.source.describe()} tidak mengirim frame", level='error')
+            self.release()
+            return False
         
-        time.sleep(2)
+        self.logger.log(f"✅ Sumber video siap: {self.source.describe()} "
+                        f"({(time.monotonic() - started) * 1000:.0f} ms)")
         return True
         
+    @metrics.timed('read_frame')
     def read_frame(self):
         """Read frame from camera with error handling."""
-        if not self.cap:
+        if not self.source:
             return None, None
-            
-        ret, frame = self.cap.read()
+        
+        ret, frame = self.source.read()
         if not ret or frame is None or frame.size == 0:
-            self.logger.log("❌ Error: Gagal membaca frame dari kamera")
+            if self.source.finished:
+                self.logger.log(f"⏹️ Sumber video selesai: {self.source.describe()}")
+            else:
+                self.logger.log("❌ Error: Gagal membaca frame dari kamera", level='error')
             return None, None
-            
+        
         return ret, frame
-    
+        
     def release(self):
         """Release camera resources."""
-        if self.cap:
-            self.cap.release()
-            
+        if self.source:
+            self.source.release()
+        
     def draw_face_rectangle(self, frame, bbox, is_stable):
         """Draw face detection rectangle."""
+        import cv2
         x1, y1, x2, y2 = bbox
         color = (0, 255, 0) if is_stable else (255, 255, 0)
         cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
         
+    @metrics.timed('encode_frame')
     def encode_frame(self, frame):
         """Encode frame to JPEG bytes."""
+        import cv2
         ret, buffer = cv2.imencode('.jpg', frame)
         if ret:
             return buffer.tobytes()
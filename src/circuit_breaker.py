@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Dict
+
+
+class CircuitBreaker:
+    """Circuit breaker sederhana untuk panggilan ke layanan upstream.
+
+    closed    -> semua panggilan diizinkan
+    open      -> panggilan ditolak sampai reset_timeout lewat
+    half_open -> satu panggilan percobaan; sukses menutup, gagal membuka lagi
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        """Check whether an upstream call may be made now."""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        """Record a successful upstream call."""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_skipped(self):
+        """Record a call that never reached upstream (mis. dibatalkan saat masih antre)."""
+        with self._lock:
+            # Hanya bebaskan slot percobaan half_open; tidak mengubah state
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed (or too slow) upstream call."""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def get_stats(self) -> Dict:
+        """Get breaker state and counters."""
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout
+            }
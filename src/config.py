@@ -1,11 +1,13 @@
 import os
-import cv2
 import platform
 
 class Config:
     # Model paths
     YOLO_MODEL_PATH = "yolov8n-face.pt"
     ARCFACE_MODEL_PATH = "iresnet100.onnx"
+    OPENVINO_DEVICE = os.environ.get("OPENVINO_DEVICE", "CPU")
+    OPENVINO_CACHE_DIR = "data/ov_cache"  # Compiled model cache, subfolder per model hash + device
+    MODEL_WARMUP = True                   # Jalankan dummy inference sebelum kiosk dilaporkan siap
     
     # Database
     DATABASE_PATH = "data/face_recognition.db"
@@ -15,6 +17,12 @@ class Config:
     EMBEDDINGS_DIR = "data/embeddings"
     BACKUP_DIR = "data/backups"
     
+    # Backup settings
+    BACKUP_INTERVAL_HOURS = 6     # Jadwal backup otomatis
+    BACKUP_RETENTION = 7          # Jumlah backup terbaru yang disimpan
+    BACKUP_PAGES_PER_STEP = 64    # Page SQLite per langkah online backup
+    BACKUP_STEP_SLEEP = 0.005     # Jeda (detik) antar langkah agar query live tidak tertahan
+    
     # Create directories
     for directory in [FACES_DIR, EMBEDDINGS_DIR, BACKUP_DIR, "data"]:
         os.makedirs(directory, exist_ok=True)
@@ -22,17 +30,39 @@ class Config:
     CAMERA_INDEX = 1  # 1 = external USB webcam, 0 = built-in MacBook camera
 
     # Auto-detect camera backend based on OS
+    # Nilai enum cv2.CAP_* ditulis langsung supaya Config tidak meng-import OpenCV (mode API-only)
     system = platform.system().lower()
     if system == "darwin":  # macOS
-        CAMERA_API = cv2.CAP_AVFOUNDATION
+        CAMERA_API = 1200  # cv2.CAP_AVFOUNDATION
     elif system == "windows":  # Windows
-        CAMERA_API = cv2.CAP_DSHOW  # DirectShow untuk Windows
+        CAMERA_API = 700   # cv2.CAP_DSHOW, DirectShow untuk Windows
     elif system == "linux":  # Linux
-        CAMERA_API = cv2.CAP_V4L2   # Video4Linux untuk Linux
+        CAMERA_API = 200   # cv2.CAP_V4L2, Video4Linux untuk Linux
     else:
-        CAMERA_API = cv2.CAP_ANY    # Fallback
+        CAMERA_API = 0     # cv2.CAP_ANY, fallback
 
     FPS = 15  # Target FPS untuk capture
+    
+    # Sumber frame: None = kamera CAMERA_INDEX; atau "device:0", "file:x.mp4",
+    # "images:folder/", "synthetic[:640x480@30]", "http://.../rtsp://..." (lihat frame_sources.py)
+    FRAME_SOURCE = os.environ.get("FRAME_SOURCE")
+    VISION_ENABLED = os.environ.get("VISION_ENABLED", "1") != "0"  # "0" = mode API-only (tanpa model wajah)
+    CAMERA_READY_TIMEOUT = 5.0  # Maksimal tunggu frame valid pertama (menggantikan sleep tetap)
+    
+    # Pipeline multi-proses: capture dan JPEG encoding di proses terpisah,
+    # frame lewat ring shared memory (lihat frame_pipeline.py)
+    MULTIPROCESS_PIPELINE = os.environ.get("MULTIPROCESS_PIPELINE", "0") == "1"
+    FRAME_RING_SLOTS = 8
+    FRAME_SLOT_SHAPE = (720, 1280, 3)  # Frame lebih besar di-downscale saat ditulis ke slot
+    
+    # Preview /video_feed (terpisah dari resolusi inference), disesuaikan per client
+    PREVIEW_WIDTH = 640                 # Lebar output, tinggi mengikuti aspect ratio
+    PREVIEW_QUALITY = 70                # Kualitas JPEG awal/maksimal
+    PREVIEW_MIN_QUALITY = 35            # Batas bawah saat client lambat
+    PREVIEW_MAX_FPS = FPS
+    PREVIEW_MIN_FPS = 3
+    PREVIEW_CHANGE_THRESHOLD = 1.5      # Beda rata-rata thumbnail (0-255) di bawah ini = tidak berubah
+    PREVIEW_KEEPALIVE_SECONDS = 2.0     # Frame yang tidak berubah tetap dikirim sesekali
     BUFFER_SIZE = FPS  # Buffer size untuk face recognition (dalam frame)
     
     # Face detection settings
@@ -51,6 +81,37 @@ class Config:
     SIM_THRESHOLD = 0.400  # Threshold untuk similarity wajah (lebih besar = lebih toleran terhadap ekspresi)
     FACE_MEMORY_SECONDS = 1.0  # Berapa detik wajah diingat setelah hilang
     
+    # Write-behind queue (tulis DB/file di background thread)
+    WRITE_QUEUE_SIZE = 256     # Maksimal operasi tulis yang menunggu sebelum loop video ikut menunggu
+    WRITE_PENDING_TIMEOUT = 5.0  # Purchase menunggu registrasi customer yang masih di antrian maksimal segini
+
+    # LLM (OpenRouter) settings - base URL bisa diarahkan ke stub server lokal untuk testing
+    LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "https://openrouter.ai/api/v1")
+    LLM_DEADLINE_SECONDS = float(os.environ.get("LLM_DEADLINE_SECONDS", 3.0))  # Batas tunggu sebelum fallback disajikan
+    LLM_TIMEOUT_SECONDS = 10.0          # Timeout HTTP client (panggilan tetap selesai di background)
+    LLM_MAX_WORKERS = 4                 # Maksimal panggilan LLM paralel
+    LLM_BREAKER_FAILURES = 3            # Gagal berturut-turut sebelum circuit breaker terbuka
+    LLM_BREAKER_RESET_SECONDS = 30.0    # Lama breaker terbuka sebelum mencoba lagi
+    LLM_BATCH_SIZE = 8                  # Maksimal input per completion pada batch recommendation
+    LLM_BATCH_DEADLINE_SECONDS = float(os.environ.get("LLM_BATCH_DEADLINE_SECONDS", 6.0))  # Satu batas tunggu untuk seluruh batch (completion lebih panjang)
+    MOOD_BATCH_MAX_INPUTS = 100         # Maksimal input per request batch
+
+    # Mood recommendation cache
+    MOOD_CACHE_SIZE = 1024              # Maksimal entry (LRU)
+    MOOD_CACHE_TTL_SECONDS = 6 * 3600   # Umur entry cache
+    MOOD_CACHE_PERSIST = True           # Simpan cache ke SQLite agar tetap hangat setelah restart
+    MENU_VERSION_CHECK_SECONDS = 5.0    # Interval cek perubahan menu
+    
+    # Local mood classifier (fast path offline sebelum LLM)
+    LOCAL_MOOD_MIN_SCORE = 0.25         # Minimal cosine score agar jawaban lokal dipakai
+    LOCAL_MOOD_MIN_MARGIN = 0.06        # Minimal selisih skor dengan kandidat kedua
+
+    # Personalized recommender (dari riwayat pembelian)
+    RECOMMENDER_REFRESH_SECONDS = 600.0   # Interval rebuild matriks affinity/co-purchase
+    RECOMMENDER_HALF_LIFE_DAYS = 90.0     # Pembelian lama bobotnya setengah setiap N hari
+    RECOMMENDER_CO_PURCHASE_WEIGHT = 0.5  # Bobot item yang sering dibeli bersama
+    RECOMMENDER_MOOD_WEIGHT = 0.5         # Bobot skor mood saat di-blend dengan skor personal
+
     # Storage settings
     OUTPUT_DIR = "saved_faces"
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -58,6 +119,29 @@ class Config:
     # Server settings
     HOST = "0.0.0.0"
     PORT = 5001
+    SERVER_WORKERS = 16                 # Thread untuk request biasa (API, halaman)
+    SERVER_QUEUE_SIZE = 64              # Koneksi yang boleh menunggu worker; lebih dari ini = 503
+    SERVER_STREAM_WORKERS = 8           # Thread khusus stream berumur panjang
+    SERVER_STREAM_PATHS = ('/video_feed', '/api/events', '/api/mood-recommendation/stream')
+    SERVER_KEEPALIVE_SECONDS = 5.0      # Koneksi idle ditutup setelah ini
+    SERVER_REQUEST_TIMEOUT = 30.0       # Timeout socket selama membaca/menulis satu request
+    SERVER_SHUTDOWN_TIMEOUT = 10.0      # Maksimal tunggu request/stream selesai saat shutdown
+
+    # Session settings (satu session per kiosk/till)
+    DEFAULT_KIOSK_ID = "default"
+    SESSION_TTL_SECONDS = 300.0         # Session tanpa aktivitas selama ini dianggap expired
     
     # UI settings
-    MAX_LOGS = 20 
\ No newline at end of file
+    MAX_LOGS = 20
+
+    # Logging (ring buffer + sink di background)
+    LOG_BUFFER_SIZE = 1000              # Event terakhir yang disimpan untuk query "since N"
+    LOG_FILE = os.environ.get("LOG_FILE")  # Opsional: tulis event sebagai JSON lines
+
+    # Metrics (latency per stage/route, endpoint /metrics)
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+    METRICS_WINDOW = 2048               # Sampel terakhir untuk p50/p95/p99 dan FPS
+
+    # Admin endpoints (profiler, backup/restore)
+    ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # Wajib dikirim sebagai header X-Admin-Token; tanpa ini endpoint admin ditolak
+    PROFILER_MAX_SECONDS = 30.0         # Batas durasi satu sampling profile 
\ No newline at end of file
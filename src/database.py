@@ -1,24 +1,43 @@
 import sqlite3
 import os
 import json
+import uuid
 from datetime import datetime
 import numpy as np
-import cv2
-from typing import Optional, List, Dict, Tuple
+from typing import Optional, List, Dict, Tuple, Iterator
 
 class FaceDatabase:
-    def __init__(self, db_path="data/face_recognition.db"):
+    MAX_TOP_N = 50  # Batas atas top item di get_sales_stats
+    
+    def __init__(self, db_path="data/face_recognition.db", faces_dir="data/faces",
+                 embeddings_dir="data/embeddings"):
         """Initialize database connection."""
         self.db_path = db_path
+        self.faces_dir = faces_dir
+        self.embeddings_dir = embeddings_dir
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self.init_database()
     
-    def reset_database(self):
-        """Reset database - DROP all tables and recreate."""
+    def reset_database(self, backup_manager=None):
+        """Reset database - DROP all tables and recreate.
+        
+        Kirim `backup_manager` milik app supaya reset tidak berjalan bersamaan
+        dengan backup terjadwal atau restore (lock yang sama).
+        """
+        def recreate():
+            if os.path.exists(self.db_path):
+                os.remove(self.db_path)
+            self.init_database()
+            self.populate_menu()
+        
         if os.path.exists(self.db_path):
-            os.remove(self.db_path)
-        self.init_database()
-        self.populate_menu()
+            # Simpan backup dulu sebelum database dihapus
+            if backup_manager is None:
+                from .backup import BackupManager
+                backup_manager = BackupManager(self.db_path)
+            backup_manager.backup_then(recreate)
+        else:
+            recreate()
         print("✅ Database reset and menu populated!")
     
     def init_database(self):
@@ -44,6 +63,24 @@ class FaceDatabase:
             )
         ''')
         
+        # Versi menu - naik otomatis setiap kali tabel menu berubah
+        # (dipakai untuk invalidasi cache rekomendasi/prompt)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS menu_version (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                version INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('INSERT OR IGNORE INTO menu_version (id, version) VALUES (1, 1)')
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS menu_version_{event.lower()}
+                AFTER {event} ON menu
+                BEGIN
+                    UPDATE menu_version SET version = version + 1 WHERE id = 1;
+                END
+            ''')
+        
         # Customers table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS customers (
@@ -78,6 +115,12 @@ class FaceDatabase:
             )
         ''')
         
+        # Index untuk riwayat pembelian per customer (terbaru dulu)
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_purchases_customer_time
+            ON purchases (customer_id, purchase_time DESC, id DESC)
+        ''')
+        
         # Face embeddings table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS face_embeddings (
@@ -89,10 +132,16 @@ class FaceDatabase:
                 quality_score REAL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 is_primary BOOLEAN DEFAULT 0,
+                embedding BLOB,
                 FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
             )
         ''')
         
+        # Database lama: tambahkan kolom embedding (float32 packed) jika belum ada
+        cursor.execute("PRAGMA table_info(face_embeddings)")
+        if 'embedding' not in [row[1] for row in cursor.fetchall()]:
+            cursor.execute('ALTER TABLE face_embeddings ADD COLUMN embedding BLOB')
+        
         # Sessions table - NEW (untuk tracking face recognition → menu)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sessions (
@@ -106,8 +155,30 @@ class FaceDatabase:
             )
         ''')
         
+        # Rollup penjualan per jam dan per hari (untuk statistik/dashboard)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sales_daily';")
+        rollups_exist = cursor.fetchone() is not None
+        
+        for table, key in (('sales_hourly', 'hour'), ('sales_daily', 'day')):
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {key} TEXT NOT NULL,
+                    menu_id INTEGER NOT NULL,
+                    order_count INTEGER DEFAULT 0,
+                    quantity INTEGER DEFAULT 0,
+                    revenue REAL DEFAULT 0.0,
+                    PRIMARY KEY ({key}, menu_id),
+                    FOREIGN KEY (menu_id) REFERENCES menu (id)
+                )
+            ''')
+        
         conn.commit()
         conn.close()
+        
+        # Database lama tanpa rollup: isi dari riwayat purchases yang ada
+        if not rollups_exist:
+            self.rebuild_sales_rollups()
+        
         # Auto-populate menu if this is a fresh database
         if not menu_exists:
             print("🍽️ Fresh database detected, populating menu...")
@@ -178,9 +249,22 @@ class FaceDatabase:
         columns = ['id', 'name', 'price', 'description', 'image_url', 'mood_tags']
         return [dict(zip(columns, row)) for row in results]
     
+    def get_menu_version(self) -> int:
+        """Get menu version counter (changes whenever the menu table changes)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT version FROM menu_version WHERE id = 1')
+        result = cursor.fetchone()
+        conn.close()
+        
+        return result[0] if result else 0
+    
     def create_session(self, customer_id: str) -> str:
         """Create new session for customer."""
-        session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{customer_id}"
+        # Suffix acak: customer yang sama bisa muncul di dua kiosk pada detik yang sama
+        session_id = (f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{customer_id}"
+                      f"_{uuid.uuid4().hex[:6]}")
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -194,8 +278,22 @@ class FaceDatabase:
         conn.close()
         
         return session_id
-    
-    def add_purchase(self, customer_id: str, menu_id: int, quantity: int = 1) -> bool:
+
+    def update_session_status(self, session_id: str, status: str):
+        """Mark a session finished with the given status (completed/cancelled/expired)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute('''
+            UPDATE sessions SET status = ?, completed_at = ?
+            WHERE session_id = ?
+        ''', (status, datetime.now().isoformat(), session_id))
+
+        conn.commit()
+        conn.close()
+
+    def add_purchase(self, customer_id: str, menu_id: int, quantity: int = 1,
+                     session_id: Optional[str] = None) -> bool:
         """Add purchase record with menu selection."""
         try:
             conn = sqlite3.connect(self.db_path)
@@ -214,9 +312,10 @@ class FaceDatabase:
             # Insert purchase
             cursor.execute('''
                 INSERT INTO purchases 
-                (customer_id, menu_id, quantity, total_price, purchase_time)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (customer_id, menu_id, quantity, total_price, now))
+                (customer_id, menu_id, quantity, total_price, purchase_time, session_id)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (customer_id, menu_id, quantity, total_price, now, session_id))
+            self._apply_sales_rollup(cursor, menu_id, quantity, total_price, now)
             
             # Update customer stats
             cursor.execute('''
@@ -235,27 +334,138 @@ class FaceDatabase:
             print(f"Error adding purchase: {e}")
             return False
     
-    def get_customer_purchases_with_menu(self, customer_id: str) -> List[Dict]:
-        """Get customer purchases with menu details."""
+    @staticmethod
+    def _apply_sales_rollup(cursor, menu_id: int, quantity: int, total_price: float,
+                            purchase_time: str):
+        """Increment hourly/daily rollups for one purchase (same transaction as the insert)."""
+        for table, key, length in (('sales_hourly', 'hour', 13), ('sales_daily', 'day', 10)):
+            cursor.execute(f'''
+                INSERT INTO {table} ({key}, menu_id, order_count, quantity, revenue)
+                VALUES (?, ?, 1, ?, ?)
+                ON CONFLICT ({key}, menu_id) DO UPDATE SET
+                    order_count = order_count + 1,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue
+            ''', (purchase_time[:length], menu_id, quantity, total_price))
+    
+    def rebuild_sales_rollups(self):
+        """Recompute rollup tables from purchases (compaction job for bulk imports)."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute('''
+        for table, key, length in (('sales_hourly', 'hour', 13), ('sales_daily', 'day', 10)):
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(f'''
+                INSERT INTO {table} ({key}, menu_id, order_count, quantity, revenue)
+                SELECT substr(purchase_time, 1, {length}), menu_id,
+                       COUNT(*), SUM(quantity), SUM(total_price)
+                FROM purchases
+                GROUP BY substr(purchase_time, 1, {length}), menu_id
+            ''')
+        
+        conn.commit()
+        conn.close()
+    
+    PURCHASE_COLUMNS = ['id', 'customer_id', 'menu_name', 'quantity', 
+                        'total_price', 'purchase_time', 'created_at']
+    
+    PURCHASE_QUERY = '''
             SELECT p.id, p.customer_id, m.name as menu_name, p.quantity, 
                    p.total_price, p.purchase_time, p.created_at
             FROM purchases p
             JOIN menu m ON p.menu_id = m.id
-            WHERE p.customer_id = ? 
-            ORDER BY p.purchase_time DESC
-        ''', (customer_id,))
+            WHERE p.customer_id = ? {where}
+            ORDER BY p.purchase_time DESC, p.id DESC
+    '''
+    
+    def get_customer_purchases_with_menu(self, customer_id: str, limit: Optional[int] = None,
+                                         offset: int = 0) -> List[Dict]:
+        """Get customer purchases with menu details (newest first, optional limit/offset)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        query = self.PURCHASE_QUERY.format(where='')
+        params = [customer_id]
+        if limit is not None:
+            query += ' LIMIT ? OFFSET ?'
+            params += [limit, offset]
+        
+        cursor.execute(query, params)
         
         results = cursor.fetchall()
         conn.close()
         
-        columns = ['id', 'customer_id', 'menu_name', 'quantity', 
-                  'total_price', 'purchase_time', 'created_at']
-        return [dict(zip(columns, row)) for row in results]
+        return [dict(zip(self.PURCHASE_COLUMNS, row)) for row in results]
+    
+    def get_customer_purchases_page(self, customer_id: str, limit: int = 20,
+                                    before: Optional[Tuple[str, int]] = None) -> Dict:
+        """Get one page of purchases using keyset pagination.
+        
+        `before` adalah cursor (purchase_time, id) dari `next_cursor` halaman sebelumnya.
+        """
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        if before:
+            query = self.PURCHASE_QUERY.format(
+                where='AND (p.purchase_time < ? OR (p.purchase_time = ? AND p.id < ?))')
+            params = [customer_id, before[0], before[0], before[1]]
+        else:
+            query = self.PURCHASE_QUERY.format(where='')
+            params = [customer_id]
+        
+        cursor.execute(query + ' LIMIT ?', params + [limit])
+        
+        results = cursor.fetchall()
+        conn.close()
+        
+        items = [dict(zip(self.PURCHASE_COLUMNS, row)) for row in results]
+        next_cursor = None
+        if len(items) == limit:
+            next_cursor = (items[-1]['purchase_time'], items[-1]['id'])
+        
+        return {'items': items, 'next_cursor': next_cursor}
     
+    def iter_customer_purchases(self, customer_id: str, batch_size: int = 500) -> Iterator[Dict]:
+        """Stream all purchases of a customer in batches (for exports)."""
+        cursor_key = None
+        while True:
+            page = self.get_customer_purchases_page(customer_id, batch_size, cursor_key)
+            yield from page['items']
+            cursor_key = page['next_cursor']
+            if cursor_key is None:
+                return
+
+    def iter_purchase_affinity(self, customer_id: Optional[str] = None,
+                               batch_size: int = 50000) -> Iterator[List[Tuple]]:
+        """Stream per (customer, menu) purchase aggregates in batches.
+
+        Rows: (customer_id, menu_id, total_quantity, days_since_last_purchase).
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        where = 'WHERE customer_id = ?' if customer_id else ''
+        cursor.execute(f'''
+            SELECT customer_id, menu_id, SUM(quantity),
+                julianday('now', 'localtime') - julianday(MAX(purchase_time))
+            FROM purchases
+            {where}
+            GROUP BY customer_id, menu_id
+        ''', (customer_id,) if customer_id else ())
+
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
     # Keep all other existing methods...
     def add_customer(self, customer_id: str, face_image: np.ndarray, 
                     embedding: np.ndarray, confidence: float = 0.0) -> bool:
@@ -265,12 +475,13 @@ class FaceDatabase:
             cursor = conn.cursor()
             
             # Save face image and embedding
-            face_path = f"data/faces/{customer_id}.jpg"
-            embedding_path = f"data/embeddings/{customer_id}.npy"
+            face_path = f"{self.faces_dir}/{customer_id}.jpg"
+            embedding_path = f"{self.embeddings_dir}/{customer_id}.npy"
             
-            os.makedirs("data/faces", exist_ok=True)
-            os.makedirs("data/embeddings", exist_ok=True)
+            os.makedirs(self.faces_dir, exist_ok=True)
+            os.makedirs(self.embeddings_dir, exist_ok=True)
             
+            import cv2  # Lazy: hanya jalur registrasi wajah yang butuh OpenCV
             cv2.imwrite(face_path, face_image)
             np.save(embedding_path, embedding)
             
@@ -286,9 +497,9 @@ class FaceDatabase:
             # Insert face embedding
             cursor.execute('''
                 INSERT INTO face_embeddings 
-                (customer_id, embedding_path, face_image_path, confidence_score, is_primary)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (customer_id, embedding_path, face_path, confidence, 1))
+                (customer_id, embedding_path, face_image_path, confidence_score, is_primary, embedding)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (customer_id, embedding_path, face_path, confidence, 1, self.pack_embedding(embedding)))
             
             conn.commit()
             conn.close()
@@ -321,7 +532,7 @@ class FaceDatabase:
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT customer_id, embedding_path FROM face_embeddings 
+            SELECT customer_id, embedding_path, embedding FROM face_embeddings 
             WHERE is_primary = 1
         ''')
         
@@ -329,13 +540,25 @@ class FaceDatabase:
         conn.close()
         
         embeddings = []
-        for customer_id, embedding_path in results:
-            if os.path.exists(embedding_path):
+        for customer_id, embedding_path, packed in results:
+            if packed is not None:
+                embeddings.append((customer_id, self.unpack_embedding(packed)))
+            elif embedding_path and os.path.exists(embedding_path):
                 embedding = np.load(embedding_path)
                 embeddings.append((customer_id, embedding))
         
         return embeddings
     
+    @staticmethod
+    def pack_embedding(embedding: np.ndarray) -> bytes:
+        """Pack embedding as raw float32 bytes for the embedding BLOB column."""
+        return np.asarray(embedding, dtype=np.float32).ravel().tobytes()
+    
+    @staticmethod
+    def unpack_embedding(packed: bytes) -> np.ndarray:
+        """Unpack embedding BLOB back to a float32 vector."""
+        return np.frombuffer(packed, dtype=np.float32).copy()
+    
     def update_visit(self, customer_id: str):
         """Update customer last visit."""
         conn = sqlite3.connect(self.db_path)
@@ -363,20 +586,17 @@ class FaceDatabase:
         cursor.execute('SELECT COUNT(*) FROM customers WHERE is_active = 1')
         stats['total_customers'] = cursor.fetchone()[0]
         
-        # Total purchases
-        cursor.execute('SELECT COUNT(*) FROM purchases')
-        stats['total_purchases'] = cursor.fetchone()[0]
-        
-        # Total revenue
-        cursor.execute('SELECT SUM(total_price) FROM purchases')
-        result = cursor.fetchone()[0]
-        stats['total_revenue'] = result if result else 0.0
+        # Total purchases & revenue (dari rollup harian)
+        cursor.execute('SELECT SUM(order_count), SUM(revenue) FROM sales_daily')
+        total_purchases, total_revenue = cursor.fetchone()
+        stats['total_purchases'] = total_purchases or 0
+        stats['total_revenue'] = total_revenue if total_revenue else 0.0
         
         # Popular menu items
         cursor.execute('''
-            SELECT m.name, COUNT(p.id) as order_count, SUM(p.total_price) as revenue
-            FROM purchases p
-            JOIN menu m ON p.menu_id = m.id
+            SELECT m.name, SUM(s.order_count) as order_count, SUM(s.revenue) as revenue
+            FROM sales_daily s
+            JOIN menu m ON s.menu_id = m.id
             GROUP BY m.id, m.name
             ORDER BY order_count DESC
             LIMIT 5
@@ -386,6 +606,75 @@ class FaceDatabase:
         conn.close()
         return stats
     
+    def get_sales_stats(self, period: str = 'day', start: Optional[str] = None,
+                        end: Optional[str] = None, top_n: int = 5) -> Dict:
+        """Get totals, revenue per period and top items from the rollup tables.
+        
+        `period` adalah 'hour' atau 'day'; `start`/`end` berupa prefix ISO
+        (mis. '2025-09-01' atau '2025-09-01T08') dan inklusif: `end` mencakup
+        seluruh periode yang diawali prefix itu. `top_n` dibatasi ke 1..MAX_TOP_N.
+        """
+        if period not in ('hour', 'day'):
+            raise ValueError(f"Unknown period: {period}")
+        table = 'sales_hourly' if period == 'hour' else 'sales_daily'
+        length = 13 if period == 'hour' else 10
+        top_n = max(1, min(top_n, self.MAX_TOP_N))
+        
+        where, params = [], []
+        if start:
+            where.append(f'{period} >= ?')
+            params.append(start[:length])
+        if end:
+            # Bandingkan dengan awal prefix berikutnya: '2025-09-01' -> '2025-09-02'
+            # (leksikal), jadi semua jam '2025-09-01Txx' ikut terhitung
+            prefix = end[:length]
+            where.append(f'{period} < ?')
+            params.append(prefix[:-1] + chr(ord(prefix[-1]) + 1))
+        where_sql = ('WHERE ' + ' AND '.join(where)) if where else ''
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f'''
+            SELECT SUM(order_count), SUM(quantity), SUM(revenue)
+            FROM {table} {where_sql}
+        ''', params)
+        orders, quantity, revenue = cursor.fetchone()
+        
+        cursor.execute(f'''
+            SELECT {period}, SUM(order_count), SUM(quantity), SUM(revenue)
+            FROM {table} {where_sql}
+            GROUP BY {period}
+            ORDER BY {period}
+        ''', params)
+        by_period = [dict(zip(['period', 'orders', 'quantity', 'revenue'], row))
+                     for row in cursor.fetchall()]
+        
+        cursor.execute(f'''
+            SELECT m.id, m.name, SUM(s.order_count) as orders, SUM(s.quantity), SUM(s.revenue)
+            FROM {table} s
+            JOIN menu m ON s.menu_id = m.id
+            {where_sql}
+            GROUP BY m.id, m.name
+            ORDER BY orders DESC
+            LIMIT ?
+        ''', params + [top_n])
+        top_items = [dict(zip(['id', 'name', 'orders', 'quantity', 'revenue'], row))
+                     for row in cursor.fetchall()]
+        
+        conn.close()
+        
+        return {
+            'period': period,
+            'totals': {
+                'orders': orders or 0,
+                'quantity': quantity or 0,
+                'revenue': revenue or 0.0
+            },
+            'revenue_by_period': by_period,
+            'top_items': top_items
+        }
+    
     def get_last_purchase_item(self, customer_id: str) -> Optional[Dict]:
         """Get customer's last purchased menu item."""
         conn = sqlite3.connect(self.db_path)
@@ -397,7 +686,7 @@ class FaceDatabase:
             FROM purchases p
             JOIN menu m ON p.menu_id = m.id
             WHERE p.customer_id = ? 
-            ORDER BY p.purchase_time DESC
+            ORDER BY p.purchase_time DESC, p.id DESC
             LIMIT 1
         ''', (customer_id,))
         
@@ -417,10 +706,10 @@ class FaceDatabase:
         
         cursor.execute('''
             SELECT m.id, m.name, m.price, m.description, m.image_url,
-                COUNT(p.id) as total_orders,
-                SUM(p.quantity) as total_quantity
+                COALESCE(SUM(s.order_count), 0) as total_orders,
+                SUM(s.quantity) as total_quantity
             FROM menu m
-            LEFT JOIN purchases p ON m.id = p.menu_id
+            LEFT JOIN sales_daily s ON m.id = s.menu_id
             WHERE m.is_available = 1
             GROUP BY m.id, m.name, m.price, m.description, m.image_url
             ORDER BY total_orders DESC, total_quantity DESC
@@ -0,0 +1,101 @@
+import json
+import queue
+import threading
+from typing import Dict, Iterator, Optional
+
+
+class EventBroker:
+    """Pub/sub sederhana untuk Server-Sent Events.
+
+    Setiap subscriber punya queue sendiri yang dibatasi; kalau client lambat,
+    event terlama dibuang supaya publisher (loop video, logger) tidak pernah
+    menunggu.
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.closed = False
+
+    def subscribe(self) -> queue.Queue:
+        """Register a new subscriber queue."""
+        q = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.add(q)
+        if self.closed:
+            q.put_nowait(None)
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        """Remove a subscriber queue."""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def publish(self, event: str, data: Dict):
+        """Send an event to every subscriber without blocking."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self.published += 1
+        for q in subscribers:
+            self._put(q, (event, data))
+
+    def close(self):
+        """End every open stream (used on server shutdown)."""
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            self._put(q, None)
+
+    def _put(self, q: queue.Queue, item):
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    q.get_nowait()
+                    with self._lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def stream(self, q: queue.Queue, heartbeat: float = 15.0,
+               kiosk_id: Optional[str] = None) -> Iterator[str]:
+        """Yield SSE-formatted events from a subscriber queue (with keep-alive comments).
+
+        Event yang membawa kiosk_id lain dilewati.
+        """
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    return
+                event, data = item
+                if kiosk_id and data.get('kiosk_id') not in (None, kiosk_id):
+                    continue
+                yield format_sse(event, data, data.get('seq'))
+        finally:
+            self.unsubscribe(q)
+
+    def get_stats(self) -> Dict:
+        """Get subscriber and delivery counters."""
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'dropped': self.dropped
+            }
+
+
+def format_sse(event: str, data: Dict, event_id=None) -> str:
+    """Format one Server-Sent Event."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}event: {event}\ndata: {json.dumps(data)}\n\n"
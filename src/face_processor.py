@@ -4,27 +4,41 @@ from ultralytics import YOLO
 from openvino import Core
 from scipy.spatial.distance import cosine
 from datetime import datetime
+import hashlib
 import os
+import shutil
+import time
 from .config import Config
 from .database import FaceDatabase
+from .write_behind import WriteBehindWriter
+from .metrics import metrics
 import mediapipe as mp
 import numpy as np
 import cv2
 
 class FaceProcessor:
-    def __init__(self):
+    def __init__(self, db=None):
+        self.startup_timings = {}  # Durasi tiap fase startup (ms)
+        
         # Initialize YOLO model
+        started = time.perf_counter()
         self.model_yolo = YOLO(Config.YOLO_MODEL_PATH, verbose=False)
+        self._record_phase('load_yolo', started)
         
-        # Initialize ArcFace model
+        # Initialize ArcFace model (compiled blob di-cache di disk, restart berikutnya tidak compile ulang)
+        started = time.perf_counter()
         ie = Core()
-        ov_model = ie.read_model(model=Config.ARCFACE_MODEL_PATH)
-        self.compiled_model = ie.compile_model(model=ov_model, device_name="CPU")
+        cache_dir = model_cache_dir(Config.ARCFACE_MODEL_PATH, Config.OPENVINO_DEVICE)
+        self.compiled_model = ie.compile_model(Config.ARCFACE_MODEL_PATH, Config.OPENVINO_DEVICE,
+                                               {"CACHE_DIR": cache_dir})
         self.input_layer = self.compiled_model.input(0)
         self.output_layer = self.compiled_model.output(0)
+        self._record_phase('compile_arcface', started)
         
         # Initialize database instead of file system
-        self.db = FaceDatabase()
+        started = time.perf_counter()
+        self.db = db or FaceDatabase()
+        self.writer = WriteBehindWriter(self.db)  # Tulis DB/file di background
 
         # Initialize buffers and state
         self.embedding_buffer = []
@@ -34,8 +48,10 @@ class FaceProcessor:
         self.error_count = 0
         self.face_changed = False  # Flag untuk menandai pergantian wajah
         self.saved_records = self.load_saved_records()
+        self._record_phase('load_gallery', started)
         
         # Initialize MediaPipe Face Mesh
+        started = time.perf_counter()
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
@@ -44,6 +60,30 @@ class FaceProcessor:
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
+        self._record_phase('init_mediapipe', started)
+    
+    def _record_phase(self, phase, started):
+        self.startup_timings[phase] = round((time.perf_counter() - started) * 1000, 1)
+    
+    def warmup(self, width=1280, height=720):
+        """Run dummy inputs through YOLO, ArcFace and MediaPipe.
+        
+        Inference pertama tiap model jauh lebih lambat (alokasi, graph
+        optimization); dibayar di sini, bukan oleh customer pertama.
+        Memanggil model langsung, jadi state tracking dan metrics tidak berubah.
+        """
+        started = time.perf_counter()
+        self.model_yolo(np.full((height, width, 3), 114, dtype=np.uint8), verbose=False)
+        self._record_phase('warmup_yolo', started)
+        
+        started = time.perf_counter()
+        self.compiled_model({self.input_layer: self.preprocess_face(np.zeros((112, 112, 3), dtype=np.uint8))})
+        self._record_phase('warmup_arcface', started)
+        
+        started = time.perf_counter()
+        self.face_mesh.process(np.zeros((112, 112, 3), dtype=np.uint8))
+        self._record_phase('warmup_mediapipe', started)
+        return self.startup_timings
         
     def load_saved_records(self):
         """Load saved face embeddings from database."""
@@ -75,6 +115,7 @@ class FaceProcessor:
             
         return True
     
+    @metrics.timed('detect_faces')
     def detect_faces(self, frame):
         """Detect faces and return the best one based on confidence and size."""
         results = self.model_yolo(frame, verbose=False)
@@ -111,6 +152,7 @@ class FaceProcessor:
         face = (face - 0.5)/0.5
         return np.transpose(face, (2,0,1))[None,:,:,:]
     
+    @metrics.timed('align_face')
     def align_face(self, frame, bbox):
         try:
             # ArcFace 5-point template
@@ -159,6 +201,7 @@ class FaceProcessor:
             print(f"Face alignment failed: {str(e)}")
             return cv2.resize(face_img, (112, 112))
     
+    @metrics.timed('process_face')
     def process_face(self, frame, bbox):
         """Extract embedding from face image with alignment."""
         # Align face first
@@ -169,6 +212,7 @@ class FaceProcessor:
         out = self.compiled_model({self.input_layer: inp})
         return out[self.output_layer][0]
     
+    @metrics.timed('find_visit')
     def find_visit(self, emb):
         """Find if embedding matches any saved records."""
         best_match = (False, None, 1.0)  # (found, customer_id, similarity)
@@ -178,6 +222,15 @@ class FaceProcessor:
                 best_match = (True, customer_id, similarity)
         return best_match
     
+    def reset_tracking(self):
+        """Forget the currently tracked face (buffer, reference and counters)."""
+        self.embedding_buffer.clear()
+        self.error_count = 0
+        self.no_face_counter = 0
+        self.current_face_id = None
+        self.reference_embedding = None
+        self.face_changed = False
+    
     def update_buffer(self, current_emb=None):
         """Update embedding buffer and check stability."""
         if current_emb is None:
@@ -185,12 +238,7 @@ class FaceProcessor:
             self.no_face_counter += 1
             if self.no_face_counter >= Config.BUFFER_SIZE:
                 # Reset everything if no face for full buffer duration
-                self.embedding_buffer.clear()
-                self.error_count = 0
-                self.no_face_counter = 0
-                self.current_face_id = None
-                self.reference_embedding = None
-                self.face_changed = False
+                self.reset_tracking()
                 return True  # Signal to reset state
             return False
             
@@ -238,14 +286,20 @@ class FaceProcessor:
         quality_score = self.calculate_quality_score(face_img)
         confidence_score = 0.9  # Default high confidence for saved faces
         
-        # Save to database
-        success = self.db.add_customer(customer_id, face_img, embedding, confidence_score)
-        
-        if success:
-            # Update in-memory records
-            self.saved_records.append((customer_id, embedding))
-            return customer_id
-        return None
+        # Update in-memory records langsung agar recognition tetap benar,
+        # penulisan ke database/disk dilakukan oleh write-behind queue
+        record = (customer_id, embedding)
+        self.saved_records.append(record)
+        self.writer.add_customer(customer_id, face_img.copy(), embedding, confidence_score,
+                                 on_failure=lambda: self._forget_record(record))
+        return customer_id
+    
+    def _forget_record(self, record):
+        """Drop an in-memory embedding whose registration failed to save."""
+        try:
+            self.saved_records.remove(record)
+        except ValueError:
+            pass
     
     def calculate_quality_score(self, face_img):
         """Calculate face quality score.""" # <-- Add this method
@@ -271,4 +325,25 @@ class FaceProcessor:
         size_factor = min(w * h / (150 * 150), 1.0)
         
         return np.mean([blur_factor, brightness_factor, size_factor])
-    
\ No newline at end of file
+    
+
+
+def model_cache_dir(model_path, device):
+    """OpenVINO cache folder for this exact model file and device.
+    
+    Model yang di-update mendapat folder baru; folder lama untuk model dan
+    device yang sama dihapus supaya cache tidak menumpuk. Kunci folder dari
+    (path, ukuran, mtime), bukan isi file, supaya boot tidak membaca ulang
+    seluruh model hanya untuk hashing.
+    """
+    stat = os.stat(model_path)
+    key = f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    digest = hashlib.sha256(key.encode())
+    prefix = f"{os.path.splitext(os.path.basename(model_path))[0]}-{device}-"
+    name = prefix + digest.hexdigest()[:16]
+    
+    os.makedirs(Config.OPENVINO_CACHE_DIR, exist_ok=True)
+    for entry in os.listdir(Config.OPENVINO_CACHE_DIR):
+        if entry.startswith(prefix) and entry != name:
+            shutil.rmtree(os.path.join(Config.OPENVINO_CACHE_DIR, entry), ignore_errors=True)
+    return os.path.join(Config.OPENVINO_CACHE_DIR, name)
@@ -0,0 +1,296 @@
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from .config import Config
+from .metrics import metrics
+from .preview import PreviewEncoder
+
+# Kolom metadata per slot (int64), disimpan di shared memory yang sama dengan frame
+SEQ, HEIGHT, WIDTH, CAPTURED_NS, READ_NS, X1, Y1, X2, Y2, FLAGS = range(10)
+META_COLUMNS = 10
+DRAW_BOX, STABLE = 1, 2
+
+# Penanda di queue (index slot selalu >= 0)
+CLOSED = -1
+
+
+class FrameRing:
+    """Ring of preallocated BGR frame slots in one shared memory block.
+
+    Pemilik (name=None) membuat dan nanti unlink block-nya; proses lain
+    attach dengan nama yang sama. Frame dibaca sebagai NumPy view langsung
+    ke shared memory, tanpa pickle atau copy. Yang lewat queue hanya index slot.
+    """
+
+    def __init__(self, slots: int = Config.FRAME_RING_SLOTS,
+                 slot_shape: Tuple[int, int, int] = Config.FRAME_SLOT_SHAPE, name: Optional[str] = None):
+        self.slots = slots
+        self.slot_shape = tuple(slot_shape)
+        self.slot_bytes = int(np.prod(self.slot_shape))
+        meta_bytes = slots * META_COLUMNS * 8
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(
+            name=name, create=self.owner, size=meta_bytes + slots * self.slot_bytes if self.owner else 0)
+        self.meta = np.ndarray((slots, META_COLUMNS), dtype=np.int64, buffer=self.shm.buf)
+        self._data = np.ndarray((slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=meta_bytes)
+        if self.owner:
+            self.meta[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def frame(self, index: int) -> np.ndarray:
+        """Contiguous (h, w, 3) view of the frame stored in a slot."""
+        height, width = int(self.meta[index, HEIGHT]), int(self.meta[index, WIDTH])
+        return self._data[index, :height * width * 3].reshape(height, width, 3)
+
+    def write(self, index: int, frame: np.ndarray, seq: int, read_ns: int = 0):
+        """Store a captured frame in a slot (downscaled if it is larger than the slot)."""
+        height, width = frame.shape[:2]
+        max_height, max_width = self.slot_shape[:2]
+        scale = min(max_height / height, max_width / width, 1.0)
+        if scale < 1.0:
+            height, width = int(height * scale), int(width * scale)
+
+        row = self.meta[index]
+        row[SEQ], row[HEIGHT], row[WIDTH] = seq, height, width
+        row[CAPTURED_NS], row[READ_NS], row[FLAGS] = time.monotonic_ns(), read_ns, 0
+        view = self.frame(index)
+        if scale < 1.0:
+            import cv2  # Lazy: dipanggil di proses capture, app.py tidak perlu OpenCV
+            cv2.resize(frame, (width, height), dst=view, interpolation=cv2.INTER_AREA)
+        else:
+            view[:] = frame
+
+    def annotate(self, index: int, bbox=None, stable: bool = False):
+        """Record the face box for the encoder (drawn there, not in the inference process)."""
+        row = self.meta[index]
+        if bbox is None:
+            row[FLAGS] = 0
+            return
+        row[X1], row[Y1], row[X2], row[Y2] = bbox
+        row[FLAGS] = DRAW_BOX | (STABLE if stable else 0)
+
+    def close(self):
+        self.meta = self._data = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # Masih ada view yang hidup; mapping dilepas saat proses selesai
+        if self.owner:
+            self.shm.unlink()
+
+
+class ProcessPipeline:
+    """Capture dan JPEG encoding di proses terpisah, inference di proses ini.
+
+    capture process  --index-->  inference (gen_frames)  --index-->  encoder process
+          ^                                                                |
+          +--------------------------- slot bebas ------------------------+
+
+    State recognition (session, database, logger) tetap di proses Flask;
+    hanya index slot yang lewat queue, ke arah balik hanya JPEG hasil encode.
+    Inference selalu mengambil frame terbaru; frame lama yang belum sempat
+    diproses langsung dikembalikan ke ring.
+    """
+
+    def __init__(self, logger, source_spec: Optional[str] = None, slots: int = Config.FRAME_RING_SLOTS,
+                 slot_shape: Tuple[int, int, int] = Config.FRAME_SLOT_SHAPE):
+        self.logger = logger
+        # Proses spawn tidak ikut perubahan Config saat runtime (--source), jadi spec dikirim eksplisit
+        self.source_spec = source_spec if source_spec is not None else Config.FRAME_SOURCE
+        self.slots = slots
+        self.slot_shape = tuple(slot_shape)
+        self.ring = None
+        self.processes = []
+        self.skipped = 0
+
+    def start(self) -> bool:
+        """Start the capture and encoder processes and wait for the first frame."""
+        ctx = mp.get_context('spawn')
+        self.ring = FrameRing(self.slots, self.slot_shape)
+        self.free_q, self.ready_q, self.encode_q, self.out_q, self.status_q, self.feedback_q = (
+            ctx.Queue() for _ in range(6))
+        for index in range(self.slots):
+            self.free_q.put(index)
+        self.stop_event = ctx.Event()
+
+        self.capture = ctx.Process(
+            target=_capture_main, name='frame-capture', daemon=True,
+            args=(self.ring.name, self.slots, self.slot_shape, self.source_spec,
+                  self.free_q, self.ready_q, self.status_q, self.stop_event))
+        self.encoder = ctx.Process(
+            target=_encoder_main, name='frame-encoder', daemon=True,
+            args=(self.ring.name, self.slots, self.slot_shape, self.encode_q, self.free_q, self.out_q,
+                  self.feedback_q))
+        self.processes = [self.capture, self.encoder]
+        for process in self.processes:
+            process.start()
+
+        started = time.monotonic()
+        try:
+            # Spawn + import cv2 di proses baru butuh waktu, di atas timeout kamera
+            ok, description = self.status_q.get(timeout=Config.CAMERA_READY_TIMEOUT + 10)
+        except queue.Empty:
+            ok, description = False, 'capture process'
+        if not ok:
+            self.logger.log(f"❌ Error: Sumber video {description} tidak bisa dibuka!", level='error')
+            self.stop()
+            return False
+
+        self.logger.log(f"✅ Sumber video siap: {description} (capture + encoder di proses terpisah, "
+                        f"{(time.monotonic() - started) * 1000:.0f} ms)")
+        return True
+
+    def frames(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (slot index, frame view) of the newest captured frame until the source ends."""
+        while True:
+            try:
+                index = self.ready_q.get(timeout=1.0)
+            except queue.Empty:
+                if not self.capture.is_alive():
+                    return
+                continue
+
+            closed = index == CLOSED
+            while not closed:
+                try:
+                    newer = self.ready_q.get_nowait()
+                except queue.Empty:
+                    break
+                if newer == CLOSED:
+                    closed = True
+                    break
+                self.free_q.put(index)
+                self.skipped += 1
+                index = newer
+
+            if index != CLOSED:
+                metrics.observe('read_frame', int(self.ring.meta[index, READ_NS]) / 1e9)
+                yield index, self.ring.frame(index)
+            if closed:
+                self.logger.log("⏹️ Sumber video selesai")
+                return
+
+    def submit(self, index: int, bbox=None, stable: bool = False):
+        """Hand a processed slot to the encoder process (preview encoder: downscale, box, JPEG)."""
+        self.ring.annotate(index, bbox, stable)
+        self.encode_q.put(index)
+
+    def encoded(self) -> Iterator[bytes]:
+        """JPEG frames finished by the encoder so far (non-blocking)."""
+        while True:
+            try:
+                item = self.out_q.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                return
+            frame_bytes, captured_ns, encode_ns = item
+            metrics.observe('encode_frame', encode_ns / 1e9)
+            # Di mode ini 'frame' = latency capture sampai JPEG siap (termasuk antrian)
+            metrics.observe('frame', (time.monotonic_ns() - captured_ns) / 1e9)
+            yield frame_bytes
+
+    def report_sent(self, nbytes: int, seconds: float):
+        """Forward client drain time to the encoder process (see PreviewEncoder.report_sent)."""
+        self.feedback_q.put((nbytes, seconds))
+
+    def stop(self):
+        """Stop both processes and release the shared memory."""
+        if not self.processes:
+            return
+        self.stop_event.set()
+        self.encode_q.put(CLOSED)
+        for process in self.processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        for q in (self.free_q, self.ready_q, self.encode_q, self.out_q, self.status_q, self.feedback_q):
+            q.cancel_join_thread()
+            q.close()
+        self.processes = []
+        self.ring.close()
+
+    def get_stats(self):
+        return {
+            'slots': self.slots,
+            'slot_shape': list(self.slot_shape),
+            'skipped_frames': self.skipped,
+            'processes': {p.name: p.pid for p in self.processes}
+        }
+
+
+def _capture_main(ring_name, slots, slot_shape, source_spec, free_q, ready_q, status_q, stop_event):
+    """Capture process: read frames into free slots and publish their indices."""
+    from .frame_sources import create_frame_source
+    
+    ring = FrameRing(slots, slot_shape, name=ring_name)
+    source = None
+    try:
+        try:
+            source = create_frame_source(source_spec)
+        except ValueError as e:
+            status_q.put((False, str(e)))
+            return
+        if not source.open() or not source.wait_ready():
+            status_q.put((False, source.describe()))
+            return
+        status_q.put((True, source.describe()))
+
+        seq = 0
+        while not stop_event.is_set():
+            started = time.monotonic_ns()
+            ret, frame = source.read()
+            read_ns = time.monotonic_ns() - started
+            if not ret or frame is None or frame.size == 0:
+                break
+            try:
+                index = free_q.get_nowait()
+            except queue.Empty:
+                continue  # Semua slot sedang dipakai: frame ini dibuang, kamera tetap dikuras
+            seq += 1
+            ring.write(index, frame, seq, read_ns)
+            ready_q.put(index)
+    finally:
+        if source is not None:
+            source.release()
+        ready_q.put(CLOSED)
+        ring.close()
+
+
+def _encoder_main(ring_name, slots, slot_shape, encode_q, free_q, out_q, feedback_q):
+    """Encoder process: encode the slot as a preview frame and free it."""
+    ring = FrameRing(slots, slot_shape, name=ring_name)
+    preview = PreviewEncoder()
+    try:
+        while True:
+            index = encode_q.get()
+            if index == CLOSED:
+                break
+            while True:
+                try:
+                    preview.report_sent(*feedback_q.get_nowait())
+                except queue.Empty:
+                    break
+
+            row = ring.meta[index]
+            bbox = (int(row[X1]), int(row[Y1]), int(row[X2]), int(row[Y2])) if row[FLAGS] & DRAW_BOX else None
+            started = time.monotonic_ns()
+            frame_bytes = preview.encode(ring.frame(index), bbox, bool(row[FLAGS] & STABLE))
+            encode_ns = time.monotonic_ns() - started
+            captured_ns = int(row[CAPTURED_NS])
+            del row
+            free_q.put(index)
+            if frame_bytes:
+                out_q.put((frame_bytes, captured_ns, encode_ns))
+    finally:
+        out_q.put(None)
+        ring.close()
@@ -0,0 +1,295 @@
+import os
+import time
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .config import Config
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+class FrameSource:
+    """Sumber frame untuk pipeline (kamera, file, folder gambar, generator, stream).
+
+    open() menyiapkan sumber, wait_ready() menunggu frame valid pertama
+    (menggantikan sleep tetap), read() mengembalikan (ret, frame) seperti
+    cv2.VideoCapture. `finished` True jika sumber memang sudah habis
+    (akhir file), bukan error.
+    """
+
+    name = 'source'
+
+    def __init__(self):
+        self.fps = Config.FPS
+        self.finished = False
+        self._first_frame = None
+
+    def open(self) -> bool:
+        return True
+
+    def wait_ready(self, timeout: float = Config.CAMERA_READY_TIMEOUT) -> bool:
+        """Poll until the source delivers a valid frame (kept for the first read)."""
+        deadline = time.monotonic() + timeout
+        while True:
+            ret, frame = self._read()
+            if ret and frame is not None and frame.size > 0:
+                self._first_frame = frame
+                return True
+            if self.finished or time.monotonic() >= deadline:
+                return False
+            time.sleep(0.02)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        if self._first_frame is not None:
+            frame, self._first_frame = self._first_frame, None
+            return True, frame
+        return self._read()
+
+    def _read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def describe(self) -> str:
+        return self.name
+
+
+class CaptureSource(FrameSource):
+    """Base untuk sumber berbasis cv2.VideoCapture."""
+
+    def __init__(self):
+        super().__init__()
+        self.cap = None
+
+    def _read(self):
+        if self.cap is None:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class DeviceSource(CaptureSource):
+    """Kamera lokal (V4L2 di Linux), dengan fallback ke index lain."""
+
+    name = 'device'
+
+    def __init__(self, index: int = Config.CAMERA_INDEX, api: int = Config.CAMERA_API,
+                 fallback_index: Optional[int] = 0, width: int = 1280, height: int = 720):
+        super().__init__()
+        self.index = index
+        self.api = api
+        self.fallback_index = fallback_index
+        self.width = width
+        self.height = height
+        self.used_fallback = False
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.index, self.api)
+        if not self.cap.isOpened() and self.fallback_index is not None and self.fallback_index != self.index:
+            # Lepas handle pertama dulu: device bisa tetap terkunci walau gagal dibuka
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.fallback_index, self.api)
+            self.used_fallback = True
+        if not self.cap.isOpened():
+            return False
+
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return True
+
+    def describe(self) -> str:
+        index = self.fallback_index if self.used_fallback else self.index
+        return f"device:{index}"
+
+
+class VideoFileSource(CaptureSource):
+    """File video; opsional diputar ulang dan/atau dipacing sesuai FPS aslinya."""
+
+    name = 'file'
+
+    def __init__(self, path: str, loop: bool = False, realtime: bool = False):
+        super().__init__()
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self._next_at = None
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.path)
+        if not self.cap.isOpened():
+            return False
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or Config.FPS
+        return True
+
+    def _read(self):
+        _pace(self)
+        ret, frame = self.cap.read() if self.cap is not None else (False, None)
+        if not ret and self.loop and self.cap is not None:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        if not ret:
+            self.finished = True
+        return ret, frame
+
+    def describe(self) -> str:
+        return f"file:{self.path}"
+
+
+class ImageDirectorySource(FrameSource):
+    """Urutan gambar dalam folder (diurutkan berdasarkan nama file)."""
+
+    name = 'images'
+
+    def __init__(self, path: str, fps: float = Config.FPS, loop: bool = False, realtime: bool = False):
+        super().__init__()
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.realtime = realtime
+        self.files = []
+        self._index = 0
+        self._next_at = None
+
+    def open(self) -> bool:
+        if not os.path.isdir(self.path):
+            return False
+        self.files = sorted(os.path.join(self.path, f) for f in os.listdir(self.path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        return bool(self.files)
+
+    def _read(self):
+        _pace(self)
+        while True:
+            if self._index >= len(self.files):
+                if not self.loop or not self.files:
+                    self.finished = True
+                    return False, None
+                self._index = 0
+            frame = cv2.imread(self.files[self._index])
+            self._index += 1
+            if frame is not None:
+                return True, frame
+
+    def describe(self) -> str:
+        return f"images:{self.path}"
+
+
+class SyntheticSource(FrameSource):
+    """Generator frame sintetis (gradien bergerak + nomor frame) untuk load test tanpa kamera."""
+
+    name = 'synthetic'
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = Config.FPS,
+                 realtime: bool = True, max_frames: Optional[int] = None):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.count = 0
+        self._next_at = None
+        ramp = np.linspace(0, 255, width, dtype=np.float32)
+        self._base = np.broadcast_to(ramp, (height, width)).astype(np.uint8)
+
+    def _read(self):
+        if self.max_frames is not None and self.count >= self.max_frames:
+            self.finished = True
+            return False, None
+        _pace(self)
+        shift = (self.count * 8) % self.width
+        channel = np.roll(self._base, shift, axis=1)
+        frame = cv2.merge([channel, np.flipud(channel), np.full_like(channel, 96)])
+        cv2.putText(frame, f"#{self.count}", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (255, 255, 255), 3)
+        self.count += 1
+        return True, frame
+
+    def describe(self) -> str:
+        return f"synthetic:{self.width}x{self.height}@{self.fps:g}"
+
+
+class StreamSource(CaptureSource):
+    """Network stream (MJPEG over HTTP, RTSP, ...) dengan reconnect otomatis.
+
+    Endpoint /video_feed instance lain bisa dipakai sebagai sumber uji lokal.
+    """
+
+    name = 'stream'
+
+    def __init__(self, url: str, reconnect_delay: float = 1.0):
+        super().__init__()
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self.reconnects = 0
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.url)
+        return self.cap.isOpened()
+
+    def _read(self):
+        ret, frame = super()._read()
+        if not ret:
+            # Stream putus: coba buka ulang sekali per panggilan
+            self.release()
+            time.sleep(self.reconnect_delay)
+            self.reconnects += 1
+            if self.open():
+                ret, frame = self.cap.read()
+        return ret, frame
+
+    def describe(self) -> str:
+        return f"stream:{self.url}"
+
+
+def _pace(source):
+    """Sleep so that frames are delivered at source.fps (only when realtime)."""
+    if not getattr(source, 'realtime', False) or not source.fps:
+        return
+    now = time.monotonic()
+    if source._next_at is not None and now < source._next_at:
+        time.sleep(source._next_at - now)
+        now = source._next_at
+    source._next_at = now + 1.0 / source.fps
+
+
+def create_frame_source(spec: Optional[str] = None, realtime: bool = True, loop: bool = False) -> FrameSource:
+    """Build a frame source from a spec string.
+
+    Format: "device:1", "file:rekaman.mp4", "images:folder/", "synthetic",
+    "synthetic:640x480@30", "http://..." / "rtsp://...". Tanpa prefix,
+    angka = device, folder = images, file = file. None = kamera dari Config.
+    """
+    spec = spec if spec is not None else Config.FRAME_SOURCE
+    if not spec:
+        return DeviceSource()
+
+    kind, _, value = spec.partition(':')
+    if '://' in spec:
+        return StreamSource(spec)
+    if kind == 'device':
+        return DeviceSource(int(value), fallback_index=None)
+    if kind == 'file':
+        return VideoFileSource(value, loop=loop, realtime=realtime)
+    if kind == 'images':
+        return ImageDirectorySource(value, loop=loop, realtime=realtime)
+    if kind == 'synthetic':
+        if not value:
+            return SyntheticSource(realtime=realtime)
+        size, _, fps = value.partition('@')
+        width, _, height = size.partition('x')
+        return SyntheticSource(int(width), int(height), float(fps or Config.FPS), realtime=realtime)
+    if spec.isdigit():
+        return DeviceSource(int(spec), fallback_index=None)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, loop=loop, realtime=realtime)
+    if os.path.isfile(spec):
+        return VideoFileSource(spec, loop=loop, realtime=realtime)
+    raise ValueError(f"Unknown frame source: {spec}")
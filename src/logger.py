@@ -1,25 +1,102 @@
+import atexit
+import itertools
+import json
+import queue
+import threading
+import time
+from collections import deque
 from datetime import datetime
 from .config import Config
 
 class Logger:
-    def __init__(self):
-        self.logs = []
+    """Structured event logger dengan ring buffer.
+
+    log() hanya menambah event ke deque berukuran tetap (dengan nomor urut)
+    dan memasukkannya ke antrian sink di bawah satu lock singkat; print ke console, tulis file dan push
+    ke UI dikerjakan thread sink di background, jadi loop video tidak pernah
+    menunggu I/O.
+    """
+
+    def __init__(self, events=None, buffer_size=Config.LOG_BUFFER_SIZE, log_file=Config.LOG_FILE):
+        self.buffer = deque(maxlen=buffer_size)
         self.last_message = None
-        
-    def log(self, message):
-        """Log a message with timestamp."""
-        # Avoid duplicate consecutive messages
-        if message != self.last_message:
-            ts = datetime.now().strftime('%H:%M:%S')
-            entry = f"{ts} - {message}"
-            print(entry)
-            self.logs.append(entry)
+        self.events = events  # EventBroker opsional untuk push log ke UI (SSE)
+        self.log_file = log_file
+        self._seq = itertools.count(1)
+        # Dedupe, nomor urut dan append satu kesatuan: urutan seq = urutan buffer = urutan sink
+        self._lock = threading.Lock()
+        self._sink_queue = queue.SimpleQueue()
+        self._sink_thread = threading.Thread(target=self._sink_loop, name='log-sink', daemon=True)
+        self._sink_thread.start()
+        atexit.register(self.close)
+
+    def log(self, message, level='info', **fields):
+        """Log a message with timestamp (consecutive duplicates are skipped)."""
+        now = time.time()
+        ts = datetime.fromtimestamp(now).strftime('%H:%M:%S')
+        event = {
+            'seq': None,  # Diisi di bawah lock
+            'time': ts,
+            'timestamp': now,
+            'level': level,
+            'message': message,
+            'entry': f"{ts} - {message}"
+        }
+        if fields:
+            event['fields'] = fields
+
+        with self._lock:
+            if message == self.last_message:
+                return
             self.last_message = message
-            
-            # Keep log size manageable
-            if len(self.logs) > Config.MAX_LOGS:
-                self.logs.pop(0)
-    
+            event['seq'] = next(self._seq)
+            self.buffer.append(event)
+            self._sink_queue.put(event)
+
     def get_logs(self):
-        """Get all logged messages."""
-        return self.logs 
\ No newline at end of file
+        """Get the latest formatted log lines (for the UI)."""
+        with self._lock:
+            events = list(self.buffer)
+        return [event['entry'] for event in events[-Config.MAX_LOGS:]]
+
+    def get_events(self, since=0, limit=None):
+        """Get structured events with sequence number greater than `since`."""
+        with self._lock:
+            events = [event for event in self.buffer if event['seq'] > since]
+        return events[:limit] if limit else events
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest event (0 if none)."""
+        with self._lock:
+            return self.buffer[-1]['seq'] if self.buffer else 0
+
+    def close(self, timeout=2.0):
+        """Stop the sink thread after it has written everything queued."""
+        if self._sink_thread.is_alive():
+            self._sink_queue.put(None)
+            self._sink_thread.join(timeout)
+
+    def _sink_loop(self):
+        log_file = None
+        if self.log_file:
+            try:
+                log_file = open(self.log_file, 'a', encoding='utf-8')
+            except OSError as e:
+                print(f"❌ Log file error: {e}")
+
+        try:
+            while True:
+                event = self._sink_queue.get()
+                if event is None:
+                    return
+                print(event['entry'])
+                if log_file:
+                    log_file.write(json.dumps(event, ensure_ascii=False) + '\n')
+                    if self._sink_queue.empty():
+                        log_file.flush()
+                if self.events:
+                    self.events.publish('log', event)
+        finally:
+            if log_file:
+                log_file.close()
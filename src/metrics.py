@@ -0,0 +1,226 @@
+import bisect
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List
+
+from .config import Config
+
+# Batas bucket histogram (detik), mengikuti gaya Prometheus
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Histogram latency dengan bucket tetap + window sampel terakhir untuk persentil."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window: int = Config.METRICS_WINDOW):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Slot terakhir = +Inf
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float):
+        """Record one duration in seconds."""
+        idx = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[idx] += 1
+            self.total += seconds
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+            self.recent.append(seconds)
+
+    def snapshot(self) -> Dict:
+        """Consistent copy of counters and recent samples."""
+        with self._lock:
+            return {
+                'counts': list(self.counts),
+                'total': self.total,
+                'count': self.count,
+                'max': self.max,
+                'recent': list(self.recent)
+            }
+
+    def summary(self) -> Dict:
+        """Count, mean and p50/p95/p99 (over the recent window) in milliseconds."""
+        snap = self.snapshot()
+        recent = sorted(snap['recent'])
+        return {
+            'count': snap['count'],
+            'mean_ms': round(snap['total'] / snap['count'] * 1000, 3) if snap['count'] else None,
+            'p50_ms': _percentile_ms(recent, 50),
+            'p95_ms': _percentile_ms(recent, 95),
+            'p99_ms': _percentile_ms(recent, 99),
+            'max_ms': round(snap['max'] * 1000, 3)
+        }
+
+
+def _percentile_ms(sorted_values: List[float], pct: float):
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return round(sorted_values[idx] * 1000, 3)
+
+
+class Metrics:
+    """Instrumentasi ringan: span per stage pipeline, latency per route Flask, dan FPS.
+
+    Semua waktu memakai time.perf_counter (monotonic). Biaya per span hanya
+    dua pembacaan clock dan satu update histogram, cukup murah untuk tetap
+    aktif di production.
+    """
+
+    def __init__(self, enabled: bool = Config.METRICS_ENABLED):
+        self.enabled = enabled
+        self.stages = {}   # stage -> Histogram
+        self.routes = {}   # (method, route) -> Histogram
+        self.responses = {}  # (method, route, status) -> count
+        self._frames = deque(maxlen=Config.METRICS_WINDOW)
+        self.frames_total = 0
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _histogram(self, table: Dict, key) -> Histogram:
+        hist = table.get(key)
+        if hist is None:
+            with self._lock:
+                hist = table.setdefault(key, Histogram())
+        return hist
+
+    def observe(self, stage: str, seconds: float):
+        """Record a duration for a pipeline stage."""
+        if self.enabled:
+            self._histogram(self.stages, stage).observe(seconds)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Time a block: `with metrics.span('encode_frame'): ...`."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._histogram(self.stages, stage).observe(time.perf_counter() - started)
+
+    def timed(self, stage: str):
+        """Decorator version of span()."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._histogram(self.stages, stage).observe(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float):
+        """Record a Flask request duration."""
+        if not self.enabled:
+            return
+        self._histogram(self.routes, (method, route)).observe(seconds)
+        key = (method, route, status)
+        with self._lock:
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def tick_frame(self):
+        """Mark one processed video frame (for FPS)."""
+        now = time.perf_counter()
+        with self._lock:
+            self._frames.append(now)
+            self.frames_total += 1
+
+    def fps(self, window_seconds: float = 5.0) -> float:
+        """Frames per second over the last window_seconds."""
+        now = time.perf_counter()
+        with self._lock:
+            recent = [t for t in self._frames if now - t <= window_seconds]
+        if len(recent) < 2:
+            return 0.0
+        return round((len(recent) - 1) / (recent[-1] - recent[0]), 2) if recent[-1] > recent[0] else 0.0
+
+    def reset(self):
+        """Drop all recorded data."""
+        with self._lock:
+            self.stages = {}
+            self.routes = {}
+            self.responses = {}
+            self._frames.clear()
+            self.frames_total = 0
+            self.started_at = time.time()
+
+    def summary(self) -> Dict:
+        """JSON summary with percentiles per stage and route."""
+        return {
+            'enabled': self.enabled,
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'fps': self.fps(),
+            'frames_total': self.frames_total,
+            'stages': {stage: hist.summary() for stage, hist in sorted(self.stages.items())},
+            'routes': {f"{method} {route}": hist.summary()
+                       for (method, route), hist in sorted(self.routes.items())}
+        }
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in Prometheus text exposition format."""
+        lines = [
+            '# HELP kasir_stage_duration_seconds Duration of pipeline stages.',
+            '# TYPE kasir_stage_duration_seconds histogram'
+        ]
+        for stage, hist in sorted(self.stages.items()):
+            lines.extend(_histogram_lines('kasir_stage_duration_seconds', f'stage="{stage}"', hist))
+
+        lines += [
+            '# HELP kasir_http_request_duration_seconds Duration of HTTP requests per route.',
+            '# TYPE kasir_http_request_duration_seconds histogram'
+        ]
+        for (method, route), hist in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{route}"'
+            lines.extend(_histogram_lines('kasir_http_request_duration_seconds', labels, hist))
+
+        lines += [
+            '# HELP kasir_http_requests_total HTTP responses per route and status.',
+            '# TYPE kasir_http_requests_total counter'
+        ]
+        with self._lock:
+            responses = sorted(self.responses.items())
+        for (method, route, status), count in responses:
+            lines.append(f'kasir_http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP kasir_frames_total Video frames processed.',
+            '# TYPE kasir_frames_total counter',
+            f'kasir_frames_total {self.frames_total}',
+            '# HELP kasir_pipeline_fps Processed frames per second (last 5s).',
+            '# TYPE kasir_pipeline_fps gauge',
+            f'kasir_pipeline_fps {self.fps()}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name: str, labels: str, hist: Histogram) -> List[str]:
+    snap = hist.snapshot()
+    lines = []
+    cumulative = 0
+    for bound, count in zip(hist.buckets, snap['counts']):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {snap["count"]}')
+    lines.append(f'{name}_sum{{{labels}}} {snap["total"]:.6f}')
+    lines.append(f'{name}_count{{{labels}}} {snap["count"]}')
+    return lines
+
+
+# Satu registry per proses, dipakai oleh semua modul pipeline
+metrics = Metrics()
@@ -1,11 +1,17 @@
-from flask import Blueprint, request, jsonify
+import threading
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .config import Config
+from .event_bus import format_sse
 from .mood_matcher import MoodMatcher, get_mood_preset
 
-def create_mood_api(db):
+def create_mood_api(db, recommender=None):
     """Create mood-based recommendation API blueprint."""
     mood_bp = Blueprint('mood', __name__)
     mood_matcher = MoodMatcher(db)
     
+    # Warm cache preset di background supaya startup tidak menunggu LLM
+    threading.Thread(target=mood_matcher.warm_presets, name='mood-warmup', daemon=True).start()
+    
     @mood_bp.route('/api/mood-recommendation', methods=['POST'])
     def get_mood_recommendation():
         """Get mood-based menu recommendation."""
@@ -37,6 +43,126 @@ def create_mood_api(db):
                 'error': f'Server error: {str(e)}'
             }), 500
     
+    @mood_bp.route('/api/mood-recommendation/batch', methods=['POST'])
+    def get_batch_recommendation():
+        """Get recommendations for a list of mood inputs in one request."""
+        try:
+            data = request.get_json(silent=True)
+            inputs = data.get('inputs') if isinstance(data, dict) else None
+            
+            if not isinstance(inputs, list) or not inputs:
+                return jsonify({
+                    'success': False,
+                    'error': 'inputs must be a non-empty list'
+                }), 400
+            
+            if len(inputs) > Config.MOOD_BATCH_MAX_INPUTS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Maximum {Config.MOOD_BATCH_MAX_INPUTS} inputs per request'
+                }), 400
+            
+            user_inputs = [str(text).strip() for text in inputs]
+            if not all(user_inputs):
+                return jsonify({
+                    'success': False,
+                    'error': 'inputs cannot contain empty strings'
+                }), 400
+            
+            return jsonify(mood_matcher.get_batch_recommendations(user_inputs))
+            
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': f'Server error: {str(e)}'
+            }), 500
+    
+    @mood_bp.route('/api/mood-recommendation/personalized', methods=['POST'])
+    def get_personalized_recommendation():
+        """Rank menu by purchase history blended with the local mood match (no LLM)."""
+        if recommender is None:
+            return jsonify({
+                'success': False,
+                'error': 'Personalized recommender is not available'
+            }), 503
+        
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'error': 'Request body must be a JSON object'
+            }), 400
+        
+        try:
+            top_n = int(data.get('top_n', 3))
+            mood_weight = float(data.get('mood_weight', Config.RECOMMENDER_MOOD_WEIGHT))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'error': 'top_n and mood_weight must be numbers'
+            }), 400
+        if top_n < 1:
+            return jsonify({
+                'success': False,
+                'error': 'top_n must be at least 1'
+            }), 400
+        
+        user_input = (data.get('user_input') or '').strip()
+        
+        mood_scores = None
+        if user_input:
+            mood_scores = mood_matcher.get_classifier().scores_by_id(user_input)
+        
+        return jsonify({
+            'success': True,
+            'customer_id': data.get('customer_id'),
+            'recommendations': recommender.recommend(
+                data.get('customer_id'),
+                top_n=top_n,
+                mood_scores=mood_scores,
+                mood_weight=mood_weight
+            )
+        })
+    
+    @mood_bp.route('/api/mood-recommendation/stream', methods=['GET', 'POST'])
+    def stream_mood_recommendation():
+        """Stream mood recommendation as Server-Sent Events (item first, then reason)."""
+        data = (request.get_json(silent=True) or {}) if request.method == 'POST' else request.args
+        preset_key = data.get('preset')
+        
+        if preset_key:
+            user_input = get_mood_preset(preset_key)
+            if user_input == preset_key:  # Not found
+                return jsonify({
+                    'success': False,
+                    'error': 'Mood preset not found'
+                }), 404
+        else:
+            user_input = (data.get('user_input') or '').strip()
+            if not user_input:
+                return jsonify({
+                    'success': False,
+                    'error': 'user_input is required'
+                }), 400
+        
+        def generate():
+            for event in mood_matcher.stream_mood_recommendation(user_input):
+                payload = event['data']
+                if event['event'] == 'done' and preset_key and payload.get('success'):
+                    payload['preset_used'] = {'key': preset_key, 'text': user_input}
+                yield format_sse(event['event'], payload)
+        
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    @mood_bp.route('/api/mood-cache/stats', methods=['GET'])
+    def get_mood_cache_stats():
+        """Get recommendation cache, coalescing and circuit breaker statistics."""
+        stats = mood_matcher.cache.get_stats()
+        stats['coalescing'] = mood_matcher.single_flight.get_stats()
+        stats['circuit_breaker'] = mood_matcher.breaker.get_stats()
+        return jsonify(stats)
+    
     @mood_bp.route('/api/mood-presets', methods=['GET'])
     def get_mood_presets():
         """Get predefined mood presets."""
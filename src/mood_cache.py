@@ -0,0 +1,144 @@
+import copy
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .config import Config
+
+
+def normalize_mood_input(user_input: str) -> str:
+    """Normalize free-text mood input ("Panas  banget!!" -> "panas banget")."""
+    text = unicodedata.normalize('NFKC', user_input).lower()
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return ' '.join(text.split())
+
+
+class RecommendationCache:
+    """LRU + TTL cache untuk hasil rekomendasi mood.
+
+    Key = input yang sudah dinormalisasi + versi menu, jadi perubahan menu
+    otomatis membuat entry lama tidak terpakai. Bisa dipersist ke SQLite
+    supaya cache tetap hangat setelah restart.
+    """
+
+    def __init__(self, max_size: int = Config.MOOD_CACHE_SIZE,
+                 ttl_seconds: float = Config.MOOD_CACHE_TTL_SECONDS,
+                 db_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.db_path = db_path
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if db_path:
+            self._init_store()
+            self._load_store()
+
+    @staticmethod
+    def make_key(user_input: str, menu_version) -> str:
+        """Build cache key from normalized input and menu version."""
+        return f"{menu_version}:{normalize_mood_input(user_input)}"
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a copy of a cached value, or None if missing/expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        # Copy supaya caller bebas memodifikasi hasil (mis. menambah preset_used)
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict):
+        """Store a value (evicting least recently used entries)."""
+        expires_at = time.time() + self.ttl
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+        if self.db_path:
+            self._persist(key, value, expires_at)
+
+    def clear(self):
+        """Drop all cached entries (memory and store)."""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('DELETE FROM mood_cache')
+            conn.commit()
+            conn.close()
+
+    def get_stats(self) -> Dict:
+        """Get hit/miss counters."""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'persistent': bool(self.db_path)
+            }
+
+    def _init_store(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS mood_cache (
+                cache_key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _load_store(self):
+        now = time.time()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM mood_cache WHERE expires_at < ?', (now,))
+        cursor.execute('''
+            SELECT cache_key, value, expires_at FROM mood_cache
+            ORDER BY expires_at DESC
+            LIMIT ?
+        ''', (self.max_size,))
+        rows = cursor.fetchall()
+        conn.commit()
+        conn.close()
+
+        with self._lock:
+            # Urutan terlama -> terbaru agar LRU order sesuai
+            for key, value, expires_at in reversed(rows):
+                try:
+                    self._entries[key] = (expires_at, json.loads(value))
+                except ValueError:
+                    continue
+
+    def _persist(self, key: str, value: Dict, expires_at: float):
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                INSERT OR REPLACE INTO mood_cache (cache_key, value, expires_at)
+                VALUES (?, ?, ?)
+            ''', (key, json.dumps(value), expires_at))
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            print(f"❌ Mood cache persist error: {e}")
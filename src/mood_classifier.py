@@ -0,0 +1,150 @@
+import math
+from collections import Counter
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .mood_cache import normalize_mood_input
+
+# Jembatan kata mood Bahasa Indonesia/slang -> mood tags (Bahasa Inggris) di menu
+MOOD_SYNONYMS = {
+    'capek': 'tired energetic', 'cape': 'tired energetic', 'lelah': 'tired comfort',
+    'ngantuk': 'tired morning energetic', 'semangat': 'energetic determined',
+    'energi': 'energetic', 'fokus': 'focused clarity productive',
+    'konsentrasi': 'focused clarity', 'kerja': 'work busy productive',
+    'sibuk': 'busy', 'deadline': 'busy determined work',
+    'stress': 'stressed overwhelmed soothing', 'stres': 'stressed overwhelmed soothing',
+    'pusing': 'stressed overwhelmed', 'sedih': 'emotional comfort embrace',
+    'galau': 'emotional comfort', 'tenang': 'calm soothing peaceful',
+    'menenangkan': 'calm soothing gentle', 'lembut': 'gentle smooth',
+    'panas': 'hot summer refreshing', 'gerah': 'hot refreshing', 'kepanasan': 'hot refreshing',
+    'dingin': 'cool refreshing', 'seger': 'refreshed refreshing cool',
+    'segar': 'refreshed refreshing cool', 'santai': 'relaxed',
+    'nyaman': 'cozy comfortable', 'hangat': 'warm cozy', 'adem': 'cool chill',
+    'ngobrol': 'social meeting', 'nongkrong': 'social casual', 'teman': 'social',
+    'rapat': 'meeting', 'meeting': 'meeting social', 'kreatif': 'creative artistic',
+    'unik': 'unique', 'sehat': 'healthy wellness', 'meditasi': 'meditation zen',
+    'pagi': 'morning', 'sore': 'afternoon', 'siang': 'afternoon',
+}
+
+
+def char_ngrams(text: str, sizes=(2, 3, 4)) -> Counter:
+    """Character n-grams per word, padded with spaces at word boundaries."""
+    grams = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        for n in sizes:
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+def expand_mood_input(user_input: str) -> str:
+    """Normalize input and append English mood tags for known Indonesian words."""
+    text = normalize_mood_input(user_input)
+    extra = [MOOD_SYNONYMS[word] for word in text.split() if word in MOOD_SYNONYMS]
+    return ' '.join([text] + extra)
+
+
+class LocalMoodClassifier:
+    """Offline mood matcher: character n-gram TF-IDF + cosine similarity (NumPy).
+
+    Dokumen per menu = nama + deskripsi + mood_tags (tags diberi bobot ganda).
+    Tidak butuh network, dipakai sebagai fast path sebelum LLM.
+    """
+
+    def __init__(self, min_score: float, min_margin: float):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.menu_version = None
+        # (items, vocab, idf, matrix) diganti sekaligus agar aman dipakai antar thread;
+        # matrix berukuran (n_items, n_features) dengan baris sudah L2-normalized
+        self._model = ([], {}, None, None)
+
+    def fit(self, menu_items: List[Dict], menu_version=None):
+        """Build TF-IDF vectors for the menu."""
+        docs = []
+        for item in menu_items:
+            tags = (item.get('mood_tags') or '').replace(',', ' ')
+            text = f"{item['name']} {item.get('description') or ''} {tags} {tags}"
+            docs.append(char_ngrams(normalize_mood_input(text)))
+
+        vocab = {}
+        for grams in docs:
+            for gram in grams:
+                vocab.setdefault(gram, len(vocab))
+
+        df = np.zeros(len(vocab), dtype=np.float32)
+        tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+        for row, grams in enumerate(docs):
+            for gram, count in grams.items():
+                tf[row, vocab[gram]] = count
+            df[[vocab[gram] for gram in grams]] += 1
+
+        n_docs = max(len(docs), 1)
+        idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+        matrix = (1.0 + np.log(np.maximum(tf, 1.0))) * (tf > 0) * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self._model = (list(menu_items), vocab, idf, matrix / np.maximum(norms, 1e-12))
+        self.menu_version = menu_version
+
+    @property
+    def items(self) -> List[Dict]:
+        return self._model[0]
+
+    def scores(self, user_input: str) -> np.ndarray:
+        """Cosine similarity between the input and every menu item."""
+        return self._scores(self._model, user_input)
+
+    def scores_by_id(self, user_input: str) -> Dict[int, float]:
+        """Cosine similarity per menu id (items and scores from the same fitted model)."""
+        model = self._model
+        scores = self._scores(model, user_input)
+        return {item['id']: float(score) for item, score in zip(model[0], scores)}
+
+    @staticmethod
+    def _scores(model, user_input: str) -> np.ndarray:
+        items, vocab, idf, matrix = model
+        if matrix is None or not items:
+            return np.zeros(0, dtype=np.float32)
+
+        query = np.zeros(len(vocab), dtype=np.float32)
+        for gram, count in char_ngrams(expand_mood_input(user_input)).items():
+            idx = vocab.get(gram)
+            if idx is not None:
+                query[idx] = (1.0 + math.log(count)) * idf[idx]
+
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(items), dtype=np.float32)
+        return matrix @ (query / norm)
+
+    def classify(self, user_input: str) -> Optional[Dict]:
+        """Return best match with score, margin and whether it is confident enough."""
+        model = self._model
+        items = model[0]
+        scores = self._scores(model, user_input)
+        if scores.size == 0:
+            return None
+
+        order = np.argsort(scores)[::-1]
+        best = int(order[0])
+        second = int(order[1]) if len(order) > 1 else None
+        top_score = float(scores[best])
+        margin = top_score - (float(scores[second]) if second is not None else 0.0)
+
+        return {
+            'item': items[best],
+            'alternative': items[second] if second is not None else None,
+            'score': top_score,
+            'margin': margin,
+            'confident': top_score >= self.min_score and margin >= self.min_margin,
+            'matched_tags': self._matched_tags(items[best], user_input)
+        }
+
+    @staticmethod
+    def _matched_tags(item: Dict, user_input: str) -> List[str]:
+        """Mood tags of the item that appear in the (expanded) input."""
+        words = set(expand_mood_input(user_input).split())
+        tags = [tag.strip() for tag in (item.get('mood_tags') or '').split(',')]
+        return [tag for tag in tags if tag and tag in words]
@@ -1,33 +1,88 @@
 import json
 import logging
-from typing import Dict, Optional, List
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, List, Iterator
 from openai import OpenAI
+from .config import Config
+from .mood_cache import RecommendationCache
+from .mood_classifier import LocalMoodClassifier, MOOD_SYNONYMS
+from .single_flight import SingleFlight
+from .circuit_breaker import CircuitBreaker
 
 class MoodMatcher:
     def __init__(self, db):
         self.db = db
         self.client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
+            base_url=Config.LLM_BASE_URL,
+            timeout=Config.LLM_TIMEOUT_SECONDS,
+            max_retries=0,
             # api_key=APIKEY
         )
+        self.executor = ThreadPoolExecutor(max_workers=Config.LLM_MAX_WORKERS, thread_name_prefix='llm')
+        self.breaker = CircuitBreaker(Config.LLM_BREAKER_FAILURES, Config.LLM_BREAKER_RESET_SECONDS)
+        self._settle_lock = threading.Lock()
+        self.cache = RecommendationCache(db_path=db.db_path if Config.MOOD_CACHE_PERSIST else None)
+        self._menu_version = None
+        self._menu_version_checked = 0.0
+        self.classifier = LocalMoodClassifier(Config.LOCAL_MOOD_MIN_SCORE, Config.LOCAL_MOOD_MIN_MARGIN)
+        self.single_flight = SingleFlight()  # Gabungkan request LLM identik yang bersamaan
+        self._prompt_prefix = None  # (menu_version, prefix)
         
-    def create_ai_prompt(self, user_input: str) -> str:
-        """Create AI prompt untuk mood-based recommendation."""
-        menu_items = self.db.get_menu()
+    def get_menu_version(self) -> int:
+        """Get menu version (DB dicek paling sering tiap MENU_VERSION_CHECK_SECONDS)."""
+        now = time.monotonic()
+        if self._menu_version is None or now - self._menu_version_checked > Config.MENU_VERSION_CHECK_SECONDS:
+            self._menu_version = self.db.get_menu_version()
+            self._menu_version_checked = now
+        return self._menu_version
+    
+    def get_classifier(self) -> LocalMoodClassifier:
+        """Get local classifier, re-fitted when the menu version changes."""
+        version = self.get_menu_version()
+        if self.classifier.menu_version != version:
+            self.classifier.fit(self.db.get_menu(), version)
+        return self.classifier
+        
+    def get_prompt_prefix(self) -> str:
+        """Get static system+menu prompt, rebuilt only when the menu version changes.
         
+        Prefix dibuat sekali per versi menu dan dipakai ulang byte-identical,
+        sehingga prompt caching di upstream bisa bekerja.
+        """
+        version = self.get_menu_version()
+        cached = self._prompt_prefix
+        if cached is None or cached[0] != version:
+            cached = (version, self._build_prompt_prefix(self.db.get_menu()))
+            self._prompt_prefix = cached
+        return cached[1]
+    
+    def _build_prompt_prefix(self, menu_items: List[Dict]) -> str:
+        """Build system prompt with menu context and examples generated from the menu."""
         # Build menu context for AI
         menu_context = ""
+        examples = ""
         for item in menu_items:
-            mood_tags = item.get('mood_tags', '')
+            mood_tags = item.get('mood_tags') or ''
             menu_context += f"""
 {item['name']} (ID: {item['id']}, Rp {item['price']:,}):
 - Description: {item['description']}
 - Mood Tags: {mood_tags}
 """
+            tags = [tag.strip() for tag in mood_tags.split(',') if tag.strip()]
+            if tags:
+                # Kata Bahasa Indonesia yang dipetakan ke tag item ini
+                local_words = [word for word, mapped in MOOD_SYNONYMS.items()
+                               if set(mapped.split()) & set(tags[:3])][:3]
+                keywords = "/".join(tags[:3] + local_words)
+                examples += f'\n- "{keywords}" → {item["name"]} (ID: {item["id"]}) - {", ".join(tags[3:6])}'
         
-        prompt = f"""You are a coffee mood expert at a premium cafe. A customer said: "{user_input}"
+        prompt = f"""You are a professional coffee mood expert at a premium cafe. Always respond in valid JSON format.
 
-Based on their mood/feeling, recommend the BEST coffee from our menu that matches their emotional state.
+A customer will tell you how they feel. Based on their mood/feeling, recommend the BEST coffee from our menu that matches their emotional state.
 
 Our Menu:{menu_context}
 
@@ -44,76 +99,426 @@ Respond in this exact JSON format:
     "confidence": [0-100 as integer],
     "reason": "Penjelasan personal mengapa kopi ini cocok dengan perasaanmu hari ini",
     "alternative": [alternative_menu_id as integer or null]
-}}
-
-Example matching logic:
-- "tired/capek/butuh energi" → Americano (ID: 1) - focused, energetic
-- "stressed/stress/lelah emosional" → Latte (ID: 3) - gentle, calm, nurturing
-- "hot/panas/kepanasan" → Cold Brew (ID: 4) - cool, refreshing
-- "cozy/nyaman/santai" → Cappuccino (ID: 2) - comfortable, cozy
-- "creative/kreatif/mindful" → Matcha Latte (ID: 5) - zen, healthy, mindful"""
+}}"""
+        
+        if examples:
+            prompt += f"\n\nExample matching logic:{examples}"
         
         return prompt
+    
+    def create_ai_messages(self, user_input: str) -> List[Dict]:
+        """Create chat messages: cached prefix + per-request user input."""
+        return [
+            {"role": "system", "content": self.get_prompt_prefix()},
+            {"role": "user", "content": f'A customer said: "{user_input}"'}
+        ]
 
     def get_mood_recommendation(self, user_input: str) -> Dict:
-        """Get mood-based recommendation dari LLM."""
+        """Get mood-based recommendation (cache dulu, LLM jika belum ada)."""
+        key = self.cache.make_key(user_input, self.get_menu_version())
+        cached = self.cache.get(key)
+        if cached is not None:
+            cached['cached'] = True
+            return cached
+        
+        # Fast path offline: jawab langsung jika classifier lokal cukup yakin
+        match = self.get_classifier().classify(user_input)
+        if match and match['confident']:
+            return self._local_recommendation(match)
+        
+        # Request identik yang bersamaan berbagi satu panggilan LLM
+        return self.single_flight.do(key, lambda: self._fetch_and_cache(key, user_input))
+    
+    def _fetch_and_cache(self, key: str, user_input: str) -> Dict:
+        """Call the LLM with a deadline; serve the local fallback if it is late or failing."""
+        if not self.breaker.allow():
+            return self._fallback_recommendation(user_input)
+        
+        attempt = {'started': None, 'settled': False}
+        future = self.executor.submit(self._call_upstream, key, user_input, attempt)
+        # Hedge: siapkan fallback lokal sementara LLM berjalan
+        fallback = self._fallback_recommendation(user_input)
+        
         try:
-            prompt = self.create_ai_prompt(user_input)
+            return future.result(timeout=Config.LLM_DEADLINE_SECONDS)
+        except FutureTimeoutError:
+            if future.cancel():
+                # Masih antre di executor: upstream belum dipanggil, bukan kegagalan upstream
+                print(f"⏱️ Executor LLM penuh selama {Config.LLM_DEADLINE_SECONDS}s, pakai fallback")
+                self.breaker.record_skipped()
+                fallback['saturated'] = True
+                return fallback
+            
+            print(f"⏱️ LLM melewati deadline {Config.LLM_DEADLINE_SECONDS}s, pakai fallback")
+            # Waktu antre tidak dihitung: gagal hanya jika panggilannya sendiri sudah selama deadline,
+            # selain itu panggilan mencatat hasilnya sendiri saat selesai
+            started = attempt['started']
+            if started is not None and time.monotonic() - started >= Config.LLM_DEADLINE_SECONDS:
+                self._settle(attempt, success=False)
+            fallback['deadline_exceeded'] = True
+            return fallback
+    
+    def _call_upstream(self, key: str, user_input: str, attempt: Optional[Dict] = None) -> Dict:
+        """Call the LLM, cache valid answers and update the circuit breaker."""
+        attempt = attempt if attempt is not None else {'started': None, 'settled': False}
+        started = attempt['started'] = time.monotonic()
+        result = self._get_llm_recommendation(user_input)
+        elapsed = time.monotonic() - started
+        
+        # Hanya cache jawaban LLM yang valid, bukan fallback
+        success = result.get('success') and not result['recommendation'].get('is_fallback')
+        if success:
+            # Jawaban yang terlambat tetap di-cache untuk request berikutnya
+            self.cache.set(key, result)
+        
+        # Sehat = upstream menjawab valid dalam deadline, diukur sejak panggilan mulai (bukan sejak antre)
+        self._settle(attempt, success=success and elapsed <= Config.LLM_DEADLINE_SECONDS)
+        return result
+    
+    def _settle(self, attempt: Dict, success: bool):
+        """Record one upstream attempt in the breaker exactly once."""
+        with self._settle_lock:
+            if attempt['settled']:
+                return
+            attempt['settled'] = True
+        if success:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+    
+    def get_batch_recommendations(self, user_inputs: List[str]) -> Dict:
+        """Recommend for many inputs: dedupe, serve cache/local hits, pack the rest into few LLM calls."""
+        started = time.monotonic()
+        version = self.get_menu_version()
+        classifier = self.get_classifier()
+        
+        resolved = {}   # key -> (result, source, elapsed_ms)
+        pending = {}    # key -> user_input (untuk LLM)
+        for user_input in user_inputs:
+            key = self.cache.make_key(user_input, version)
+            if key in resolved or key in pending:
+                continue
             
+            item_started = time.monotonic()
+            cached = self.cache.get(key)
+            if cached is not None:
+                cached['cached'] = True
+                resolved[key] = (cached, 'cache', _elapsed_ms(item_started))
+                continue
+            
+            match = classifier.classify(user_input)
+            if match and match['confident']:
+                resolved[key] = (self._local_recommendation(match), 'local', _elapsed_ms(item_started))
+                continue
+            
+            pending[key] = user_input
+        
+        # Sisa input dibagi ke beberapa completion, dijalankan paralel lewat executor (bounded)
+        keys = list(pending)
+        chunks = [keys[i:i + Config.LLM_BATCH_SIZE] for i in range(0, len(keys), Config.LLM_BATCH_SIZE)]
+        # Satu deadline untuk seluruh batch (bukan timeout HTTP per chunk)
+        deadline = time.monotonic() + Config.LLM_BATCH_DEADLINE_SECONDS
+        futures = []
+        for chunk in chunks:
+            if self.breaker.allow():
+                attempt = {'started': None, 'settled': False}
+                future = self.executor.submit(self._call_upstream_batch, chunk, pending, attempt)
+                futures.append((chunk, future, attempt))
+            else:
+                futures.append((chunk, None, None))
+        
+        for chunk, future, attempt in futures:
+            chunk_started = time.monotonic()
+            try:
+                results = future.result(timeout=max(0.0, deadline - time.monotonic())) if future else {}
+            except FutureTimeoutError:
+                print(f"⏱️ LLM batch melewati deadline {Config.LLM_BATCH_DEADLINE_SECONDS}s, pakai fallback")
+                if future.cancel():
+                    # Belum sempat jalan (executor penuh): bukan kegagalan upstream
+                    self.breaker.record_skipped()
+                elif (attempt['started'] is not None and
+                      time.monotonic() - attempt['started'] >= Config.LLM_BATCH_DEADLINE_SECONDS):
+                    self._settle(attempt, success=False)
+                results = {}
+            except Exception as e:
+                print(f"❌ LLM Batch Error: {e}")
+                results = {}
+            for key in chunk:
+                if key in results:
+                    result, elapsed_ms = results[key]
+                    resolved[key] = (result, 'llm', elapsed_ms)
+                else:
+                    fallback = self._fallback_recommendation(pending[key])
+                    resolved[key] = (fallback, 'fallback', _elapsed_ms(chunk_started))
+        
+        items = []
+        for user_input in user_inputs:
+            result, source, elapsed_ms = resolved[self.cache.make_key(user_input, version)]
+            items.append(dict(result, input=user_input, source=source, elapsed_ms=elapsed_ms))
+        
+        return {
+            'success': True,
+            'results': items,
+            'stats': {
+                'inputs': len(user_inputs),
+                'unique': len(resolved),
+                'upstream_calls': sum(1 for _, future, _ in futures if future),
+                'total_ms': _elapsed_ms(started)
+            }
+        }
+    
+    def _call_upstream_batch(self, keys: List[str], inputs: Dict[str, str],
+                             attempt: Optional[Dict] = None) -> Dict:
+        """One LLM completion for several inputs; returns {key: (result, elapsed_ms)} for valid answers."""
+        attempt = attempt if attempt is not None else {'started': None, 'settled': False}
+        started = attempt['started'] = time.monotonic()
+        numbered = "\n".join(f'{i + 1}. "{inputs[key]}"' for i, key in enumerate(keys))
+        messages = [
+            {"role": "system", "content": self.get_prompt_prefix()},
+            {"role": "user", "content": f"""Several customers told us how they feel:
+{numbered}
+
+Respond with a JSON array containing exactly one object per customer, each in the JSON format above plus "index": [customer number as integer]."""}
+        ]
+        
+        try:
             completion = self.client.chat.completions.create(
                 model="meta-llama/llama-3.3-8b-instruct:free",
-                messages=[
-                    {"role": "system", "content": "You are a professional coffee mood expert. Always respond in valid JSON format."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,        # Slightly creative but consistent
-                max_tokens=300,         # Reasonable length
+                messages=messages,
+                temperature=0.3,
+                max_tokens=300 * len(keys),
                 top_p=0.9,
                 frequency_penalty=0.2,
                 presence_penalty=0.1,
             )
-            
-            response_text = completion.choices[0].message.content.strip()
-            
-            # Clean up response (remove markdown formatting if any)
-            if response_text.startswith('```json'):
-                response_text = response_text.replace('```json', '').replace('```', '').strip()
-            elif response_text.startswith('```'):
-                response_text = response_text.replace('```', '').strip()
-            
-            # Parse JSON response
+            answers = json.loads(_strip_code_fence(completion.choices[0].message.content))
+            if not isinstance(answers, list):
+                raise ValueError("batch response is not a JSON array")
+        except Exception:
+            self._settle(attempt, success=False)
+            raise
+        
+        elapsed_ms = _elapsed_ms(started)
+        results = {}
+        for answer in answers:
+            if not isinstance(answer, dict) or not isinstance(answer.get('index'), int):
+                continue
+            position = answer.pop('index') - 1
+            if not 0 <= position < len(keys):
+                continue
+            key = keys[position]
+            result = self._build_result(answer, inputs[key])
+            if result.get('success') and not result['recommendation'].get('is_fallback'):
+                self.cache.set(key, result)
+                results[key] = (result, elapsed_ms)
+        
+        # Diukur sejak chunk ini mulai jalan, jadi waktu antre di executor tidak dihitung
+        elapsed = time.monotonic() - started
+        self._settle(attempt, success=bool(results) and elapsed <= Config.LLM_BATCH_DEADLINE_SECONDS)
+        return results
+    
+    def warm_presets(self):
+        """Precompute recommendations for all MOOD_PRESETS."""
+        for mood_key, preset_text in MOOD_PRESETS.items():
             try:
-                recommendation = json.loads(response_text)
-                
-                # Validate response structure
-                if not self._validate_recommendation(recommendation):
-                    return self._fallback_recommendation(user_input)
-                
-                # Add menu item details
-                menu_item = self._get_menu_item_by_id(recommendation['recommended_item_id'])
-                if menu_item:
-                    recommendation['menu_item'] = menu_item
-                    
-                    # Add alternative menu item if exists
-                    if recommendation.get('alternative'):
-                        alt_item = self._get_menu_item_by_id(recommendation['alternative'])
-                        if alt_item:
-                            recommendation['alternative_item'] = alt_item
+                self.get_mood_recommendation(preset_text)
+            except Exception as e:
+                print(f"❌ Preset warm-up error ({mood_key}): {e}")
+    
+    def stream_mood_recommendation(self, user_input: str) -> Iterator[Dict]:
+        """Stream recommendation events: 'item' as soon as the ID is known, 'reason' deltas, then 'done'."""
+        key = self.cache.make_key(user_input, self.get_menu_version())
+        result = self.cache.get(key)
+        if result is not None:
+            result['cached'] = True
+        else:
+            match = self.get_classifier().classify(user_input)
+            if match and match['confident']:
+                result = self._local_recommendation(match)
+        
+        if result is not None:
+            yield from self._result_events(result)
+            return
+        
+        # Stream (atau request biasa) identik yang sedang berjalan: tunggu hasil akhirnya,
+        # jadi tetap satu panggilan upstream per key
+        call, leader = self.single_flight.begin(key)
+        if not leader:
+            yield from self._result_events(self.single_flight.wait(call))
+            return
+        
+        result = None
+        try:
+            if not self.breaker.allow():
+                result = self._fallback_recommendation(user_input)
+                yield from self._result_events(result)
+                return
+            
+            for event in self._stream_llm(key, user_input):
+                if event['event'] == 'done':
+                    result = event['data']
+                yield event
+        finally:
+            # Client putus di tengah stream: follower tetap dapat jawaban (fallback)
+            if result is None:
+                result = self._fallback_recommendation(user_input)
+            self.single_flight.finish(key, call, result)
+    
+    def _stream_llm(self, key: str, user_input: str) -> Iterator[Dict]:
+        """Stream the LLM completion, parsing the JSON answer incrementally."""
+        deadline = time.monotonic() + Config.LLM_DEADLINE_SECONDS
+        text = ''
+        item_sent = False
+        reason_sent = ''
+        # Chunk dibaca thread terpisah supaya deadline tetap berlaku walau upstream diam
+        chunks = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(target=self._read_stream, args=(user_input, chunks, stop),
+                         name='llm-stream', daemon=True).start()
+        
+        try:
+            while True:
+                timeout = None if item_sent else max(0.0, deadline - time.monotonic())
+                try:
+                    piece = chunks.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"no item within {Config.LLM_DEADLINE_SECONDS}s")
+                if piece is None:
+                    break
+                if isinstance(piece, Exception):
+                    raise piece
+                text += piece
                 
-                return {
-                    'success': True,
-                    'recommendation': recommendation
-                }
+                if not item_sent:
+                    # Angka baru dipakai setelah ada terminator: "1" bisa saja awal dari "12"
+                    match = re.search(r'"recommended_item_id"\s*:\s*(\d+)\s*[,}\r\n]', text)
+                    menu_item = self._get_menu_item_by_id(int(match.group(1))) if match else None
+                    if menu_item:
+                        item_sent = True
+                        yield {'event': 'item', 'data': {
+                            'recommended_item_id': menu_item['id'],
+                            'menu_item': menu_item
+                        }}
                 
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON Parse Error: {e}")
-                print(f"Raw response: {response_text}")
-                return self._fallback_recommendation(user_input)
+                if item_sent:
+                    match = re.search(r'"reason"\s*:\s*"', text)
+                    if match:
+                        reason = _partial_json_string(text, match.end())
+                        if len(reason) > len(reason_sent):
+                            yield {'event': 'reason', 'data': {'delta': reason[len(reason_sent):]}}
+                            reason_sent = reason
+                            
+        except Exception as e:
+            print(f"❌ LLM Stream Error: {e}")
+            self.breaker.record_failure()
+            result = self._fallback_recommendation(user_input)
+            if item_sent:
+                yield {'event': 'done', 'data': result}
+            else:
+                yield from self._result_events(result)
+            return
+        finally:
+            stop.set()
+        
+        result = self._parse_llm_response(text.strip(), user_input)
+        if result.get('success') and not result['recommendation'].get('is_fallback'):
+            self.cache.set(key, result)
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure()
+        
+        if item_sent:
+            yield {'event': 'done', 'data': result}
+        else:
+            yield from self._result_events(result)
+    
+    def _read_stream(self, user_input: str, chunks: queue.Queue, stop: threading.Event):
+        """Reader thread: put content deltas on `chunks`, then None (end) or the exception."""
+        stream = None
+        try:
+            stream = self._create_completion(user_input, stream=True)
+            for chunk in stream:
+                if stop.is_set():
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunks.put(chunk.choices[0].delta.content)
+            chunks.put(None)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            if stream is not None and hasattr(stream, 'close'):
+                stream.close()
+    
+    @staticmethod
+    def _result_events(result: Dict) -> Iterator[Dict]:
+        """Events for a recommendation that is already complete."""
+        if result.get('success'):
+            rec = result['recommendation']
+            yield {'event': 'item', 'data': {
+                'recommended_item_id': rec['recommended_item_id'],
+                'menu_item': rec.get('menu_item')
+            }}
+            yield {'event': 'reason', 'data': {'delta': rec['reason']}}
+        yield {'event': 'done', 'data': result}
+    
+    def _get_llm_recommendation(self, user_input: str) -> Dict:
+        """Get mood-based recommendation dari LLM."""
+        try:
+            completion = self._create_completion(user_input)
+            response_text = completion.choices[0].message.content.strip()
+            return self._parse_llm_response(response_text, user_input)
                 
         except Exception as e:
             print(f"❌ LLM API Error: {e}")
             return self._fallback_recommendation(user_input)
     
+    def _create_completion(self, user_input: str, stream: bool = False):
+        """Send the chat completion request (optionally streaming)."""
+        return self.client.chat.completions.create(
+            model="meta-llama/llama-3.3-8b-instruct:free",
+            messages=self.create_ai_messages(user_input),
+            temperature=0.3,        # Slightly creative but consistent
+            max_tokens=300,         # Reasonable length
+            top_p=0.9,
+            frequency_penalty=0.2,
+            presence_penalty=0.1,
+            stream=stream,
+        )
+    
+    def _parse_llm_response(self, response_text: str, user_input: str) -> Dict:
+        """Parse and validate the LLM JSON answer (fallback if invalid)."""
+        # Parse JSON response
+        try:
+            recommendation = json.loads(_strip_code_fence(response_text))
+            return self._build_result(recommendation, user_input)
+            
+        except json.JSONDecodeError as e:
+            print(f"❌ JSON Parse Error: {e}")
+            print(f"Raw response: {response_text}")
+            return self._fallback_recommendation(user_input)
+    
+    def _build_result(self, recommendation, user_input: str) -> Dict:
+        """Validate one parsed recommendation and add menu item details."""
+        # Validate response structure
+        if not isinstance(recommendation, dict) or not self._validate_recommendation(recommendation):
+            return self._fallback_recommendation(user_input)
+        
+        # Add menu item details
+        menu_item = self._get_menu_item_by_id(recommendation['recommended_item_id'])
+        if menu_item:
+            recommendation['menu_item'] = menu_item
+            
+            # Add alternative menu item if exists
+            if recommendation.get('alternative'):
+                alt_item = self._get_menu_item_by_id(recommendation['alternative'])
+                if alt_item:
+                    recommendation['alternative_item'] = alt_item
+        
+        return {
+            'success': True,
+            'recommendation': recommendation
+        }
+    
     def _validate_recommendation(self, rec: Dict) -> bool:
         """Validate recommendation structure."""
         required_fields = ['recommended_item_id', 'confidence', 'reason']
@@ -140,33 +545,39 @@ Example matching logic:
                 return item
         return None
     
-    def _fallback_recommendation(self, user_input: str) -> Dict:
-        """Fallback recommendation jika LLM gagal."""
-        # Simple keyword-based fallback
-        user_lower = user_input.lower()
-        
-        fallback_map = {
-            'tired|capek|energi|fokus|kerja': {'id': 1, 'reason': 'Americano cocok untuk memberikan energi dan fokus yang kamu butuhkan'},
-            'stress|lelah|tenang|comfort': {'id': 3, 'reason': 'Latte memberikan rasa lembut dan menenangkan untuk meredakan stress'},
-            'panas|hot|dingin|segar': {'id': 4, 'reason': 'Cold Brew perfect untuk cuaca panas dan memberikan kesegaran'},
-            'nyaman|cozy|santai|hangout': {'id': 2, 'reason': 'Cappuccino memberikan kehangatan dan kenyamanan yang pas'},
-            'kreatif|unik|sehat|mindful': {'id': 5, 'reason': 'Matcha Latte memberikan energi tenang yang cocok untuk aktivitas kreatif'}
+    def _local_recommendation(self, match: Dict, is_fallback: bool = False) -> Dict:
+        """Build recommendation response from a local classifier match."""
+        item = match['item']
+        if match['matched_tags']:
+            reason = f"{item['name']} cocok dengan suasana hatimu yang {', '.join(match['matched_tags'][:3])}. {item['description']}"
+        else:
+            reason = f"{item['name']} cocok dengan suasana hatimu hari ini. {item['description']}"
+        
+        alternative = match['alternative']
+        recommendation = {
+            'recommended_item_id': item['id'],
+            'confidence': int(min(95, 50 + 100 * match['margin'])),
+            'reason': reason,
+            'alternative': alternative['id'] if alternative else None,
+            'menu_item': item,
+            'source': 'local'
         }
+        if alternative:
+            recommendation['alternative_item'] = alternative
+        if is_fallback:
+            recommendation['is_fallback'] = True
         
-        for keywords, recommendation in fallback_map.items():
-            if any(keyword in user_lower for keyword in keywords.split('|')):
-                menu_item = self._get_menu_item_by_id(recommendation['id'])
-                return {
-                    'success': True,
-                    'recommendation': {
-                        'recommended_item_id': recommendation['id'],
-                        'confidence': 75,
-                        'reason': recommendation['reason'],
-                        'alternative': None,
-                        'menu_item': menu_item,
-                        'is_fallback': True
-                    }
-                }
+        return {
+            'success': True,
+            'recommendation': recommendation
+        }
+    
+    def _fallback_recommendation(self, user_input: str) -> Dict:
+        """Fallback recommendation jika LLM gagal."""
+        # Pakai match terbaik dari classifier lokal (walaupun belum confident)
+        match = self.get_classifier().classify(user_input)
+        if match and match['score'] >= self.classifier.min_score:
+            return self._local_recommendation(match, is_fallback=True)
         
         # Ultimate fallback - most popular item
         popular = self.db.get_most_popular_item()
@@ -189,6 +600,43 @@ Example matching logic:
             'error': 'Tidak dapat memberikan rekomendasi saat ini'
         }
 
+def _elapsed_ms(started: float) -> float:
+    return round((time.monotonic() - started) * 1000, 3)
+
+
+def _strip_code_fence(response_text: str) -> str:
+    """Clean up response (remove markdown formatting if any)."""
+    response_text = response_text.strip()
+    if response_text.startswith('```json'):
+        response_text = response_text.replace('```json', '').replace('```', '').strip()
+    elif response_text.startswith('```'):
+        response_text = response_text.replace('```', '').strip()
+    return response_text
+
+
+def _partial_json_string(text: str, start: int) -> str:
+    """Decode a (possibly unfinished) JSON string value starting right after its opening quote."""
+    i, safe = start, start
+    while i < len(text):
+        c = text[i]
+        if c == '\\':
+            # Escape yang belum lengkap di akhir chunk ditahan dulu
+            step = 6 if text[i + 1:i + 2] == 'u' else 2
+            if i + step > len(text):
+                break
+            i += step
+        elif c == '"':
+            break
+        else:
+            i += 1
+        safe = i
+    
+    value = json.loads('"' + text[start:safe] + '"', strict=False)
+    # Jangan kirim high surrogate tanpa pasangannya
+    if value and '\ud800' <= value[-1] <= '\udbff':
+        value = value[:-1]
+    return value
+
 # Quick mood presets
 MOOD_PRESETS = {
     'tired': 'Hari ini capek banget, butuh yang bikin semangat tapi gak terlalu strong',
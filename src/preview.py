@@ -0,0 +1,128 @@
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from .config import Config
+from .metrics import metrics
+
+
+class PreviewEncoder:
+    """JPEG encoder untuk preview /video_feed, terpisah dari resolusi inference.
+
+    Frame di-downscale ke PREVIEW_WIDTH dan kotak wajah digambar di salinan
+    kecil itu (frame inference tidak disentuh). Frame dibatasi max FPS, frame
+    yang tidak berubah tidak di-encode ulang, dan kualitas/FPS diturunkan
+    bila client lambat menguras stream (lihat report_sent), lalu dinaikkan
+    lagi perlahan saat client kembali lancar. Satu instance per client.
+    """
+
+    def __init__(self, width: int = Config.PREVIEW_WIDTH, quality: int = Config.PREVIEW_QUALITY,
+                 max_fps: Optional[float] = Config.PREVIEW_MAX_FPS, min_quality: int = Config.PREVIEW_MIN_QUALITY,
+                 min_fps: float = Config.PREVIEW_MIN_FPS,
+                 change_threshold: float = Config.PREVIEW_CHANGE_THRESHOLD,
+                 keepalive_seconds: float = Config.PREVIEW_KEEPALIVE_SECONDS):
+        self.width = width
+        self.max_quality = self.quality = quality
+        self.min_quality = min(min_quality, quality)
+        self.max_fps = self.fps = max_fps  # None = tanpa batas (replay/benchmark)
+        self.min_fps = min_fps
+        self.change_threshold = change_threshold
+        self.keepalive_seconds = keepalive_seconds
+
+        self._next_at = 0.0
+        self._last_sent_at = 0.0
+        self._last_thumb = None
+        self._last_box = None
+        self._fast_streak = 0
+        self.frames_in = 0
+        self.encoded = 0
+        self.skipped_rate = 0
+        self.skipped_unchanged = 0
+        self.bytes_sent = 0
+
+    def encode(self, frame: np.ndarray, bbox=None, stable: bool = False) -> Optional[bytes]:
+        """Return JPEG bytes for the preview, or None when this frame should not be sent."""
+        self.frames_in += 1
+        now = time.monotonic()
+        if self.fps and now < self._next_at:
+            self.skipped_rate += 1
+            return None
+        with metrics.span('encode_frame'):
+            return self._encode(frame, bbox, stable, now)
+
+    def _encode(self, frame, bbox, stable, now):
+        import cv2  # Lazy: modul ini ikut di-import app.py, juga di mode API-only
+        height, width = frame.shape[:2]
+        scale = min(self.width / width, 1.0) if self.width else 1.0
+        small = frame if scale == 1.0 else cv2.resize(
+            frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+        # Tidak ada yang berubah (gambar hampir sama, kotak sama): tidak perlu encode/kirim,
+        # kecuali sesekali sebagai keep-alive koneksi
+        box = (tuple(int(v * scale) for v in bbox), bool(stable)) if bbox is not None else None
+        thumb = cv2.cvtColor(cv2.resize(small, (32, 18), interpolation=cv2.INTER_AREA),
+                             cv2.COLOR_BGR2GRAY).astype(np.int16)
+        unchanged = (self._last_thumb is not None and box == self._last_box and
+                     np.abs(thumb - self._last_thumb).mean() < self.change_threshold)
+        if unchanged and now - self._last_sent_at < self.keepalive_seconds:
+            self.skipped_unchanged += 1
+            return None
+
+        if box is not None:
+            if small is frame:
+                small = frame.copy()
+            (x1, y1, x2, y2), is_stable = box
+            color = (0, 255, 0) if is_stable else (255, 255, 0)
+            cv2.rectangle(small, (x1, y1), (x2, y2), color, 2)
+
+        ret, buffer = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)])
+        if not ret:
+            return None
+
+        self._last_thumb = thumb
+        self._last_box = box
+        self._last_sent_at = now
+        if self.fps:
+            # Jadwal dari waktu ideal (bukan `now`) supaya jitter kamera tidak menurunkan FPS rata-rata
+            interval = 1.0 / self.fps
+            base = self._next_at if now - self._next_at < interval else now
+            self._next_at = base + interval
+        self.encoded += 1
+        return buffer.tobytes()
+
+    def report_sent(self, nbytes: int, seconds: float):
+        """Feed back how long the client took to drain one frame and adapt quality/FPS."""
+        self.bytes_sent += nbytes
+        if not self.fps:
+            return
+
+        budget = 1.0 / self.fps
+        if seconds > budget * 0.5:
+            # Client/jaringan tertinggal: turunkan kualitas dulu, baru FPS
+            self._fast_streak = 0
+            if self.quality > self.min_quality:
+                self.quality = max(self.min_quality, self.quality - 10)
+            else:
+                self.fps = max(self.min_fps, self.fps * 0.75)
+        elif seconds < budget * 0.1:
+            # Naik lagi setelah ~2 detik lancar: FPS dulu, baru kualitas
+            self._fast_streak += 1
+            if self._fast_streak >= 2 * self.fps:
+                self._fast_streak = 0
+                if self.fps < self.max_fps:
+                    self.fps = min(self.max_fps, self.fps * 1.25)
+                elif self.quality < self.max_quality:
+                    self.quality = min(self.max_quality, self.quality + 5)
+
+    def get_stats(self) -> Dict:
+        return {
+            'width': self.width,
+            'quality': self.quality,
+            'fps': round(self.fps, 2) if self.fps else None,
+            'frames_in': self.frames_in,
+            'encoded': self.encoded,
+            'skipped_rate': self.skipped_rate,
+            'skipped_unchanged': self.skipped_unchanged,
+            'bytes_sent': self.bytes_sent
+        }
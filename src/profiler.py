@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict
+
+from .config import Config
+
+# Leaf frame di modul-modul ini berarti thread sedang menunggu (bukan bekerja)
+_IDLE_MODULES = ('threading.py', 'selectors.py', 'queue.py', 'socketserver.py', 'socket.py')
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is already running."""
+
+
+class SamplingProfiler:
+    """Sampling profiler untuk proses yang sedang berjalan.
+
+    Thread sampler membaca sys._current_frames() setiap interval dan
+    menghitung stack per thread (format "collapsed", siap untuk flamegraph.pl
+    atau speedscope). Tidak memasang trace hook, jadi overhead hanya ada
+    selama profile berjalan dan durasinya dibatasi PROFILER_MAX_SECONDS.
+    """
+
+    def __init__(self, max_seconds: float = Config.PROFILER_MAX_SECONDS):
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+
+    def profile(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict:
+        """Sample all threads for `seconds` and return collapsed stack counts."""
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        interval = min(max(interval, 0.001), 1.0)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy('A profile is already running')
+
+        try:
+            result = {}
+            sampler = threading.Thread(
+                target=self._sample, args=(seconds, interval, include_idle, result),
+                name='profiler-sampler', daemon=True)
+            sampler.start()
+            sampler.join()
+            return result
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds, interval, include_idle, result):
+        own_ident = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                if not include_idle and _is_idle(frame):
+                    continue
+                stacks[_collapse(names.get(ident, str(ident)), frame)] += 1
+            samples += 1
+            time.sleep(interval)
+
+        result.update({
+            'seconds': round(time.perf_counter() - started, 3),
+            'interval': interval,
+            'samples': samples,
+            'stacks': stacks
+        })
+
+
+def _is_idle(frame) -> bool:
+    return os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES
+
+
+def _collapse(thread_name: str, frame) -> str:
+    """Stack as "thread;outer;...;leaf" with frames formatted as module:function."""
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    parts.append(thread_name.replace(';', '_').replace(' ', '_'))
+    return ';'.join(reversed(parts))
+
+
+def top_functions(stacks: Counter, limit: int = 20) -> Dict[str, int]:
+    """Samples per leaf function (where the time is actually spent)."""
+    leaves = Counter()
+    for stack, count in stacks.items():
+        leaves[stack.rsplit(';', 1)[-1]] += count
+    return dict(leaves.most_common(limit))
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Render stacks in collapsed format (one "stack count" per line)."""
+    return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
@@ -2,8 +2,8 @@ from flask import jsonify
 
 class PurchaseHandler:
     @staticmethod
-    def process_purchase(current_session, db, logger, state, request):
-        """Process purchase order."""
+    def process_purchase(current_session, db, logger, reset_state, request):
+        """Process purchase order (reset_state: callback yang me-reset state recognition kiosk ini)."""
         if not current_session.get('customer_id'):
             return jsonify({'error': 'No customer session'}), 400
         
@@ -19,7 +19,8 @@ class PurchaseHandler:
                 menu_id = order.get('menu_id')
                 quantity = order.get('quantity', 1)
                 
-                success = db.add_purchase(current_session['customer_id'], menu_id, quantity)
+                success = db.add_purchase(current_session['customer_id'], menu_id, quantity,
+                                          current_session.get('session_id'))
                 if success:
                     # Get menu item for logging
                     menu_items = db.get_menu()
@@ -38,7 +39,7 @@ class PurchaseHandler:
                 'session_id': None, 
                 'status': 'waiting'
             })
-            state.reset_state()
+            reset_state()
             
             return jsonify({
                 'status': 'success', 
@@ -1,4 +1,5 @@
 from datetime import datetime
+from .metrics import metrics
 
 class RecognitionHandler:
     def __init__(self, face_processor, state_manager, database, logger):
@@ -7,6 +8,7 @@ class RecognitionHandler:
         self.db = database
         self.logger = logger
         
+    @metrics.timed('recognition')
     def process_face_detection(self, frame, current_session):
         """Process face detection and recognition logic."""
         face_found, confidence, bbox = self.face_processor.detect_faces(frame)
@@ -61,21 +63,29 @@ class RecognitionHandler:
             
     def _handle_existing_customer(self, customer_id, current_session):
         """Handle existing customer recognition."""
-        customer = self.db.get_customer(customer_id)
-        if customer:
-            current_session['customer_id'] = customer_id
-            current_session['status'] = 'recognized'
-            self.state.set_current_visit(customer_id)
-            
-            first_visit = datetime.fromisoformat(customer['first_seen']).strftime("%d-%m-%Y %H:%M:%S")
-            last_purchases = self.db.get_customer_purchases_with_menu(customer_id)
-            
-            msg = f"Selamat datang kembali! Member sejak {first_visit}"
-            if last_purchases:
-                last_item = last_purchases[0]['menu_name']
-                msg += f"\nTerakhir pesan: {last_item}"
-            self.logger.log(msg)
-            
+        writer = self.face_processor.writer
+        # Registrasi yang masih di antrian dipakai langsung dari memori, tanpa menunggu disk
+        customer = writer.pending_customer(customer_id) or self.db.get_customer(customer_id)
+        if not customer:
+            # Registrasi gagal tersimpan / customer nonaktif: coba lagi di buffer stabil berikutnya
+            self.logger.log(f"⚠️ Customer {customer_id} tidak ditemukan di database", level='warning')
+            self.state.buffer_stable = False
+            return current_session, None, True
+
+        current_session['customer_id'] = customer_id
+        current_session['status'] = 'recognized'
+        self.state.set_current_visit(customer_id)
+        writer.update_visit(customer_id)
+        
+        first_visit = datetime.fromisoformat(customer['first_seen']).strftime("%d-%m-%Y %H:%M:%S")
+        last_purchases = self.db.get_customer_purchases_with_menu(customer_id, limit=1)
+        
+        msg = f"Selamat datang kembali! Member sejak {first_visit}"
+        if last_purchases:
+            last_item = last_purchases[0]['menu_name']
+            msg += f"\nTerakhir pesan: {last_item}"
+        self.logger.log(msg)
+        
         return current_session, None, True
         
     def _handle_new_customer(self, current_emb, face_img, current_session):
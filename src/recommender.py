@@ -0,0 +1,221 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .config import Config
+
+
+class PersonalRecommender:
+    """Rekomendasi personal dari riwayat pembelian, dihitung di depan (offline).
+
+    Secara periodik membangun:
+    - affinity customer x menu (log quantity, diberi decay berdasarkan umur
+      pembelian terakhir)
+    - matriks co-purchase menu x menu (cosine antar item yang dibeli oleh
+      customer yang sama)
+    lalu menyimpan skor akhir per customer, sehingga request hanya perlu
+    mengambil satu baris dan mengurutkan O(ukuran menu).
+
+    Matriks sengaja dense: menu hanya puluhan item, jadi 1 juta customer x
+    50 item float32 = 200 MB, dan baris skor (preferensi + co-purchase)
+    hampir penuh sehingga format sparse tidak lebih hemat.
+    """
+
+    def __init__(self, db, refresh_seconds: float = Config.RECOMMENDER_REFRESH_SECONDS,
+                 half_life_days: float = Config.RECOMMENDER_HALF_LIFE_DAYS,
+                 co_purchase_weight: float = Config.RECOMMENDER_CO_PURCHASE_WEIGHT):
+        self.db = db
+        self.refresh_seconds = refresh_seconds
+        self.half_life_days = half_life_days
+        self.co_purchase_weight = co_purchase_weight
+
+        # (menu_items, menu_index, customer_index, scores, popularity, co_purchase)
+        # diganti sekaligus agar aman dibaca antar thread
+        self._model = ([], {}, {}, None, None, None)
+        # customer_id -> (mulai dihitung, baris skor): dihitung ulang setelah pembelian,
+        # berlaku sampai rebuild berikutnya
+        self._overrides = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.built_at = None
+        self.build_seconds = None
+
+    def start(self):
+        """Build the model now and keep refreshing it in the background."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='recommender-refresh', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop.set()
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.rebuild()
+            except Exception as e:
+                print(f"❌ Recommender rebuild error: {e}")
+            self._stop.wait(self.refresh_seconds)
+
+    def rebuild(self):
+        """Rebuild affinity and co-purchase matrices from the purchases table."""
+        started = time.monotonic()
+        menu_items = self.db.get_menu()
+        menu_index = {item['id']: i for i, item in enumerate(menu_items)}
+        n_menu = len(menu_items)
+
+        customer_index = {}
+        cust_rows, menu_cols, weights = [], [], []
+        for rows in self.db.iter_purchase_affinity():
+            for customer_id, menu_id, quantity, days_since in rows:
+                col = menu_index.get(menu_id)
+                if col is None:  # Menu sudah tidak tersedia
+                    continue
+                cust_rows.append(customer_index.setdefault(customer_id, len(customer_index)))
+                menu_cols.append(col)
+                weights.append(self._affinity(quantity, days_since))
+
+        affinity = np.zeros((len(customer_index), n_menu), dtype=np.float32)
+        if weights:
+            np.add.at(affinity, (np.array(cust_rows), np.array(menu_cols)),
+                      np.array(weights, dtype=np.float32))
+
+        popularity = affinity.sum(axis=0)
+        popularity = popularity / max(float(popularity.max(initial=0.0)), 1e-12)
+
+        # Co-purchase: berapa customer membeli item i dan j, dinormalisasi cosine
+        bought = (affinity > 0).astype(np.float32)
+        co_counts = bought.T @ bought
+        item_counts = np.sqrt(np.maximum(np.diag(co_counts), 1.0))
+        co_purchase = co_counts / np.outer(item_counts, item_counts)
+        np.fill_diagonal(co_purchase, 0.0)
+
+        scores = self._score_rows(affinity, co_purchase)
+
+        with self._lock:
+            self._model = (menu_items, menu_index, customer_index, scores, popularity, co_purchase)
+            # Pembelian yang di-refresh selama rebuild berjalan mungkin belum terbaca rebuild ini
+            stale = [customer_id for customer_id, (refreshed, _) in self._overrides.items()
+                     if refreshed >= started]
+            self._overrides = {}
+        self.built_at = time.time()
+        self.build_seconds = time.monotonic() - started
+
+        for customer_id in stale:
+            self.refresh_customer(customer_id)
+
+    def _affinity(self, quantity, days_since) -> float:
+        """Affinity of one (customer, menu) pair: log quantity with recency decay."""
+        decay = 0.5 ** (max(days_since or 0.0, 0.0) / self.half_life_days)
+        return float(np.log1p(quantity) * decay)
+
+    def _score_rows(self, affinity: np.ndarray, co_purchase: np.ndarray) -> np.ndarray:
+        """Own preference + items co-purchased with it, each row scaled to [0, 1]."""
+        totals = affinity.sum(axis=1, keepdims=True)
+        preference = affinity / np.maximum(totals, 1e-12)
+        scores = preference + self.co_purchase_weight * (preference @ co_purchase)
+        return scores / np.maximum(scores.max(axis=1, keepdims=True, initial=0.0), 1e-12)
+
+    def refresh_customer(self, customer_id: str):
+        """Recompute one customer's row right away (e.g. after a purchase)."""
+        while True:
+            model = self._model
+            menu_items, menu_index, _, _, _, co_purchase = model
+            if co_purchase is None:
+                return
+
+            started = time.monotonic()
+            affinity = np.zeros((1, len(menu_items)), dtype=np.float32)
+            for rows in self.db.iter_purchase_affinity(customer_id):
+                for _, menu_id, quantity, days_since in rows:
+                    col = menu_index.get(menu_id)
+                    if col is not None:
+                        affinity[0, col] += self._affinity(quantity, days_since)
+
+            row = self._score_rows(affinity, co_purchase)[0]
+            with self._lock:
+                # Baris hanya valid untuk model (dimensi menu) yang dipakai menghitungnya
+                if self._model is model:
+                    self._overrides[customer_id] = (started, row)
+                    return
+
+    def personal_scores(self, customer_id: Optional[str]) -> Optional[np.ndarray]:
+        """Score per menu item for a customer, or None without purchase history."""
+        return self._snapshot(customer_id)[1]
+
+    def _snapshot(self, customer_id: Optional[str]):
+        """(model, personal score row) read together, so both match the same rebuild."""
+        with self._lock:
+            model = self._model
+            override = self._overrides.get(customer_id) if customer_id else None
+        if override is not None:
+            row = override[1]
+            return model, (row if row.any() else None)
+        if not customer_id:
+            return model, None
+
+        _, _, customer_index, scores, _, _ = model
+        idx = customer_index.get(customer_id)
+        return model, (scores[idx] if idx is not None else None)
+
+    def recommend(self, customer_id: Optional[str] = None, top_n: int = 3,
+                  mood_scores: Optional[Dict[int, float]] = None,
+                  mood_weight: float = Config.RECOMMENDER_MOOD_WEIGHT) -> List[Dict]:
+        """Ranked menu suggestions for a customer, optionally blended with mood scores.
+
+        mood_scores: {menu_id: score} dari classifier mood (0..1). Tanpa riwayat
+        pembelian, skor personal diganti popularitas global.
+        """
+        model, personal = self._snapshot(customer_id)
+        menu_items, menu_index, _, _, popularity, _ = model
+        if not menu_items:
+            return []
+
+        source = 'history' if personal is not None else 'popular'
+        if personal is None:
+            personal = popularity
+
+        blended = personal.astype(np.float32)
+        mood = None
+        if mood_scores:
+            mood = np.zeros(len(menu_items), dtype=np.float32)
+            for menu_id, score in mood_scores.items():
+                col = menu_index.get(menu_id)
+                if col is not None:
+                    mood[col] = score
+            blended = (1.0 - mood_weight) * blended + mood_weight * mood
+
+        top_n = max(1, min(top_n, len(menu_items)))
+        top = np.argpartition(-blended, top_n - 1)[:top_n]
+        top = top[np.argsort(-blended[top])]
+
+        results = []
+        for col in top:
+            result = dict(menu_items[col])
+            result['score'] = round(float(blended[col]), 4)
+            result['personal_score'] = round(float(personal[col]), 4)
+            if mood is not None:
+                result['mood_score'] = round(float(mood[col]), 4)
+            result['source'] = source
+            results.append(result)
+        return results
+
+    def get_stats(self) -> Dict:
+        """Get model size and build timing."""
+        menu_items, _, customer_index, _, _, _ = self._model
+        with self._lock:
+            overrides = len(self._overrides)
+        return {
+            'customers': len(customer_index),
+            'menu_items': len(menu_items),
+            'overrides': overrides,
+            'built_at': self.built_at,
+            'build_seconds': round(self.build_seconds, 3) if self.build_seconds is not None else None,
+            'refresh_seconds': self.refresh_seconds
+        }
@@ -0,0 +1,358 @@
+import queue
+import select
+import signal
+import socket
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Optional, Tuple
+
+from werkzeug.exceptions import InternalServerError
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+from werkzeug.wsgi import LimitedStream
+
+from .config import Config
+
+_SERVICE_UNAVAILABLE = (b"HTTP/1.1 503 Service Unavailable\r\nContent-Type: text/plain\r\n"
+                        b"Content-Length: 12\r\nRetry-After: 1\r\nConnection: close\r\n\r\nServer busy\n")
+
+
+class WorkerPool:
+    """Fixed number of daemon worker threads with a bounded number of pending tasks."""
+
+    def __init__(self, size: int, name: str, queue_size: int = 0):
+        self.size = size
+        self.limit = size + queue_size
+        self.outstanding = 0  # Sedang jalan + menunggu di antrian
+        self.busy = 0
+        self.rejected = 0
+        self._tasks = queue.SimpleQueue()
+        self._cond = threading.Condition()
+        for i in range(size):
+            threading.Thread(target=self._run, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, fn: Callable, *args) -> bool:
+        """Queue a task; False when the pool and its queue are full."""
+        with self._cond:
+            if self.outstanding >= self.limit:
+                self.rejected += 1
+                return False
+            self.outstanding += 1
+        self._tasks.put((fn, args))
+        return True
+
+    @property
+    def waiting(self) -> int:
+        """Tasks queued behind busy workers."""
+        with self._cond:
+            return self.outstanding - self.busy
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait until every submitted task has finished."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.outstanding == 0, timeout)
+
+    def _run(self):
+        while True:
+            fn, args = self._tasks.get()
+            with self._cond:
+                self.busy += 1
+            try:
+                fn(*args)
+            finally:
+                with self._cond:
+                    self.busy -= 1
+                    self.outstanding -= 1
+                    self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return {'size': self.size, 'busy': self.busy, 'waiting': self.outstanding - self.busy,
+                    'rejected': self.rejected}
+
+
+class PooledRequestHandler(WSGIRequestHandler):
+    """HTTP/1.1 handler dengan keep-alive; request streaming dipindah ke pool stream.
+
+    Request line dan header dibaca utuh dulu, baru path-nya diperiksa.
+    Request ke path streaming (/video_feed, SSE) yang sudah di-parse itu
+    dijalankan di thread pool stream, sehingga stream berumur panjang tidak
+    pernah memakan worker untuk request API biasa. run_wsgi ditulis ulang karena
+    run_wsgi Werkzeug selalu menutup koneksi setelah satu response.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.handoff = False    # True = koneksi dilanjutkan di pool stream
+        self.streaming = False  # True = handler ini sedang berjalan di pool stream
+
+    def handle(self):
+        try:
+            if self.streaming:
+                # Request stream sudah di-parse oleh worker biasa sebelum dipindah
+                self._respond()
+                return
+            while True:
+                if not self._wait_for_request():
+                    return
+                self.connection.settimeout(self.server.request_timeout)
+                if not self._read_request():
+                    return
+                if self.server.is_stream_path(self.path.split('?', 1)[0]):
+                    self.handoff = self.server.streams.submit(self.server.serve_stream, self)
+                    if not self.handoff:
+                        self.wfile.write(_SERVICE_UNAVAILABLE)
+                    return
+
+                self._respond()
+                if self.close_connection or self.server.draining:
+                    return
+        except (ConnectionError, socket.timeout) as e:
+            self.connection_dropped(e)
+
+    def finish(self):
+        if not self.handoff:
+            super().finish()
+
+    def _wait_for_request(self) -> bool:
+        """Wait for the next request on an idle keep-alive connection.
+
+        Dicek per 0.1 detik: koneksi idle dilepas lebih awal begitu ada
+        koneksi lain yang menunggu worker, supaya tab browser yang idle
+        tidak menahan worker selama SERVER_KEEPALIVE_SECONDS.
+        """
+        # Request pipelined mungkin sudah ada di buffer rfile (select tidak melihatnya)
+        self.connection.settimeout(0.0)
+        try:
+            if self.rfile.peek(1):
+                return True
+        except OSError:
+            return False
+
+        deadline = time.monotonic() + self.server.keepalive_timeout
+        while True:
+            if self.server.workers.waiting:
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.connection], [], [], min(0.1, remaining))
+            if readable:
+                return True
+
+    def _read_request(self) -> bool:
+        """Read and parse the full request line and headers (handle_one_request without dispatch)."""
+        self.raw_requestline = self.rfile.readline(65537)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = self.request_version = self.command = ''
+            self.send_error(414)
+            return False
+        if not self.raw_requestline:
+            self.close_connection = True
+            return False
+        return self.parse_request()
+
+    def _respond(self):
+        # Semua method HTTP ditangani run_wsgi (lihat WSGIRequestHandler.__getattr__)
+        self.run_wsgi()
+        self.wfile.flush()
+
+    def run_wsgi(self):
+        if self.headers.get("Expect", "").lower().strip(" \t") == "100-continue":
+            self.wfile.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+
+        self.environ = environ = self.make_environ()
+        body = None
+        if environ.get('wsgi.input_terminated'):
+            # Body chunked: sisa body tidak bisa dibuang dengan aman, tutup setelah response
+            self.close_connection = True
+        else:
+            body = LimitedStream(self.rfile, int(environ.get('CONTENT_LENGTH') or 0))
+            environ['wsgi.input'] = body
+        if self.streaming or self.server.draining or self.server.workers.waiting:
+            # Koneksi lain sedang menunggu worker: jangan tahan worker ini untuk keep-alive
+            self.close_connection = True
+
+        status_set: Optional[str] = None
+        headers_set = None
+        headers_sent = False
+        chunked = False
+
+        def write(data: bytes):
+            nonlocal headers_sent, chunked
+            assert status_set is not None, "write() before start_response"
+            if not headers_sent:
+                code_str, _, msg = status_set.partition(" ")
+                code = int(code_str)
+                self.send_response(code, msg)
+                header_keys = set()
+                for key, value in headers_set:
+                    self.send_header(key, value)
+                    header_keys.add(key.lower())
+                if not ("content-length" in header_keys or environ["REQUEST_METHOD"] == "HEAD"
+                        or 100 <= code < 200 or code in {204, 304}):
+                    chunked = True
+                    self.send_header("Transfer-Encoding", "chunked")
+                if self.close_connection:
+                    self.send_header("Connection", "close")
+                self.end_headers()
+                headers_sent = True
+
+            if data:
+                if chunked:
+                    self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                else:
+                    self.wfile.write(data)
+            self.wfile.flush()
+
+        def start_response(status, headers, exc_info=None):
+            nonlocal status_set, headers_set
+            if exc_info:
+                try:
+                    if headers_sent:
+                        raise exc_info[1].with_traceback(exc_info[2])
+                finally:
+                    exc_info = None
+            elif headers_set is not None:
+                raise AssertionError("Headers already set")
+            status_set, headers_set = status, headers
+            return write
+
+        def execute(app):
+            application_iter = app(environ, start_response)
+            try:
+                for data in application_iter:
+                    write(data)
+                if not headers_sent:
+                    write(b"")
+                if chunked:
+                    self.wfile.write(b"0\r\n\r\n")
+                    self.wfile.flush()
+            finally:
+                if hasattr(application_iter, "close"):
+                    application_iter.close()
+
+        try:
+            execute(self.server.app)
+            if body is not None and not self.close_connection:
+                body.exhaust()  # Buang body yang tidak dibaca app supaya request berikutnya utuh
+        except (ConnectionError, socket.timeout) as e:
+            self.close_connection = True
+            self.connection_dropped(e, environ)
+        except Exception:
+            if self.server.passthrough_errors:
+                raise
+            self.close_connection = True
+            if not headers_sent:
+                status_set, headers_set = None, None
+                try:
+                    execute(InternalServerError())
+                except Exception:
+                    pass
+            self.server.log("error", f"Error on request:\n{traceback.format_exc()}")
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """WSGI server untuk produksi: thread pool terbatas, pool terpisah untuk stream.
+
+    Pengganti app.run(threaded=True), yang membuat satu thread baru per
+    koneksi tanpa batas. Koneksi di luar kapasitas langsung mendapat 503.
+    """
+
+    multithread = True
+
+    def __init__(self, host: str, port: int, app, workers: int = Config.SERVER_WORKERS,
+                 queue_size: int = Config.SERVER_QUEUE_SIZE, stream_workers: int = Config.SERVER_STREAM_WORKERS,
+                 keepalive_timeout: float = Config.SERVER_KEEPALIVE_SECONDS,
+                 request_timeout: float = Config.SERVER_REQUEST_TIMEOUT,
+                 stream_paths: Tuple[str, ...] = Config.SERVER_STREAM_PATHS):
+        super().__init__(host, port, app, handler=PooledRequestHandler)
+        self.workers = WorkerPool(workers, 'http-worker', queue_size)
+        self.streams = WorkerPool(stream_workers, 'http-stream')
+        self.keepalive_timeout = keepalive_timeout
+        self.request_timeout = request_timeout
+        self.stream_paths = tuple(stream_paths)
+        self.draining = False
+
+    def is_stream_path(self, path: str) -> bool:
+        return path.startswith(self.stream_paths)
+
+    def process_request(self, request, client_address):
+        """Called by the accept loop: hand the connection to a worker (or reject it)."""
+        if not self.workers.submit(self._serve_connection, request, client_address):
+            try:
+                request.sendall(_SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def _serve_connection(self, request, client_address):
+        handler = None
+        try:
+            handler = self.RequestHandlerClass(request, client_address, self)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            if handler is None or not handler.handoff:
+                self.shutdown_request(request)
+
+    def serve_stream(self, handler: PooledRequestHandler):
+        """Continue a handed-off connection in the stream pool."""
+        handler.handoff = False
+        handler.streaming = True
+        try:
+            handler.handle()
+            handler.finish()
+        except Exception:
+            self.handle_error(handler.request, handler.client_address)
+        finally:
+            self.shutdown_request(handler.request)
+
+    def drain(self, timeout: float) -> bool:
+        """Stop keep-alive and wait for running requests and streams to finish."""
+        self.draining = True
+        deadline = time.monotonic() + timeout
+        workers_done = self.workers.wait_idle(timeout)
+        streams_done = self.streams.wait_idle(max(0.0, deadline - time.monotonic()))
+        return workers_done and streams_done
+
+    def get_stats(self) -> Dict:
+        return {'workers': self.workers.get_stats(), 'streams': self.streams.get_stats()}
+
+
+def serve(app, host: str = Config.HOST, port: int = Config.PORT, on_drain: Optional[Callable] = None,
+          on_exit: Optional[Callable] = None, shutdown_timeout: float = Config.SERVER_SHUTDOWN_TIMEOUT, **options):
+    """Run the pooled server until SIGINT/SIGTERM, then shut down gracefully.
+
+    Urutan shutdown: berhenti menerima koneksi → on_drain() (minta stream
+    selesai) → tunggu request/stream yang berjalan (maks shutdown_timeout)
+    → on_exit() (lepas kamera, flush antrian DB).
+    """
+    server = PooledWSGIServer(host, port, app, **options)
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    acceptor = threading.Thread(target=server.serve_forever, name='http-acceptor', daemon=True)
+    acceptor.start()
+    print(f" * Serving on http://{host}:{server.port} ({server.workers.size} workers, "
+          f"{server.streams.size} stream workers, keep-alive {server.keepalive_timeout:g}s)")
+
+    while not stop.wait(1.0):
+        pass
+
+    print(" * Shutting down: waiting for running requests...")
+    server.shutdown()
+    if on_drain:
+        on_drain()
+    if not server.drain(shutdown_timeout):
+        print(f" * Some requests still running after {shutdown_timeout:g}s: {server.get_stats()}")
+    if on_exit:
+        on_exit()
+    server.server_close()
@@ -0,0 +1,124 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from .config import Config
+
+
+def _waiting_session() -> Dict:
+    return {'customer_id': None, 'session_id': None, 'status': 'waiting'}
+
+
+class SessionStore:
+    """Session per kiosk/till, thread-safe dengan TTL.
+
+    Setiap customer yang dikenali membuka baris baru di tabel `sessions`
+    (lewat create_session); session ditutup sebagai completed, cancelled
+    atau expired. Caller selalu menerima salinan dict session.
+    """
+
+    def __init__(self, db, ttl_seconds: float = Config.SESSION_TTL_SECONDS, events=None):
+        self.db = db
+        self.ttl = ttl_seconds
+        self.events = events  # EventBroker opsional: setiap perubahan status di-push ke UI
+        self._sessions = {}  # kiosk_id -> (updated_at, session)
+        self._lock = threading.Lock()
+
+    def get(self, kiosk_id: str) -> Dict:
+        """Get a copy of the kiosk's session (expired sessions are closed first)."""
+        expired = None
+        with self._lock:
+            entry = self._sessions.get(kiosk_id)
+            if entry is None:
+                return _waiting_session()
+            updated_at, session = entry
+            if time.monotonic() - updated_at > self.ttl:
+                del self._sessions[kiosk_id]
+                expired = session
+                session = _waiting_session()
+            session = dict(session)
+
+        if expired is not None:
+            self._finish_in_db(expired, 'expired')
+            self._publish(kiosk_id, session)
+        return session
+
+    def touch(self, kiosk_id: str):
+        """Extend the kiosk's session TTL (customer is still interacting)."""
+        with self._lock:
+            entry = self._sessions.get(kiosk_id)
+            if entry is not None:
+                self._sessions[kiosk_id] = (time.monotonic(), entry[1])
+
+    def update(self, kiosk_id: str, session: Dict) -> Dict:
+        """Store session state; opens a DB session when a new customer is identified."""
+        customer_id = session.get('customer_id')
+        with self._lock:
+            entry = self._sessions.get(kiosk_id)
+            previous = entry[1] if entry else _waiting_session()
+        changed = customer_id != previous.get('customer_id')
+        replaced = previous if changed and previous.get('session_id') else None
+
+        session = dict(session)
+        if changed and customer_id:
+            session['session_id'] = self.db.create_session(customer_id)
+        elif not changed:
+            session['session_id'] = previous.get('session_id')
+
+        with self._lock:
+            self._sessions[kiosk_id] = (time.monotonic(), session)
+
+        if replaced is not None:
+            self._finish_in_db(replaced, 'cancelled')
+        self._publish(kiosk_id, session)
+        return dict(session)
+
+    def close(self, kiosk_id: str, status: str = 'completed', session_id: Optional[str] = None) -> Dict:
+        """Finish the kiosk's session and return it to waiting.
+
+        Dengan `session_id`, hanya session itu yang ditutup: jika kiosk sudah
+        pindah ke customer baru, session baru tetap terbuka.
+        """
+        with self._lock:
+            entry = self._sessions.get(kiosk_id)
+            if entry is not None and session_id is not None and entry[1].get('session_id') != session_id:
+                entry = None
+            elif entry is not None:
+                del self._sessions[kiosk_id]
+
+        if entry is None:
+            if session_id is not None:
+                self._finish_in_db({'session_id': session_id}, status)
+                return self.get(kiosk_id)
+        else:
+            self._finish_in_db(entry[1], status)
+        session = _waiting_session()
+        self._publish(kiosk_id, session)
+        return session
+
+    def list_sessions(self) -> List[Dict]:
+        """Get all active (non-expired) kiosk sessions."""
+        now = time.monotonic()
+        with self._lock:
+            kiosk_ids = list(self._sessions)
+        sessions = []
+        for kiosk_id in kiosk_ids:
+            session = self.get(kiosk_id)
+            if session['customer_id']:
+                with self._lock:
+                    entry = self._sessions.get(kiosk_id)
+                idle = now - entry[0] if entry else 0.0
+                sessions.append(dict(session, kiosk_id=kiosk_id, idle_seconds=round(idle, 1)))
+        return sessions
+
+    def _publish(self, kiosk_id: str, session: Dict):
+        if self.events:
+            self.events.publish('status', dict(session, kiosk_id=kiosk_id))
+
+    def _finish_in_db(self, session: Dict, status: str):
+        if not session.get('session_id'):
+            return
+        try:
+            self.db.update_session_status(session['session_id'], status)
+        except Exception as e:
+            print(f"❌ Session update error: {e}")
@@ -0,0 +1,77 @@
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Gabungkan panggilan concurrent dengan key yang sama menjadi satu.
+
+    Caller pertama (leader) menjalankan fungsi; caller lain dengan key yang
+    sama menunggu dan menerima salinan hasil yang sama.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.issued = 0
+        self.coalesced = 0
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Run func once per key among concurrent callers and share its result."""
+        call, leader = self.begin(key)
+        if leader:
+            try:
+                result = func()
+            except Exception as e:
+                self.finish(key, call, error=e)
+                raise
+            self.finish(key, call, result)
+        return self.wait(call)
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """Join or start the call for key; returns (call, is_leader).
+
+        Untuk leader yang menghasilkan hasilnya bertahap (mis. streaming):
+        leader wajib memanggil finish(), caller lain memanggil wait().
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.issued += 1
+            return call, True
+
+    def finish(self, key: str, call: _Call, result: Any = None, error: Optional[Exception] = None):
+        """Publish the leader's result (or error) and release the key."""
+        call.result = result
+        call.error = error
+        with self._lock:
+            del self._calls[key]
+        call.done.set()
+
+    def wait(self, call: _Call) -> Any:
+        """Wait for the leader and return a copy of its result (re-raises its error)."""
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        # Setiap caller dapat salinan supaya tidak saling memodifikasi hasil yang sama
+        return copy.deepcopy(call.result)
+
+    def get_stats(self) -> Dict:
+        """Get issued vs coalesced call counters."""
+        with self._lock:
+            return {
+                'issued': self.issued,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls)
+            }
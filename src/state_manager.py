@@ -33,7 +33,7 @@ class StateManager:
         
     def get_last_purchase(self, customer_id):
         """Ambil pembelian terakhir dari database.""" # <-- Update method
-        purchases = self.db.get_customer_purchases(customer_id)
+        purchases = self.db.get_customer_purchases_with_menu(customer_id, limit=1)
         return purchases[0] if purchases else None
     
     def get_last_visit_time(self):
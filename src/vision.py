@@ -0,0 +1,121 @@
+import threading
+import time
+from typing import Dict, Optional
+
+from .config import Config
+
+
+class VisionUnavailable(RuntimeError):
+    """Raised when the vision stack is disabled or failed to load."""
+
+
+class VisionStack:
+    """Factory lazy untuk FaceProcessor + RecognitionHandler.
+
+    ultralytics/torch, OpenVINO dan MediaPipe baru di-import saat pertama
+    kali dibutuhkan (atau saat warm-up di background), sehingga Flask bisa
+    langsung melayani API menu/mood/purchase. Mode API-only tidak pernah
+    memuat stack ini.
+    """
+
+    def __init__(self, state, db, logger, enabled: bool = Config.VISION_ENABLED):
+        self.state = state
+        self.db = db
+        self.logger = logger
+        self.enabled = enabled
+        self.face_processor = None
+        self.recognition_handler = None
+        self.status = 'not_started' if enabled else 'disabled'
+        self.error = None
+        self.load_seconds = None
+        self.startup_timings = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start_warmup(self):
+        """Load the vision stack in a background thread."""
+        if not self.enabled or self.status != 'not_started':
+            return
+        threading.Thread(target=self._warmup, name='vision-warmup', daemon=True).start()
+
+    def _warmup(self):
+        try:
+            self.get()
+        except VisionUnavailable:
+            pass
+
+    def get(self, timeout: Optional[float] = None):
+        """Get (face_processor, recognition_handler), loading them on first use."""
+        if self.ready:
+            return self.face_processor, self.recognition_handler
+        if not self.enabled:
+            raise VisionUnavailable('Vision stack is disabled (API-only mode)')
+
+        acquired = self._lock.acquire(timeout=-1 if timeout is None else timeout)
+        if not acquired:
+            raise VisionUnavailable('Vision stack is still loading')
+        try:
+            if not self.ready:
+                if self.status == 'failed':
+                    raise VisionUnavailable(f'Vision stack failed to load: {self.error}')
+                self._load()
+        finally:
+            self._lock.release()
+        return self.face_processor, self.recognition_handler
+
+    def _load(self):
+        self.status = 'loading'
+        started = time.monotonic()
+        try:
+            # Import berat sengaja di sini, bukan di level modul
+            from .face_processor import FaceProcessor
+            from .recognition_handler import RecognitionHandler
+
+            face_processor = FaceProcessor(self.db)
+            if Config.MODEL_WARMUP:
+                face_processor.warmup()
+            self.startup_timings = face_processor.startup_timings
+            self.recognition_handler = RecognitionHandler(face_processor, self.state, self.db, self.logger)
+            self.face_processor = face_processor
+        except Exception as e:
+            self.status = 'failed'
+            self.error = str(e)
+            self.logger.log(f"❌ Error: Vision stack gagal dimuat: {e}", level='error')
+            raise VisionUnavailable(f'Vision stack failed to load: {e}') from e
+
+        self.load_seconds = time.monotonic() - started
+        self.status = 'ready'
+        self._ready.set()
+        phases = ', '.join(f"{phase} {ms:.0f}ms" for phase, ms in self.startup_timings.items())
+        self.logger.log(f"✅ Model wajah siap ({self.load_seconds:.1f}s: {phases})",
+                        startup_ms=self.startup_timings)
+
+    def flush_writes(self, timeout: Optional[float] = None):
+        """Flush pending face/visit writes (no-op if the stack is not loaded)."""
+        if self.ready:
+            self.face_processor.writer.flush(timeout)
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Flush pending writes and stop the write-behind worker."""
+        if self.ready:
+            self.face_processor.writer.shutdown(timeout)
+
+    def reload_gallery(self):
+        """Reload known embeddings from the database (after restore/reset)."""
+        if self.ready:
+            self.face_processor.saved_records = self.face_processor.load_saved_records()
+
+    def get_status(self) -> Dict:
+        """Loading state for the readiness endpoint."""
+        return {
+            'enabled': self.enabled,
+            'status': self.status,
+            'ready': self.ready,
+            'error': self.error,
+            'load_seconds': round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            'startup_ms': self.startup_timings
+        }
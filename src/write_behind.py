@@ -0,0 +1,168 @@
+import atexit
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from .config import Config
+from .metrics import metrics
+
+
+class WriteBehindWriter:
+    """Antrian tulis di background agar loop video tidak menunggu disk/SQLite.
+
+    Semua operasi dijalankan oleh satu worker thread secara FIFO, sehingga
+    urutan tulis (insert customer -> update visit) tetap terjaga. Purchase
+    ditulis langsung oleh request, jadi caller menunggu registrasi customer
+    yang masih di antrian lewat wait_for_customer() lebih dulu.
+    """
+
+    _STOP = object()
+
+    def __init__(self, db, max_size: int = None):
+        self.db = db
+        self.queue = queue.Queue(maxsize=max_size or Config.WRITE_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._pending_done = threading.Condition(self._lock)
+        # Cek _closed + enqueue harus atomik terhadap shutdown(); worker tidak pernah memakai lock ini
+        self._submit_lock = threading.Lock()
+        self._pending_customers = {}  # customer_id -> waktu registrasi masuk antrian
+        self._stats = {
+            'enqueued': 0,
+            'completed': 0,
+            'failed': 0,
+            'max_depth': 0,
+            'blocked_puts': 0,
+            'blocked_seconds': 0.0,
+            'last_error': None,
+        }
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+        self._thread.start()
+        atexit.register(self.shutdown)
+
+    def add_customer(self, customer_id: str, face_image, embedding, confidence: float = 0.0,
+                     on_failure: Optional[Callable] = None):
+        """Queue new customer registration (image, embedding and DB rows).
+
+        on_failure dipanggil (di worker thread) jika registrasi gagal disimpan,
+        mis. untuk membuang embedding yang sudah terlanjur dipakai di memori.
+        """
+        with self._lock:
+            self._pending_customers[customer_id] = datetime.now().isoformat()
+
+        def _write():
+            try:
+                if not self.db.add_customer(customer_id, face_image, embedding, confidence):
+                    raise RuntimeError(f"add_customer gagal untuk {customer_id}")
+            except Exception:
+                if on_failure is not None:
+                    on_failure()
+                raise
+            finally:
+                with self._lock:
+                    self._pending_customers.pop(customer_id, None)
+                    self._pending_done.notify_all()
+
+        self.submit(_write, 'add_customer')
+
+    def update_visit(self, customer_id: str):
+        """Queue customer visit update."""
+        self.submit(lambda: self.db.update_visit(customer_id), 'update_visit')
+
+    def is_pending(self, customer_id: str) -> bool:
+        """Check if customer registration is still waiting in the queue."""
+        with self._lock:
+            return customer_id in self._pending_customers
+
+    def wait_for_customer(self, customer_id: str, timeout: Optional[float] = None) -> bool:
+        """Wait until a queued registration has been written (True if it is no longer pending)."""
+        with self._lock:
+            return self._pending_done.wait_for(lambda: customer_id not in self._pending_customers, timeout)
+
+    def pending_customer(self, customer_id: str) -> Optional[Dict]:
+        """Customer record for a registration that is still queued (None if not pending)."""
+        with self._lock:
+            first_seen = self._pending_customers.get(customer_id)
+        if first_seen is None:
+            return None
+        return {'customer_id': customer_id, 'first_seen': first_seen, 'last_seen': first_seen}
+
+    def submit(self, func: Callable, name: str = 'task'):
+        """Enqueue a write; blocks (and records backpressure) if the queue is full."""
+        with self._submit_lock:
+            if self._closed:
+                # Writer sudah dimatikan: tunggu sisa antrian selesai, lalu jalankan
+                # langsung supaya data tidak hilang dan urutan tetap terjaga
+                self._thread.join()
+                self._execute(func, name)
+                return
+
+            item = (func, name)
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                start = time.monotonic()
+                self.queue.put(item)
+                with self._lock:
+                    self._stats['blocked_puts'] += 1
+                    self._stats['blocked_seconds'] += time.monotonic() - start
+
+        with self._lock:
+            self._stats['enqueued'] += 1
+            self._stats['max_depth'] = max(self._stats['max_depth'], self.queue.qsize())
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued write has been applied."""
+        if timeout is None:
+            self.queue.join()
+            return True
+
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None):
+        """Flush pending writes and stop the worker thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self.queue.put((self._STOP, 'stop'))
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        """Get queue depth and backpressure metrics."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_customers'] = len(self._pending_customers)
+        stats['depth'] = self.queue.qsize()
+        stats['capacity'] = self.queue.maxsize
+        stats['running'] = self._thread.is_alive()
+        return stats
+
+    def _run(self):
+        while True:
+            func, name = self.queue.get()
+            try:
+                if func is self._STOP:
+                    return
+                self._execute(func, name)
+            finally:
+                self.queue.task_done()
+
+    def _execute(self, func: Callable, name: str):
+        try:
+            with metrics.span(f'db_{name}'):
+                func()
+            with self._lock:
+                self._stats['completed'] += 1
+        except Exception as e:
+            print(f"❌ Write-behind error ({name}): {e}")
+            with self._lock:
+                self._stats['failed'] += 1
+                self._stats['last_error'] = f"{name}: {e}"
@@ -18,7 +18,14 @@ class FaceRecognitionApp {
     
     init() {
         this.setupEventListeners();
-        this.startStatusPolling();
+        this.pollTimer = null;
+        
+        // Push via Server-Sent Events; polling hanya fallback
+        if (window.EventSource) {
+            this.startStatusStream();
+        } else {
+            this.startStatusPolling();
+        }
     }
     
     setupEventListeners() {
@@ -31,8 +38,22 @@ class FaceRecognitionApp {
         });
     }
     
-    async startStatusPolling() {
-        setInterval(async () => {
+    startStatusStream() {
+        const source = new EventSource('/api/events');
+        
+        source.addEventListener('status', (event) => {
+            this.updateUI(JSON.parse(event.data));
+        });
+        
+        source.onopen = () => this.stopStatusPolling();
+        
+        // Browser reconnect otomatis; sementara itu polling agar UI tetap update
+        source.onerror = () => this.startStatusPolling();
+    }
+    
+    startStatusPolling() {
+        if (this.pollTimer) return;
+        this.pollTimer = setInterval(async () => {
             try {
                 const response = await fetch('/api/recognition_status');
                 const status = await response.json();
@@ -43,6 +64,13 @@ class FaceRecognitionApp {
         }, 1000);
     }
     
+    stopStatusPolling() {
+        if (this.pollTimer) {
+            clearInterval(this.pollTimer);
+            this.pollTimer = null;
+        }
+    }
+    
     updateUI(status) {
         if (status.customer_id && (status.status === 'recognized' || status.status === 'new_customer')) {
             // Customer identified
@@ -76,24 +76,31 @@ class FaceRecognitionUI {
     async fetchLogs() {
         try {
             const response = await fetch('/logs');
-            const logs = await response.json();
-            
-            this.logBox.innerHTML = logs.map(log => {
-                const logType = this.getLogType(log);
-                return `<div class="log-entry ${logType}">${this.escapeHtml(log)}</div>`;
-            }).join('');
-            
-            // Auto-scroll to bottom
-            this.logBox.scrollTop = this.logBox.scrollHeight;
-            
-            // Update status based on logs
-            this.updateStatus(logs);
-            
+            this.renderLogs(await response.json());
         } catch (error) {
             console.error('Error fetching logs:', error);
         }
     }
     
+    renderLogs(logs) {
+        this.logs = logs;
+        this.logBox.innerHTML = logs.map(log => {
+            const logType = this.getLogType(log);
+            return `<div class="log-entry ${logType}">${this.escapeHtml(log)}</div>`;
+        }).join('');
+        
+        // Auto-scroll to bottom
+        this.logBox.scrollTop = this.logBox.scrollHeight;
+        
+        // Update status based on logs
+        this.updateStatus(logs);
+    }
+    
+    appendLog(entry) {
+        const logs = (this.logs || []).concat([entry]);
+        this.renderLogs(logs.slice(-this.maxLogs));
+    }
+    
     getLogType(log) {
         if (log.includes('Error') || log.includes('❌')) return 'error';
         if (log.includes('⚠️') || log.includes('Warning')) return 'warning';
@@ -175,8 +182,41 @@ class FaceRecognitionUI {
     }
     
     startLogFetching() {
+        this.maxLogs = 20;
+        this.lastSeq = 0;
+        this.logTimer = null;
+        
+        if (!window.EventSource) {
+            this.startLogPolling();
+            return;
+        }
+        
+        // Log di-push lewat Server-Sent Events; polling hanya saat stream terputus
+        const source = new EventSource('/api/events');
+        source.addEventListener('logs', (event) => {
+            const data = JSON.parse(event.data);
+            this.lastSeq = data.last_seq;
+            this.maxLogs = Math.max(this.maxLogs, data.logs.length);
+            this.renderLogs(data.logs);
+        });
+        source.addEventListener('log', (event) => {
+            const data = JSON.parse(event.data);
+            // Abaikan event yang sudah ada di snapshot
+            if (data.seq <= this.lastSeq) return;
+            this.lastSeq = data.seq;
+            this.appendLog(data.entry);
+        });
+        source.onopen = () => {
+            clearInterval(this.logTimer);
+            this.logTimer = null;
+        };
+        source.onerror = () => this.startLogPolling();
+    }
+    
+    startLogPolling() {
+        if (this.logTimer) return;
         this.fetchLogs();
-        setInterval(() => this.fetchLogs(), 1000);
+        this.logTimer = setInterval(() => this.fetchLogs(), 1000);
     }
     
     escapeHtml(text) {
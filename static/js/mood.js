@@ -125,6 +125,8 @@ class MoodRecommendation {
         try {
             this.setLoading(true, `Mencari rekomendasi untuk mood: ${moodKey}...`);
             
+            if (await this.streamRecommendation({ preset: moodKey })) return;
+            
             const response = await fetch(`/api/mood-recommendation/preset/${moodKey}`, {
                 method: 'POST'
             });
@@ -175,6 +177,8 @@ class MoodRecommendation {
         try {
             this.setLoading(true, 'Menganalisis perasaanmu dan mencari rekomendasi terbaik...');
             
+            if (await this.streamRecommendation({ user_input: userInput })) return;
+            
             const response = await fetch('/api/mood-recommendation', {
                 method: 'POST',
                 headers: {
@@ -196,6 +200,101 @@ class MoodRecommendation {
         }
     }
     
+    // Streaming (SSE lewat fetch) - tampilkan menu begitu ID diketahui, lalu alasan per token.
+    // Return false jika streaming tidak didukung supaya caller pakai endpoint biasa.
+    async streamRecommendation(body) {
+        if (!window.ReadableStream || !window.TextDecoder) return false;
+        
+        let response;
+        try {
+            response = await fetch('/api/mood-recommendation/stream', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(body)
+            });
+        } catch (error) {
+            return false;
+        }
+        if (!response.ok || !response.body) return false;
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let finished = false;
+        
+        while (!finished) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const block = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                
+                let eventName = 'message';
+                let data = '';
+                block.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (!data) continue;
+                
+                const payload = JSON.parse(data);
+                if (eventName === 'item') {
+                    this.renderStreamingItem(payload.menu_item);
+                } else if (eventName === 'reason') {
+                    this.appendStreamingReason(payload.delta);
+                } else if (eventName === 'done') {
+                    this.handleRecommendationResult(payload);
+                    finished = true;
+                }
+            }
+        }
+        
+        if (!finished) {
+            this.showError('Koneksi terputus. Coba lagi.');
+        }
+        return true;
+    }
+    
+    renderStreamingItem(menuItem) {
+        const resultContainer = document.getElementById('moodResult');
+        if (!resultContainer || !menuItem) return;
+        
+        resultContainer.innerHTML = `
+            <div class="mood-recommendation-card">
+                <div class="recommendation-header">
+                    <h3>✨ Rekomendasi Untukmu</h3>
+                </div>
+                
+                <div class="recommended-item">
+                    <div class="item-image-placeholder">
+                        <i class="fas fa-coffee"></i>
+                    </div>
+                    <div class="item-details">
+                        <h4>${menuItem.name}</h4>
+                        <p class="price">Rp ${parseInt(menuItem.price).toLocaleString('id-ID')}</p>
+                        <p class="description">${menuItem.description}</p>
+                    </div>
+                </div>
+                
+                <div class="recommendation-reason">
+                    <h5>💭 Mengapa ini cocok untukmu:</h5>
+                    <p id="moodStreamingReason"></p>
+                </div>
+            </div>
+        `;
+        resultContainer.style.display = 'block';
+    }
+    
+    appendStreamingReason(delta) {
+        const reason = document.getElementById('moodStreamingReason');
+        if (reason && delta) {
+            reason.textContent += delta;
+        }
+    }
+    
     handleRecommendationResult(result) {
         const resultContainer = document.getElementById('moodResult');
         if (!resultContainer) return;
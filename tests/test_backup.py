@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from src.backup import BackupManager
+from src.database import FaceDatabase
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    faces = tmp_path / 'faces'
+    embeddings = tmp_path / 'embeddings'
+    monkeypatch.setattr(BackupManager, 'FILE_STORES',
+                        {'faces': str(faces), 'embeddings': str(embeddings)})
+    db = FaceDatabase(str(tmp_path / 'test.db'), faces_dir=str(faces),
+                      embeddings_dir=str(embeddings))
+    manager = BackupManager(db.db_path, backup_dir=str(tmp_path / 'backups'))
+    return db, manager, faces
+
+
+def menu_names(db):
+    return sorted(item['name'] for item in db.get_menu())
+
+
+def test_backup_and_restore_round_trip(setup):
+    db, manager, faces = setup
+    faces.mkdir()
+    (faces / 'c1.jpg').write_bytes(b'face')
+    result = manager.backup_now()
+    assert result['files_copied'] == 1
+    assert os.path.exists(os.path.join(manager.backup_dir, result['name'], 'manifest.json'))
+
+    before = menu_names(db)
+    conn = sqlite3.connect(db.db_path)
+    conn.execute('DELETE FROM menu')
+    conn.commit()
+    conn.close()
+    os.remove(faces / 'c1.jpg')
+
+    manager.restore(result['name'])
+    assert menu_names(db) == before
+    assert (faces / 'c1.jpg').read_bytes() == b'face'
+
+
+def test_unchanged_files_are_hardlinked(setup):
+    db, manager, faces = setup
+    faces.mkdir()
+    (faces / 'c1.jpg').write_bytes(b'face')
+    manager.backup_now()
+    second = manager.backup_now()
+    assert (second['files_copied'], second['files_linked']) == (0, 1)
+
+
+def test_retention_and_missing_backup(setup):
+    db, manager, faces = setup
+    for _ in range(3):
+        manager.backup_now()
+    removed = manager.apply_retention(keep=1)
+    assert len(removed) == 2
+    assert len(manager.list_backups()) == 1
+
+    with pytest.raises(FileNotFoundError):
+        manager.restore('backup_missing')
+
+
+def test_reset_database_waits_for_shared_lock(setup):
+    db, manager, faces = setup
+    done = threading.Event()
+    with manager._lock:
+        thread = threading.Thread(target=lambda: (db.reset_database(manager), done.set()))
+        thread.start()
+        # Reset tertahan selama backup/restore lain memegang lock
+        assert not done.wait(0.1)
+    thread.join(5)
+    assert done.is_set()
+    assert len(manager.list_backups()) == 1
+    assert menu_names(db)
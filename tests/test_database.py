@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+
+from src.database import FaceDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    return FaceDatabase(str(tmp_path / 'test.db'), faces_dir=str(tmp_path / 'faces'),
+                        embeddings_dir=str(tmp_path / 'embeddings'))
+
+
+def insert_purchases(db, rows):
+    """rows: (customer_id, menu_id, purchase_time)."""
+    conn = sqlite3.connect(db.db_path)
+    conn.executemany('''
+        INSERT INTO purchases (customer_id, menu_id, quantity, total_price, purchase_time)
+        VALUES (?, ?, 1, 10000, ?)
+    ''', rows)
+    conn.commit()
+    conn.close()
+
+
+def test_keyset_pages_cover_all_purchases_once(db):
+    menu_id = db.get_menu()[0]['id']
+    # Beberapa purchase dengan waktu sama: urutan ditentukan id
+    times = ['2025-09-01T08:00:00'] * 3 + ['2025-09-01T09:00:00'] * 4 + ['2025-09-02T10:00:00']
+    insert_purchases(db, [('c1', menu_id, t) for t in times] + [('c2', menu_id, times[0])])
+
+    seen, cursor = [], None
+    while True:
+        page = db.get_customer_purchases_page('c1', limit=3, before=cursor)
+        seen.extend(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len(seen) == len(times)
+    assert len({item['id'] for item in seen}) == len(times)
+    keys = [(item['purchase_time'], item['id']) for item in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert all(item['customer_id'] == 'c1' for item in seen)
+
+
+def test_last_full_page_ends_with_empty_page(db):
+    menu_id = db.get_menu()[0]['id']
+    insert_purchases(db, [('c1', menu_id, f'2025-09-01T08:0{i}:00') for i in range(4)])
+
+    first = db.get_customer_purchases_page('c1', limit=2)
+    second = db.get_customer_purchases_page('c1', limit=2, before=first['next_cursor'])
+    third = db.get_customer_purchases_page('c1', limit=2, before=second['next_cursor'])
+    assert (len(first['items']), len(second['items'])) == (2, 2)
+    assert third == {'items': [], 'next_cursor': None}
+    assert len(list(db.iter_customer_purchases('c1', batch_size=3))) == 4
+
+
+def test_page_limit_must_be_positive(db):
+    with pytest.raises(ValueError):
+        db.get_customer_purchases_page('c1', limit=0)
+
+
+def add_rollup(db, menu_id, purchase_time, revenue=10000):
+    conn = sqlite3.connect(db.db_path)
+    FaceDatabase._apply_sales_rollup(conn.cursor(), menu_id, 1, revenue, purchase_time)
+    conn.commit()
+    conn.close()
+
+
+def test_day_only_end_includes_whole_day_for_hourly_stats(db):
+    menu_id = db.get_menu()[0]['id']
+    for t in ['2025-08-31T23:10:00', '2025-09-01T00:05:00', '2025-09-01T23:59:00',
+              '2025-09-02T00:00:00']:
+        add_rollup(db, menu_id, t)
+
+    stats = db.get_sales_stats(period='hour', start='2025-09-01', end='2025-09-01')
+    assert [row['period'] for row in stats['revenue_by_period']] == ['2025-09-01T00', '2025-09-01T23']
+    assert stats['totals']['orders'] == 2
+
+    daily = db.get_sales_stats(period='day', start='2025-09-01', end='2025-09-02')
+    assert daily['totals']['orders'] == 3
+    hourly = db.get_sales_stats(period='hour', end='2025-09-01T00')
+    assert hourly['totals']['orders'] == 2
+
+
+def test_top_n_is_clamped(db):
+    menu = db.get_menu()
+    for item in menu[:3]:
+        add_rollup(db, item['id'], '2025-09-01T08:00:00')
+
+    assert len(db.get_sales_stats(top_n=-1)['top_items']) == 1
+    assert len(db.get_sales_stats(top_n=2)['top_items']) == 2
+    assert len(db.get_sales_stats(top_n=10**6)['top_items']) == 3
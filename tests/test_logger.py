@@ -0,0 +1,35 @@
+import threading
+
+import pytest
+
+from src.logger import Logger
+
+
+@pytest.fixture
+def logger():
+    logger = Logger(buffer_size=10000, log_file=None)
+    yield logger
+    logger.close()
+
+
+def test_consecutive_duplicates_are_skipped(logger):
+    for message in ['a', 'a', 'b', 'a']:
+        logger.log(message)
+    assert [event['message'] for event in logger.get_events()] == ['a', 'b', 'a']
+    assert logger.last_seq == 3
+
+
+def test_concurrent_logs_keep_seq_in_buffer_order(logger):
+    def worker(n):
+        for i in range(500):
+            logger.log(f'{n}-{i}')
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    seqs = [event['seq'] for event in logger.get_events()]
+    assert seqs == list(range(1, 4001))
+    assert logger.get_events(since=3990, limit=5)[0]['seq'] == 3991
@@ -0,0 +1,60 @@
+import pytest
+
+from src import mood_cache
+from src.mood_cache import RecommendationCache, normalize_mood_input
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(mood_cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_normalize_mood_input():
+    assert normalize_mood_input("Panas  BANGET!!") == "panas banget"
+    assert normalize_mood_input("  capek,   pengen\tkopi ") == "capek pengen kopi"
+
+
+def test_key_ignores_formatting_and_includes_menu_version():
+    key = RecommendationCache.make_key("Panas banget!", 3)
+    assert key == RecommendationCache.make_key("  panas   BANGET ", 3)
+    assert key != RecommendationCache.make_key("panas banget", 4)
+
+
+def test_get_returns_copy(clock):
+    cache = RecommendationCache(max_size=4, ttl_seconds=60)
+    cache.set('k', {'items': [1]})
+    cache.get('k')['items'].append(2)
+    assert cache.get('k') == {'items': [1]}
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = RecommendationCache(max_size=4, ttl_seconds=60)
+    cache.set('k', {'v': 1})
+    clock[0] += 60
+    assert cache.get('k') == {'v': 1}
+    clock[0] += 0.1
+    assert cache.get('k') is None
+    assert cache.get_stats()['size'] == 0
+
+
+def test_evicts_least_recently_used(clock):
+    cache = RecommendationCache(max_size=2, ttl_seconds=60)
+    cache.set('a', {'v': 'a'})
+    cache.set('b', {'v': 'b'})
+    cache.get('a')  # 'a' jadi yang terbaru dipakai
+    cache.set('c', {'v': 'c'})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 'a'}
+    assert cache.get('c') == {'v': 'c'}
+
+
+def test_hit_and_miss_counters(clock):
+    cache = RecommendationCache(max_size=2, ttl_seconds=60)
+    cache.get('missing')
+    cache.set('k', {'v': 1})
+    cache.get('k')
+    stats = cache.get_stats()
+    assert (stats['hits'], stats['misses'], stats['persistent']) == (1, 1, False)
@@ -0,0 +1,60 @@
+from src.mood_classifier import LocalMoodClassifier, expand_mood_input
+
+MENU = [
+    {'id': 1, 'name': 'Iced Lemon Tea', 'description': 'Cold sweet tea', 'mood_tags': 'hot,refreshing,summer'},
+    {'id': 2, 'name': 'Hot Chocolate', 'description': 'Warm cocoa', 'mood_tags': 'cozy,warm,comfort'},
+    {'id': 3, 'name': 'Espresso', 'description': 'Strong shot', 'mood_tags': 'tired,energetic,focused'},
+]
+
+
+def fitted(min_score=0.25, min_margin=0.06):
+    classifier = LocalMoodClassifier(min_score=min_score, min_margin=min_margin)
+    classifier.fit(MENU, menu_version=1)
+    return classifier
+
+
+def test_expand_mood_input_adds_english_tags():
+    assert expand_mood_input("Gerah!") == "gerah hot refreshing"
+
+
+def test_unfitted_classifier_returns_none():
+    assert LocalMoodClassifier(min_score=0.25, min_margin=0.06).classify("capek") is None
+
+
+def test_confident_match():
+    match = fitted().classify("gerah banget")
+    assert match['item']['id'] == 1
+    assert match['confident']
+    assert match['score'] >= 0.25 and match['margin'] >= 0.06
+    assert set(match['matched_tags']) == {'hot', 'refreshing'}
+
+
+def test_below_min_score_is_not_confident():
+    match = fitted(min_score=1.01).classify("gerah banget")
+    assert match['item']['id'] == 1
+    assert not match['confident']
+
+
+def test_below_min_margin_is_not_confident():
+    match = fitted(min_score=0.0, min_margin=1.01).classify("gerah banget")
+    assert not match['confident']
+
+
+def test_unrelated_input_is_not_confident():
+    match = fitted().classify("qzx")
+    assert match['score'] == 0.0
+    assert not match['confident']
+
+
+def test_scores_by_id_covers_menu():
+    scores = fitted().scores_by_id("capek")
+    assert set(scores) == {1, 2, 3}
+    assert max(scores, key=scores.get) == 3
+
+
+def test_refit_swaps_model():
+    classifier = fitted()
+    classifier.fit(MENU[:1], menu_version=2)
+    assert classifier.menu_version == 2
+    assert [item['id'] for item in classifier.items] == [1]
+    assert classifier.classify("gerah")['alternative'] is None
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.circuit_breaker import CircuitBreaker
+from src.config import Config
+from src.database import FaceDatabase
+from src.mood_matcher import MoodMatcher
+
+ANSWER = {'recommended_item_id': 1, 'confidence': 80,
+          'reason': 'Cocok untuk suasana hatimu hari ini', 'alternative': None}
+
+
+class StubClient:
+    """Stands in for the OpenAI client; `delay` and `fail` shape each completion."""
+
+    def __init__(self):
+        self.calls = 0
+        self.delay = 0.0
+        self.fail = False
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError('upstream down')
+        if kwargs.get('stream'):
+            return self._chunks(json.dumps(ANSWER))
+        content = json.dumps(ANSWER)
+        prompt = kwargs['messages'][-1]['content']
+        if 'Several customers' in prompt:
+            count = sum(1 for line in prompt.splitlines() if line[:1].isdigit())
+            content = json.dumps([dict(ANSWER, index=i + 1) for i in range(count)])
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    @staticmethod
+    def _chunks(text):
+        for i in range(0, len(text), 8):
+            time.sleep(0.005)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text[i:i + 8]))])
+
+
+@pytest.fixture
+def matcher(tmp_path, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'test')
+    monkeypatch.setattr(Config, 'LLM_DEADLINE_SECONDS', 0.2)
+    monkeypatch.setattr(Config, 'MOOD_CACHE_PERSIST', False)
+    db = FaceDatabase(str(tmp_path / 'test.db'), faces_dir=str(tmp_path / 'faces'),
+                      embeddings_dir=str(tmp_path / 'embeddings'))
+    matcher = MoodMatcher(db)
+    matcher.client = StubClient()
+    matcher.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.3)
+    yield matcher
+    matcher.executor.shutdown(wait=True)
+
+
+def is_llm_answer(result):
+    return result['success'] and not result['recommendation'].get('is_fallback')
+
+
+def test_llm_answer_is_cached(matcher):
+    result = matcher.get_mood_recommendation('qzx')
+    assert is_llm_answer(result)
+    assert matcher.get_mood_recommendation('qzx')['cached']
+    assert matcher.client.calls == 1
+
+
+def test_deadline_serves_fallback_and_counts_failure(matcher):
+    matcher.client.delay = 0.4
+    result = matcher.get_mood_recommendation('qzx')
+    assert result['deadline_exceeded']
+    assert not is_llm_answer(result)
+    assert matcher.breaker.failures == 1
+
+    # Jawaban yang terlambat tetap di-cache, tanpa dihitung dua kali
+    matcher.executor.shutdown(wait=True)
+    assert matcher.get_mood_recommendation('qzx')['cached']
+    assert matcher.breaker.failures == 1
+
+
+def test_open_breaker_skips_upstream_then_half_open_recovers(matcher):
+    matcher.client.fail = True
+    matcher.get_mood_recommendation('qzx one')
+    matcher.get_mood_recommendation('qzx two')
+    assert matcher.breaker.state == 'open'
+
+    calls = matcher.client.calls
+    assert not is_llm_answer(matcher.get_mood_recommendation('qzx three'))
+    assert matcher.client.calls == calls
+
+    time.sleep(0.3)
+    matcher.client.fail = False
+    assert is_llm_answer(matcher.get_mood_recommendation('qzx four'))
+    assert matcher.breaker.state == 'closed'
+
+
+def test_queue_wait_is_not_a_breaker_failure(matcher):
+    release = threading.Event()
+    # Semua worker sibuk: panggilan baru hanya antre
+    blockers = [matcher.executor.submit(release.wait, 5) for _ in range(Config.LLM_MAX_WORKERS)]
+
+    result = matcher.get_mood_recommendation('qzx')
+    assert result['saturated']
+    release.set()
+    for blocker in blockers:
+        blocker.result(5)
+
+    assert matcher.client.calls == 0
+    assert matcher.breaker.failures == 0
+
+
+def test_late_start_within_own_deadline_is_not_a_failure(matcher):
+    release = threading.Event()
+    blockers = [matcher.executor.submit(release.wait, 5) for _ in range(Config.LLM_MAX_WORKERS)]
+    # Worker bebas sesaat sebelum deadline: panggilan mulai terlambat tapi upstream sehat
+    threading.Timer(0.15, release.set).start()
+    matcher.client.delay = 0.1
+
+    result = matcher.get_mood_recommendation('qzx')
+    assert result['deadline_exceeded']
+    matcher.executor.shutdown(wait=True)
+    for blocker in blockers:
+        blocker.result(5)
+    assert matcher.breaker.failures == 0
+    assert matcher.breaker.state == 'closed'
+
+
+def test_stream_sends_item_before_done(matcher):
+    events = list(matcher.stream_mood_recommendation('qzx'))
+    names = [event['event'] for event in events]
+    assert names[0] == 'item' and names[-1] == 'done' and 'reason' in names
+    assert is_llm_answer(events[-1]['data'])
+    assert matcher.get_mood_recommendation('qzx')['cached']
+
+
+def test_stream_watchdog_serves_fallback_when_upstream_is_silent(matcher):
+    matcher.client.delay = 1.0
+    started = time.monotonic()
+    events = list(matcher.stream_mood_recommendation('qzx'))
+    assert time.monotonic() - started < 0.6
+    assert events[-1]['event'] == 'done'
+    assert not is_llm_answer(events[-1]['data'])
+    assert matcher.breaker.failures == 1
+
+
+def test_identical_streams_share_one_upstream_call(matcher):
+    matcher.client.delay = 0.1
+    results = []
+
+    def consume():
+        results.append(list(matcher.stream_mood_recommendation('qzx'))[-1]['data'])
+
+    threads = [threading.Thread(target=consume) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+    assert matcher.client.calls == 1
+    assert len(results) == 3 and all(is_llm_answer(result) for result in results)
+    assert matcher.single_flight.get_stats()['coalesced'] == 2
+
+
+def test_batch_is_bounded_by_batch_deadline(matcher, monkeypatch):
+    monkeypatch.setattr(Config, 'LLM_BATCH_DEADLINE_SECONDS', 0.2)
+    monkeypatch.setattr(Config, 'LLM_BATCH_SIZE', 2)
+    inputs = ['qzx one', 'qzx two', 'qzx three', 'qzx one']
+    result = matcher.get_batch_recommendations(inputs)
+    assert [item['source'] for item in result['results']] == ['llm'] * 4
+    assert result['stats'] == dict(result['stats'], unique=3, upstream_calls=2)
+
+    matcher.client.delay = 0.5
+    started = time.monotonic()
+    result = matcher.get_batch_recommendations(['qzx four', 'qzx five', 'qzx six'])
+    assert time.monotonic() - started < 0.45
+    assert {item['source'] for item in result['results']} == {'fallback'}
@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from src.database import FaceDatabase
+from src.recommender import PersonalRecommender
+
+
+@pytest.fixture
+def db(tmp_path):
+    return FaceDatabase(str(tmp_path / 'test.db'), faces_dir=str(tmp_path / 'faces'),
+                        embeddings_dir=str(tmp_path / 'embeddings'))
+
+
+def buy(db, customer_id, menu_id, quantity=1):
+    conn = sqlite3.connect(db.db_path)
+    conn.execute('''
+        INSERT INTO purchases (customer_id, menu_id, quantity, total_price, purchase_time)
+        VALUES (?, ?, ?, 10000, datetime('now', 'localtime'))
+    ''', (customer_id, menu_id, quantity))
+    conn.commit()
+    conn.close()
+
+
+def add_menu_item(db, name):
+    conn = sqlite3.connect(db.db_path)
+    conn.execute('INSERT INTO menu (name, price, description) VALUES (?, 20000, ?)', (name, name))
+    conn.commit()
+    conn.close()
+
+
+def test_history_ranks_bought_item_first(db):
+    menu = db.get_menu()
+    buy(db, 'c1', menu[2]['id'], quantity=3)
+    buy(db, 'c2', menu[0]['id'])
+    recommender = PersonalRecommender(db)
+    recommender.rebuild()
+
+    top = recommender.recommend('c1', top_n=2)
+    assert top[0]['id'] == menu[2]['id'] and top[0]['source'] == 'history'
+    assert recommender.recommend('unknown')[0]['source'] == 'popular'
+
+
+def test_refresh_customer_applies_purchase_before_rebuild(db):
+    menu = db.get_menu()
+    buy(db, 'c1', menu[0]['id'])
+    recommender = PersonalRecommender(db)
+    recommender.rebuild()
+
+    buy(db, 'c1', menu[1]['id'], quantity=5)
+    recommender.refresh_customer('c1')
+    assert recommender.recommend('c1', top_n=1)[0]['id'] == menu[1]['id']
+    assert recommender.get_stats()['overrides'] == 1
+
+    recommender.rebuild()
+    assert recommender.get_stats()['overrides'] == 0
+    assert recommender.recommend('c1', top_n=1)[0]['id'] == menu[1]['id']
+
+
+def test_refresh_is_not_stored_against_a_newer_model(db, monkeypatch):
+    menu = db.get_menu()
+    buy(db, 'c1', menu[0]['id'])
+    recommender = PersonalRecommender(db)
+    recommender.rebuild()
+
+    real_iter = db.iter_purchase_affinity
+    swapped = []
+
+    def iter_with_rebuild(customer_id=None, **kwargs):
+        yield from real_iter(customer_id, **kwargs)
+        if customer_id and not swapped:
+            # Rebuild dengan menu baru selesai di tengah refresh_customer
+            swapped.append(True)
+            add_menu_item(db, 'Test Special')
+            recommender.rebuild()
+
+    monkeypatch.setattr(db, 'iter_purchase_affinity', iter_with_rebuild)
+    recommender.refresh_customer('c1')
+
+    n_menu = len(db.get_menu())
+    assert len(recommender.personal_scores('c1')) == n_menu
+    assert len(recommender.recommend('c1', top_n=n_menu)) == n_menu
+
+
+def test_rebuild_reapplies_refresh_made_while_it_ran(db, monkeypatch):
+    menu = db.get_menu()
+    buy(db, 'c1', menu[0]['id'])
+    recommender = PersonalRecommender(db)
+    recommender.rebuild()
+
+    real_iter = db.iter_purchase_affinity
+
+    def iter_then_purchase(customer_id=None, **kwargs):
+        yield from real_iter(customer_id, **kwargs)
+        if customer_id is None:
+            # Pembelian setelah rebuild selesai membaca tabel purchases
+            monkeypatch.setattr(db, 'iter_purchase_affinity', real_iter)
+            buy(db, 'c2', menu[3]['id'])
+            recommender.refresh_customer('c2')
+
+    monkeypatch.setattr(db, 'iter_purchase_affinity', iter_then_purchase)
+    recommender.rebuild()
+
+    assert recommender.get_stats()['overrides'] == 1
+    top = recommender.recommend('c2', top_n=1)[0]
+    assert (top['id'], top['source']) == (menu[3]['id'], 'history')
@@ -0,0 +1,141 @@
+import http.client
+import socket
+import threading
+import time
+
+import pytest
+from flask import Flask, Response, request
+
+from src.server import PooledWSGIServer
+
+release = threading.Event()
+
+
+def make_app():
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return request.get_data()
+
+    @app.route('/ignore-body', methods=['POST'])
+    def ignore_body():
+        return 'ok'
+
+    @app.route('/stream')
+    def stream():
+        def generate():
+            yield b'first\n'
+            release.wait(5)
+            yield b'last\n'
+        return Response(generate(), mimetype='text/plain')
+
+    return app
+
+
+@pytest.fixture
+def server():
+    release.clear()
+    server = PooledWSGIServer('127.0.0.1', 0, make_app(), workers=1, queue_size=1, stream_workers=1,
+                              keepalive_timeout=2.0, request_timeout=5.0, stream_paths=('/stream',))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    release.set()
+    server.shutdown()
+    server.drain(5)
+    server.server_close()
+
+
+def connect(server):
+    return http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+
+
+def raw(server, payload):
+    sock = socket.create_connection(('127.0.0.1', server.port), timeout=5)
+    sock.sendall(payload)
+    return sock
+
+
+def read_until(sock, marker):
+    data = b''
+    while marker not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def read_all(sock):
+    data = b''
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return data
+        data += chunk
+
+
+def test_keep_alive_reuses_connection(server):
+    conn = connect(server)
+    for _ in range(3):
+        conn.request('GET', '/ping')
+        response = conn.getresponse()
+        assert (response.status, response.read()) == (200, b'pong')
+        assert not response.will_close
+    conn.request('POST', '/echo', body=b'hello')
+    assert conn.getresponse().read() == b'hello'
+
+
+def test_unread_body_is_drained_before_next_request(server):
+    conn = connect(server)
+    conn.request('POST', '/ignore-body', body=b'x' * 10000)
+    assert conn.getresponse().read() == b'ok'
+    conn.request('GET', '/ping')
+    assert conn.getresponse().read() == b'pong'
+
+
+def test_split_and_pipelined_requests(server):
+    sock = raw(server, b'GET /pi')
+    time.sleep(0.2)
+    sock.sendall(b'ng HTTP/1.1\r\nHost: x\r\n\r\n'
+                 b'GET /ping HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n')
+    data = read_all(sock)
+    assert data.count(b'HTTP/1.1 200') == 2
+    assert data.count(b'pong') == 2
+
+
+def test_stream_runs_in_stream_pool(server):
+    sock = raw(server, b'GET /stream HTTP/1.1\r\nHost: x\r\n\r\n')
+    assert b'first' in read_until(sock, b'first')
+
+    # Satu-satunya worker API tetap bebas selama stream terbuka
+    started = time.monotonic()
+    conn = connect(server)
+    conn.request('GET', '/ping')
+    assert conn.getresponse().read() == b'pong'
+    assert time.monotonic() - started < 1.0
+
+    # Pool stream penuh: stream kedua langsung ditolak
+    second = raw(server, b'GET /stream HTTP/1.1\r\nHost: x\r\n\r\n')
+    assert read_all(second).startswith(b'HTTP/1.1 503')
+
+    release.set()
+    assert b'last' in read_all(sock)
+
+
+def test_idle_keep_alive_yields_worker_to_waiting_connection(server):
+    idle = connect(server)
+    idle.request('GET', '/ping')
+    idle.getresponse().read()
+
+    started = time.monotonic()
+    conn = connect(server)
+    conn.request('GET', '/ping')
+    assert conn.getresponse().read() == b'pong'
+    # Jauh lebih cepat dari keepalive_timeout (2 detik)
+    assert time.monotonic() - started < 1.0
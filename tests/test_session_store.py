@@ -0,0 +1,46 @@
+from src.session_store import SessionStore
+
+
+class FakeDB:
+    def __init__(self):
+        self.created = 0
+        self.finished = []
+
+    def create_session(self, customer_id):
+        self.created += 1
+        return f's{self.created}'
+
+    def update_session_status(self, session_id, status):
+        self.finished.append((session_id, status))
+
+
+def test_new_customer_opens_session_and_cancels_previous():
+    db = FakeDB()
+    store = SessionStore(db, ttl_seconds=60)
+    assert store.update('k1', {'customer_id': 'c1', 'status': 'identified'})['session_id'] == 's1'
+    assert store.update('k1', {'customer_id': 'c2', 'status': 'identified'})['session_id'] == 's2'
+    assert db.finished == [('s1', 'cancelled')]
+    assert store.get('k2')['customer_id'] is None
+
+
+def test_close_only_finishes_the_given_session():
+    db = FakeDB()
+    store = SessionStore(db, ttl_seconds=60)
+    store.update('k1', {'customer_id': 'c1', 'status': 'identified'})
+    # Customer berikutnya sudah dikenali sebelum purchase c1 selesai
+    store.update('k1', {'customer_id': 'c2', 'status': 'identified'})
+
+    store.close('k1', 'completed', session_id='s1')
+    assert ('s1', 'completed') in db.finished
+    assert store.get('k1')['session_id'] == 's2'
+
+    store.close('k1', 'completed', session_id='s2')
+    assert store.get('k1')['customer_id'] is None
+
+
+def test_expired_session_is_closed_on_read():
+    db = FakeDB()
+    store = SessionStore(db, ttl_seconds=0.0)
+    store.update('k1', {'customer_id': 'c1', 'status': 'identified'})
+    assert store.get('k1')['customer_id'] is None
+    assert db.finished == [('s1', 'expired')]
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import pytest
+
+from src.single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {'answer': 42}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('k', slow)))
+    leader.start()
+    assert started.wait(5)
+
+    followers = [threading.Thread(target=lambda: results.append(flight.do('k', slow))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    # Tunggu sampai semua follower tercatat sebagai coalesced sebelum leader selesai
+    deadline = time.monotonic() + 5
+    while flight.get_stats()['coalesced'] < 3 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert results == [{'answer': 42}] * 4
+    assert flight.get_stats() == {'issued': 1, 'coalesced': 3, 'in_flight': 0}
+
+
+def test_callers_get_independent_copies():
+    flight = SingleFlight()
+    first = flight.do('k', lambda: {'items': [1]})
+    first['items'].append(2)
+    assert flight.do('k', lambda: {'items': [1]}) == {'items': [1]}
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    assert flight.do('k', lambda: 1) == 1
+    assert flight.do('k', lambda: 2) == 2
+    assert flight.get_stats()['issued'] == 2
+
+
+def test_error_is_raised_and_key_released():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('upstream down')
+
+    with pytest.raises(ValueError):
+        flight.do('k', fail)
+    assert flight.get_stats()['in_flight'] == 0
+    assert flight.do('k', lambda: 'ok') == 'ok'
@@ -0,0 +1,81 @@
+import threading
+
+from src.write_behind import WriteBehindWriter
+
+
+class FakeDB:
+    """Records writes in order; add_customer blocks until `release` is set."""
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+        self.release = threading.Event()
+        self.release.set()
+
+    def add_customer(self, customer_id, face_image, embedding, confidence=0.0):
+        self.release.wait(5)
+        self.calls.append(('add_customer', customer_id))
+        return not self.fail
+
+    def update_visit(self, customer_id):
+        self.calls.append(('update_visit', customer_id))
+
+
+def test_writes_run_in_submission_order():
+    db = FakeDB()
+    writer = WriteBehindWriter(db)
+    writer.add_customer('c1', None, None)
+    writer.update_visit('c1')
+    writer.submit(lambda: db.calls.append(('purchase', 'c1')), 'purchase')
+    assert writer.flush(timeout=5)
+
+    assert db.calls == [('add_customer', 'c1'), ('update_visit', 'c1'), ('purchase', 'c1')]
+    assert writer.get_stats()['completed'] == 3
+    writer.shutdown()
+
+
+def test_pending_customer_until_written():
+    db = FakeDB()
+    db.release.clear()
+    writer = WriteBehindWriter(db)
+    writer.add_customer('c1', None, None)
+
+    assert writer.is_pending('c1')
+    assert writer.pending_customer('c1')['customer_id'] == 'c1'
+    assert not writer.wait_for_customer('c1', timeout=0.05)
+
+    db.release.set()
+    assert writer.wait_for_customer('c1', timeout=5)
+    assert not writer.is_pending('c1')
+    assert writer.pending_customer('c1') is None
+    writer.shutdown()
+
+
+def test_failed_registration_calls_on_failure():
+    db = FakeDB(fail=True)
+    writer = WriteBehindWriter(db)
+    failed = []
+    writer.add_customer('c1', None, None, on_failure=lambda: failed.append('c1'))
+    assert writer.flush(timeout=5)
+
+    assert failed == ['c1']
+    assert not writer.is_pending('c1')
+    stats = writer.get_stats()
+    assert stats['failed'] == 1 and 'c1' in stats['last_error']
+    writer.shutdown()
+
+
+def test_shutdown_drains_queue_and_later_writes_run_after_it():
+    db = FakeDB()
+    db.release.clear()
+    writer = WriteBehindWriter(db)
+    writer.add_customer('c1', None, None)
+    writer.update_visit('c1')
+
+    threading.Timer(0.05, db.release.set).start()
+    writer.shutdown(timeout=5)
+    assert not writer.get_stats()['running']
+
+    # Setelah shutdown, tulisan dijalankan langsung (tidak hilang, urutan tetap)
+    writer.update_visit('c2')
+    assert db.calls == [('add_customer', 'c1'), ('update_visit', 'c1'), ('update_visit', 'c2')]